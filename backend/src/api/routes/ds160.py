@@ -1,4 +1,4 @@
-from fastapi import FastAPI, UploadFile, File, APIRouter, Request, HTTPException
+from fastapi import FastAPI, UploadFile, File, Form, APIRouter, Request, HTTPException
 from fastapi.responses import StreamingResponse
 import tempfile
 import subprocess
@@ -17,11 +17,18 @@ sys.path.append(str(src_path))
 
 # Now we can import our modules
 from automation.browser import BrowserHandler
-from automation.form_handler import FormHandler
-from mappings.form_mapping import FormPage
+from automation.form_handler import FormHandler, action_latencies
+from automation.action_planner import ActionPlanner
+from automation.preflight import PreflightValidator, summarize
+from mappings.form_mapping import FormPage, load_page_definitions
+from automation.field_model import build_page_models
+from automation.run_registry import Run, runs
+from utils.openai_handler import OpenAIHandler
+from utils.section_stream import SectionStream
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
+openai_handler = OpenAIHandler()
 
 # Load form definitions
 page_definitions = {}
@@ -30,52 +37,13 @@ form_definitions_dir = Path(__file__).parent.parent.parent.parent/'form_definiti
 # Load all form definitions
 def load_form_definitions():
     try:
-        # Map enum values to actual file names
-        page_json_mappings = {
-            "start_page": "p0_start_page_definition",
-            "retrieve_page": "p0_retrieve_page_definition", 
-            "security_page": "p0_security_page_definition",
-            "timeout_page": "p0_timeout_page_definition",
-            "personal_page1": "p1_personal1_definition",
-            "personal_page2": "p2_personal2_definition",
-            "travel_page": "p3_travel_definition",
-            "travel_companions_page": "p4_travelcompanions_definition",
-            "previous_travel_page": "p5_previousustravel_definition",
-            "address_phone_page": "p6_addressphone_definition",
-            "pptvisa_page": "p7_pptvisa_definition",
-            "us_contact_page": "p8_uscontact_definition",
-            "relatives_page": "p9_relatives_definition",
-            "workeducation1_page": "p10_workeducation1_definition",
-            "workeducation2_page": "p11_workeducation2_definition",
-            "workeducation3_page": "p12_workeducation3_definition",
-            "security_background1_page": "p13_securityandbackground1_definition",
-            "security_background2_page": "p14_securityandbackground2_definition",
-            "security_background3_page": "p15_securityandbackground3_definition",
-            "security_background4_page": "p16_securityandbackground4_definition",
-            "security_background5_page": "p17_securityandbackground5_definition",
-            "spouse_page": "p18_spouse_definition"
-        }
-
         # First log FormPage enum values
         logger.info("FormPage enum values:")
         for page in FormPage:
             logger.info(f"  {page.name}: {page.value}")
 
-        # Log mapping between files and keys
-        logger.info("Page definition mapping:")
-        for yaml_key, file_prefix in page_json_mappings.items():
-            logger.info(f"  YAML key: {yaml_key} -> File: {file_prefix}.json")
-
-        # Load and verify each definition
-        for enum_value, file_prefix in page_json_mappings.items():
-            file_path = form_definitions_dir / f"{file_prefix}.json"
-            if file_path.exists():
-                with open(file_path) as f:
-                    definition = json.load(f)
-                    page_definitions[enum_value] = definition
-                    logger.info(f"Loaded {enum_value} with {len(definition.get('fields', []))} fields")
-            else:
-                logger.error(f"MISSING DEFINITION: {file_path}")  # Error not warning - this is critical
+        # Immutable models: every concurrent run shares them without copying
+        page_definitions.update(build_page_models(load_page_definitions(form_definitions_dir)))
 
         # Verify all FormPage enum values have definitions
         missing_defs = [page.value for page in FormPage if page.value not in page_definitions]
@@ -90,43 +58,50 @@ def load_form_definitions():
 
 # Load definitions when module is imported
 load_form_definitions()
+preflight_validator = PreflightValidator(page_definitions)
+# Shares FormHandler's latencies so estimates use what this server has measured
+action_planner = ActionPlanner(page_definitions, latencies=action_latencies)
 
-async def process_ds160_with_updates(content: bytes, queue: asyncio.Queue = None) -> AsyncGenerator[str, None]:
-    """Process DS-160 form and yield progress updates"""
-    # Use the provided queue or create a new one if none was provided
-    progress_queue = queue or asyncio.Queue()
-    
+def preflight_check(form_data: dict) -> dict:
+    """Validate input YAML against the page definitions before any browser is launched"""
+    summary = summarize(preflight_validator.validate(form_data))
+    logger.info(f"Pre-flight validation: {len(summary['errors'])} errors, {len(summary['warnings'])} warnings")
+    return summary
+
+def preflight_message(summary: dict) -> str:
+    lines = [f"{len(summary['errors'])} problems found in the YAML, fix them before running:"]
+    lines += [f"{issue['page']}.{issue['field']}: {issue['message']}" if issue['field'] else f"{issue['page']}: {issue['message']}"
+              for issue in summary['errors']]
+    return "\n".join(lines)
+
+async def stream_task_updates(run: Run, request: Request) -> AsyncGenerator[str, None]:
+    """Yield progress messages from the queue until the run completes
+
+    If the client goes away first the run is cancelled (or left running when detached):
+    either the response is cancelled and closes this generator, or the idle poll notices."""
+    process_task, progress_queue = run.task, run.queue
+    finished = False
     try:
-        # Parse YAML content
-        form_data = yaml.safe_load(content)
-        logger.info(f"Parsed YAML data with keys: {list(form_data.keys() if form_data else [])}")
-        
-        # Initialize handlers
-        browser_handler = BrowserHandler()
-        form_handler = FormHandler(progress_queue)  # Pass the request-specific queue
-        
-        # Start processing in background task
-        process_task = asyncio.create_task(
-            form_handler.process_with_browser(browser_handler, form_data, page_definitions)
-        )
-        
-        # Stream updates from the queue
-        yield json.dumps({"status": "info", "message": "Starting DS-160 form processing..."})
-        
         while True:
             try:
                 # Get message with timeout to check if process has completed
                 message = await asyncio.wait_for(progress_queue.get(), timeout=1.0)
+                run.note(message)
                 yield json.dumps(message)
                 progress_queue.task_done()
-                
-                # Break if we receive completion message
-                if message.get("status") == "complete":
+
+                # Break if we receive completion (or cancellation) message
+                if message.get("status") in ("complete", "aborted"):
+                    finished = True
                     break
-                    
+
             except asyncio.TimeoutError:
                 # Check if the process task is done
                 if process_task.done():
+                    finished = True
+                    if process_task.cancelled():
+                        yield json.dumps({"status": "aborted", "message": "DS-160 processing was cancelled", "run_id": run.run_id})
+                        break
                     # Get the result or exception
                     try:
                         result = process_task.result()
@@ -135,13 +110,155 @@ async def process_ds160_with_updates(content: bytes, queue: asyncio.Queue = None
                         logger.error(f"Process task failed: {str(e)}")
                         yield json.dumps({"status": "error", "message": f"Processing failed: {str(e)}"})
                     break
+                if await request.is_disconnected():
+                    break
+    finally:
+        if not finished:
+            runs.listener_gone(run)
+
+async def process_ds160_with_updates(content: bytes, request: Request, detached: bool = False,
+                                     queue: asyncio.Queue = None) -> AsyncGenerator[str, None]:
+    """Process DS-160 form and yield progress updates"""
+    # Use the provided queue or create a new one if none was provided
+    progress_queue = queue or asyncio.Queue()
+    
+    try:
+        # Parse YAML content
+        form_data = yaml.safe_load(content)
+        logger.info(f"Parsed YAML data with keys: {list(form_data.keys() if form_data else [])}")
+        
+        # Reject bad input before it occupies a browser
+        validation = preflight_check(form_data)
+        if not validation['valid']:
+            yield json.dumps({"status": "error", "message": preflight_message(validation), "validation": validation})
+            return
+        if validation['warnings']:
+            yield json.dumps({"status": "warning", "message": f"{len(validation['warnings'])} pre-flight warnings", "validation": validation})
+        
+        # Initialize handlers
+        browser_handler = BrowserHandler()
+        form_handler = FormHandler(progress_queue)  # Pass the request-specific queue
+        
+        # Start processing in background task once a browser slot is free
+        run = runs.start(
+            "ds160",
+            lambda: form_handler.process_with_browser(browser_handler, form_data, page_definitions),
+            progress_queue,
+            detached=detached,
+        )
+        
+        # Stream updates from the queue
+        yield json.dumps({"status": "info", "message": "Starting DS-160 form processing...", "run_id": run.run_id})
+        
+        async for update in stream_task_updates(run, request):
+            yield update
         
     except Exception as e:
         logger.error(f"Error in DS-160 processing: {str(e)}", exc_info=True)
         yield json.dumps({"status": "error", "message": f"Processing failed: {str(e)}"})
 
+async def generate_sections(pdf_text: str, section_stream: SectionStream, progress_queue: asyncio.Queue) -> None:
+    """Generate YAML sections from PDF text and publish them as they complete"""
+    generated = {}
+
+    async def sections():
+        async for name, data in openai_handler.stream_yaml_sections(pdf_text):
+            generated[name] = data
+            if name in page_definitions and isinstance(data, dict):
+                problems = [issue for issue in preflight_validator.validate_page(name, data) if issue.severity == "error"]
+                if problems:
+                    await progress_queue.put({
+                        "status": "warning",
+                        "message": f"{name}: " + "; ".join(f"{issue.field}: {issue.message}" for issue in problems)
+                    })
+            await progress_queue.put({"status": "yaml_section", "message": f"Generated {name}", "section": name})
+            yield name, data
+
+    try:
+        await section_stream.consume(sections())
+        await progress_queue.put({
+            "status": "yaml_complete",
+            "message": f"YAML generation completed with {len(generated)} sections",
+            "yaml": yaml.dump(generated, default_flow_style=False, allow_unicode=True, sort_keys=False)
+        })
+    except Exception as e:
+        logger.error(f"YAML generation failed: {str(e)}", exc_info=True)
+        await progress_queue.put({"status": "warning", "message": f"YAML generation failed: {str(e)}"})
+
+async def process_pipeline_with_updates(content: bytes, pdf_text: str, request: Request, detached: bool = False,
+                                        queue: asyncio.Queue = None) -> AsyncGenerator[str, None]:
+    """Generate YAML and fill the DS-160 concurrently, yielding progress updates from both"""
+    progress_queue = queue or asyncio.Queue()
+    generation_task = None
+    run = None
+
+    try:
+        # The uploaded YAML only needs the start/retrieve/security sections,
+        # everything else comes from the PDF text as it is generated
+        form_data = yaml.safe_load(content) or {}
+        logger.info(f"Parsed pipeline YAML data with keys: {list(form_data.keys())}")
+        if 'start_page' not in form_data:
+            raise ValueError("Missing required section in YAML: start_page")
+
+        # Generated sections are checked as they stream in; the uploaded ones are checked now
+        validation = preflight_check(form_data)
+        if not validation['valid']:
+            yield json.dumps({"status": "error", "message": preflight_message(validation), "validation": validation})
+            return
+
+        section_stream = SectionStream()
+        generation_task = asyncio.create_task(generate_sections(pdf_text, section_stream, progress_queue))
+
+        browser_handler = BrowserHandler()
+        form_handler = FormHandler(progress_queue)
+        # Generation belongs to the run: it stops when the run ends, not when the listener leaves
+        run = runs.start(
+            "pipeline",
+            lambda: form_handler.process_with_browser(browser_handler, form_data, page_definitions, section_stream),
+            progress_queue,
+            detached=detached,
+            companions=[generation_task],
+        )
+
+        yield json.dumps({"status": "info", "message": "Starting YAML generation and DS-160 form processing...", "run_id": run.run_id})
+
+        async for update in stream_task_updates(run, request):
+            yield update
+
+    except Exception as e:
+        logger.error(f"Error in DS-160 pipeline: {str(e)}", exc_info=True)
+        yield json.dumps({"status": "error", "message": f"Processing failed: {str(e)}"})
+    finally:
+        # Only if the run never started; otherwise it cancels generation when it ends
+        if run is None and generation_task and not generation_task.done():
+            generation_task.cancel()
+
+@router.post("/validate")
+async def validate_ds160(file: UploadFile = File(...)):
+    """Check a DS-160 YAML against the form definitions without running the browser"""
+    try:
+        form_data = yaml.safe_load(await file.read())
+    except yaml.YAMLError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid YAML: {str(e)}")
+    return preflight_check(form_data)
+
+@router.post("/plan")
+async def plan_ds160(file: UploadFile = File(...)):
+    """Dry run: every browser action a DS-160 YAML would take and the estimated wall time"""
+    try:
+        form_data = yaml.safe_load(await file.read())
+    except yaml.YAMLError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid YAML: {str(e)}")
+    validation = preflight_check(form_data)
+    if not isinstance(form_data, dict):
+        return {"validation": validation}
+    plan = action_planner.summarize(action_planner.plan(form_data))
+    logger.info(f"Planned {plan['action_count']} actions, estimated {plan['estimated_seconds']}s")
+    return {"validation": validation, **plan}
+
 @router.post("/run-ds160")
-async def run_ds160(file: UploadFile = File(...)):
+async def run_ds160(request: Request, file: UploadFile = File(...), detached: bool = Form(False)):
+    """Fill the DS-160 and stream progress; the run is cancelled if the client disconnects unless detached"""
     try:
         logger.info(f"Received DS-160 request with filename: {file.filename}")
         content = await file.read()
@@ -151,10 +268,53 @@ async def run_ds160(file: UploadFile = File(...)):
         
         # Return a streaming response with the request-specific queue
         return StreamingResponse(
-            process_ds160_with_updates(content, request_queue),
+            process_ds160_with_updates(content, request, detached, request_queue),
             media_type="text/event-stream"
         )
             
     except Exception as e:
         logger.error(f"Unexpected error in DS-160 processing: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+
+@router.post("/run-pipeline")
+async def run_pipeline(request: Request, file: UploadFile = File(...), pdf_text: str = Form(...),
+                       detached: bool = Form(False)):
+    """Generate YAML from PDF text while the browser works through start, CAPTCHA and retrieve"""
+    try:
+        logger.info(f"Received DS-160 pipeline request with filename: {file.filename}, PDF text length: {len(pdf_text)}")
+        content = await file.read()
+
+        request_queue = asyncio.Queue()
+
+        return StreamingResponse(
+            process_pipeline_with_updates(content, pdf_text, request, detached, request_queue),
+            media_type="text/event-stream"
+        )
+
+    except Exception as e:
+        logger.error(f"Unexpected error in DS-160 pipeline: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+
+@router.get("/runs")
+async def list_runs():
+    """How many runs of each kind are in each status, counting those finished within the retention window
+
+    Run ids are not listed: the id returned to whoever started a run is what lets them
+    follow or cancel it, since these routes have no authentication."""
+    return runs.counts()
+
+@router.get("/runs/{run_id}")
+async def get_run(run_id: str):
+    """Status and recent progress of a run, e.g. one that continues detached"""
+    run = runs.get(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail=f"Unknown run: {run_id}")
+    return run.to_dict()
+
+@router.delete("/runs/{run_id}")
+async def cancel_run(run_id: str):
+    """Cancel a run; its browser is closed and it is recorded as aborted"""
+    run = runs.cancel(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail=f"Unknown run: {run_id}")
+    return {"run_id": run_id, "status": run.status}
@@ -0,0 +1,67 @@
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any, Optional, AsyncGenerator
+import json
+import logging
+import traceback
+from src.utils.intake_handler import IntakeHandler
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+intake_handler = IntakeHandler()
+
+async def stream_intake(files_data: Dict[str, bytes], linkedin_url: Optional[str],
+                        i94_data: Optional[Dict[str, Any]], metadata: Dict[str, Any]) -> AsyncGenerator[str, None]:
+    """Yield one JSON line per intake event"""
+    try:
+        async for event in intake_handler.process(files_data, linkedin_url, i94_data, metadata):
+            yield json.dumps(event) + "\n"
+    except Exception as e:
+        logger.error(f"Error in intake processing: {str(e)}", exc_info=True)
+        yield json.dumps({"status": "error", "message": f"Intake failed: {str(e)}"}) + "\n"
+
+@router.post("/process")
+async def process_intake(
+    passportFirst: Optional[UploadFile] = File(None),
+    passportLast: Optional[UploadFile] = File(None),
+    license: Optional[UploadFile] = File(None),
+    visa: Optional[UploadFile] = File(None),
+    travelTicket: Optional[UploadFile] = File(None),
+    linkedinUrl: Optional[str] = Form(None),
+    i94: Optional[str] = Form(None),
+    metadata: str = Form("{}")
+):
+    """Process passport, documents, LinkedIn and I94 sources concurrently in one request"""
+    try:
+        logger.info("Processing intake request")
+
+        # Parse metadata and I94 JSON
+        try:
+            metadata_dict = json.loads(metadata)
+            i94_data = json.loads(i94) if i94 else None
+        except json.JSONDecodeError:
+            raise HTTPException(status_code=400, detail="Invalid metadata or i94 format")
+
+        # Collect file content
+        files_data = {}
+        uploads = {
+            'passportFirst': passportFirst,
+            'passportLast': passportLast,
+            'license': license,
+            'visa': visa,
+            'travelTicket': travelTicket
+        }
+        for file_type, upload in uploads.items():
+            if upload:
+                files_data[file_type] = await upload.read()
+
+        return StreamingResponse(
+            stream_intake(files_data, linkedinUrl, i94_data, metadata_dict),
+            media_type="text/event-stream"
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        trace = traceback.format_exc()
+        logger.error(f"Error processing intake: {str(e)}\n{trace}")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,12 +1,19 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from .routes import ds160
 from .routes import linkedin
 from .routes import pdf  # Import the new route
 from .routes import i94
 from .routes import documents
 from .routes import passport
+from .routes import intake
+from src.utils.image_processing import shutdown_process_pool
+from src.utils.linkedin_session import close_session_pool
+from src.utils.logging_config import configure_logging, stop_logging
+# Same module the automation code records into (the ds160 routes put src/ on sys.path)
+from utils.telemetry import render_metrics, exporter as span_exporter
+from automation.run_registry import runs as ds160_runs
 import logging
 from logging.handlers import RotatingFileHandler
 import os
@@ -19,16 +26,12 @@ load_dotenv()
 log_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'logs')
 os.makedirs(log_dir, exist_ok=True)
 
-# Configure logging
+# Configure logging; the handlers write from a background thread, not the request's
 log_file = os.path.join(log_dir, 'ds160.log')
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(funcName)s - %(message)s',
-    handlers=[
-        RotatingFileHandler(log_file, maxBytes=10000000, backupCount=5),
-        logging.StreamHandler()  # This will still show logs in console too
-    ]
-)
+configure_logging([
+    RotatingFileHandler(log_file, maxBytes=10000000, backupCount=5),
+    logging.StreamHandler()  # This will still show logs in console too
+])
 logger = logging.getLogger(__name__)
 
 # Log environment variables availability
@@ -65,6 +68,11 @@ async def global_exception_handler(request: Request, exc: Exception):
 async def health_check():
     return {"status": "healthy"}
 
+# Prometheus scrape target
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 # Startup event
 @app.on_event("startup")
 async def startup_event():
@@ -74,6 +82,12 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("Shutting down DS-160 Automation API")
+    # Close the browsers of runs still in progress before the loop goes away
+    await ds160_runs.shutdown()
+    shutdown_process_pool()
+    await close_session_pool()
+    span_exporter.flush()
+    stop_logging()
 
 # Include routers
 app.include_router(ds160.router, prefix="/api/ds160", tags=["ds160"])
@@ -82,6 +96,7 @@ app.include_router(pdf.router, prefix="/api")
 app.include_router(i94.router, prefix="/api/i94", tags=["i94"])
 app.include_router(documents.router, prefix="/api/documents", tags=["documents"])
 app.include_router(passport.router, prefix="/api/passport", tags=["passport"])
+app.include_router(intake.router, prefix="/api/intake", tags=["intake"])
 @app.get("/")
 async def root():
     return {"message": "DS-160 Backend API"}
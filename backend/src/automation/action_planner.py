@@ -0,0 +1,392 @@
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Any, List, NamedTuple, Optional, Set, Tuple
+
+from mappings.form_mapping import FormMapping, FormPage, FORM_PAGE_ORDER, PAGE_SEQUENCE
+from automation.dependency_table import expand_definition
+from automation.field_model import row_field
+from automation.option_matcher import OptionMatcher
+from automation.preflight import get_nested_value
+
+logger = logging.getLogger(__name__)
+
+FILL = "fill"
+SELECT = "select"
+RADIO = "radio"
+CHECKBOX = "checkbox"
+NA_CHECKBOX = "na_checkbox"
+ADD_ROW = "add_row"
+CAPTCHA = "captcha"
+BUTTON = "button"
+NAVIGATE = "navigate"
+
+ACTION_KINDS = (FILL, SELECT, RADIO, CHECKBOX, NA_CHECKBOX, ADD_ROW, CAPTCHA, BUTTON, NAVIGATE)
+
+KIND_BY_FIELD_TYPE = {
+    'text': FILL,
+    'textarea': FILL,
+    'dropdown': SELECT,
+    'radio': RADIO,
+    'checkbox': CHECKBOX,
+}
+
+DEFAULT_LATENCY_PATH = Path(__file__).parent.parent / "logs" / "action_latencies.json"
+
+# Seconds per action until FormHandler has measured real ones; each includes the
+# fixed sleeps FormHandler takes inside that action (0.5s before a dropdown, 1s after a button)
+DEFAULT_LATENCIES = {
+    FILL: 0.15,
+    SELECT: 0.6,
+    RADIO: 0.1,
+    CHECKBOX: 0.3,
+    NA_CHECKBOX: 0.6,
+    ADD_ROW: 1.5,
+    CAPTCHA: 4.0,
+    BUTTON: 2.0,
+    NAVIGATE: 3.0,
+}
+
+# Fixed sleeps FormHandler takes outside any single action
+REVEAL_WAIT_SECONDS = 0.2       # before each field revealed by an earlier answer
+PAGE_OVERHEAD_SECONDS = 0.4     # fill_form start, after filling, after navigation buttons
+
+# Running means weigh at most this many samples so they follow the site's current speed
+LATENCY_WINDOW = 200
+
+
+def action_kind(field_type: str) -> str:
+    return KIND_BY_FIELD_TYPE.get(field_type, FILL)
+
+
+def required_group_rows(page_definition: Dict[str, Any], page_mappings: Dict[str, str],
+                        values: Dict[str, Any]) -> Dict[str, int]:
+    """Rows needed for each repeated group, by add button id, from the longest list among the group's fields"""
+    group_rows: Dict[str, int] = {}
+
+    def visit(fields: List[Dict[str, Any]], dependencies: Dict[str, Any]):
+        for field_def in fields:
+            add_button_id = field_def.get('add_group_button_id') if field_def else None
+            if add_button_id:
+                field_name = next((k for k, v in page_mappings.items()
+                                   if v == field_def['name'] or v == field_def['name'].replace('$', '_')), None)
+                if field_name:
+                    items = values.get(field_name.split('.')[0])
+                    if not isinstance(items, list):
+                        items = get_nested_value(values, field_name)
+                    if isinstance(items, list) and len(items) > group_rows.get(add_button_id, 0):
+                        group_rows[add_button_id] = len(items)
+        for dependency in (dependencies or {}).values():
+            visit(dependency.get('shows', []), dependency.get('dependencies', {}))
+
+    visit(page_definition['fields'], page_definition.get('dependencies', {}))
+    return group_rows
+
+
+class ActionLatencies:
+    """Mean seconds per action kind, measured by FormHandler and kept between runs"""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path or os.getenv('ACTION_LATENCY_PATH') or DEFAULT_LATENCY_PATH)
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path) as f:
+                self._stats = json.load(f)
+            logger.info(f"Loaded action latencies for {list(self._stats)} from {self.path}")
+        except Exception as e:
+            logger.error(f"Error loading action latencies {self.path}: {str(e)}")
+            self._stats = {}
+
+    def save(self) -> None:
+        """Write the measured means to disk, replacing the file atomically"""
+        if not self._stats:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix('.tmp')
+            with open(tmp_path, 'w') as f:
+                json.dump(self._stats, f, indent=2)
+            tmp_path.replace(self.path)
+        except Exception as e:
+            logger.error(f"Error saving action latencies {self.path}: {str(e)}")
+
+    def record(self, kind: str, seconds: float) -> None:
+        stats = self._stats.setdefault(kind, {"count": 0, "mean": 0.0})
+        stats["count"] = min(stats["count"] + 1, LATENCY_WINDOW)
+        stats["mean"] += (seconds - stats["mean"]) / stats["count"]
+
+    @contextmanager
+    def measure(self, kind: str):
+        """Record how long the enclosed action took; actions that raise are not recorded"""
+        start = time.perf_counter()
+        yield
+        self.record(kind, time.perf_counter() - start)
+
+    def get(self, kind: str) -> float:
+        stats = self._stats.get(kind)
+        if stats and stats.get("count"):
+            return stats["mean"]
+        return DEFAULT_LATENCIES.get(kind, 0.0)
+
+    def is_measured(self, kind: str) -> bool:
+        return bool(self._stats.get(kind, {}).get("count"))
+
+
+class PlannedAction(NamedTuple):
+    page: str
+    kind: str           # one of ACTION_KINDS
+    target: str         # element id, or page name for NAVIGATE
+    value: Any = None
+    wait: float = 0.0   # fixed sleep FormHandler takes before this action
+
+
+class ActionPlanner:
+    """Work out every browser action a run would take for an input YAML, without a browser
+
+    Follows process_form_pages and fill_form: entry pages, then each page in
+    PAGE_SEQUENCE with its mapped fields, the fields their answers reveal,
+    repeated group rows and the navigation buttons.
+    """
+
+    def __init__(self, page_definitions: Dict[str, Dict[str, Any]], form_mapping: Optional[FormMapping] = None,
+                 latencies: Optional[ActionLatencies] = None):
+        self.page_definitions = page_definitions
+        self.form_mapping = form_mapping or FormMapping()
+        self.latencies = latencies or ActionLatencies()
+        self.option_matcher = OptionMatcher()
+        self._expanded: Dict[str, Dict[str, Any]] = {}
+
+    def _definition(self, page_name: str) -> Optional[Dict[str, Any]]:
+        if page_name not in self._expanded and page_name in self.page_definitions:
+            self._expanded[page_name] = expand_definition(self.page_definitions[page_name])
+        return self._expanded.get(page_name)
+
+    def plan(self, form_data: Dict[str, Any]) -> List[PlannedAction]:
+        """Ordered actions for a whole run"""
+        actions, pending_wait = self._plan_entry_pages(form_data)
+        previous_page = None
+        for page_name in PAGE_SEQUENCE:
+            page_data = form_data.get(page_name)
+            if not isinstance(page_data, dict) or self._definition(page_name) is None:
+                continue
+            page_actions = self.plan_page(page_name, page_data)
+            if not self._arrives_at(previous_page, page_name, form_data):
+                page_actions.insert(0, PlannedAction(page_name, NAVIGATE, page_name))
+            if page_actions and pending_wait:
+                page_actions[0] = page_actions[0]._replace(wait=page_actions[0].wait + pending_wait)
+                pending_wait = 0.0
+            actions.extend(page_actions)
+            previous_page = page_name
+        return actions
+
+    def _arrives_at(self, previous_page: Optional[str], page_name: str, form_data: Dict[str, Any]) -> bool:
+        """Whether the previous page's last button click already lands on page_name"""
+        if previous_page not in FORM_PAGE_ORDER or page_name not in FORM_PAGE_ORDER:
+            return False
+        if FORM_PAGE_ORDER.index(page_name) != FORM_PAGE_ORDER.index(previous_page) + 1:
+            return False
+        clicks = form_data[previous_page].get('button_clicks') or []
+        buttons = self._definition(previous_page).get('buttons', [])
+        if not clicks or not isinstance(clicks[-1], int) or not 0 <= clicks[-1] < len(buttons):
+            return False
+        return str(buttons[clicks[-1]].get('value', '')).startswith('Next')
+
+    def _plan_entry_pages(self, form_data: Dict[str, Any]) -> Tuple[List[PlannedAction], float]:
+        """Start page and retrieve/security page actions, plus the sleep still due before the next action"""
+        actions: List[PlannedAction] = []
+        wait = 0.0
+
+        def add(page: str, kind: str, target: str, value: Any = None, sleep_after: float = 0.0):
+            nonlocal wait
+            actions.append(PlannedAction(page, kind, target, value, wait))
+            wait = sleep_after
+
+        start = FormPage.START.value
+        start_data = form_data.get(start) or {}
+        add(start, NAVIGATE, start, sleep_after=0.5)
+        add(start, SELECT, 'ctl00_ddlLanguage', start_data.get('language', 'English'), 0.5)
+        add(start, SELECT, 'ctl00_SiteContentPlaceHolder_ucLocation_ddlLocation',
+            start_data.get('location', 'HYDERABAD, INDIA'), 0.5)
+        add(start, CAPTCHA, 'ctl00_SiteContentPlaceHolder_ucLocation_IdentifyCaptcha1_txtCodeTextBox', sleep_after=0.5)
+        clicks = start_data.get('button_clicks') or [0]
+        add(start, BUTTON, self._button_id(self.page_definitions.get(start, {}), clicks[0]), sleep_after=1.0)
+
+        if clicks[0] == 0:
+            page = FormPage.SECURITY.value
+            data = form_data.get(page) or {}
+            if data.get('privacy_agreement'):
+                add(page, CHECKBOX, 'ctl00_SiteContentPlaceHolder_chkbxPrivacyAct', True, 1.0)
+            if data.get('security_question'):
+                add(page, SELECT, 'ctl00_SiteContentPlaceHolder_ddlQuestions', data['security_question'], 1.0)
+            if data.get('security_answer'):
+                add(page, FILL, 'ctl00_SiteContentPlaceHolder_txtAnswer', data['security_answer'], 1.0)
+        else:
+            page = FormPage.RETRIEVE.value
+            data = form_data.get(page) or {}
+            prefix = 'ctl00_SiteContentPlaceHolder_ApplicationRecovery1_'
+            add(page, FILL, f'{prefix}tbxApplicationID', data.get('application_id'))
+            add(page, BUTTON, self._button_id(self.page_definitions.get(page, {}), 0), sleep_after=1.0)
+            for field_id, key in (('txbSurname', 'surname'), ('txbDOBYear', 'year'), ('txbAnswer', 'security_answer')):
+                if data.get(key):
+                    add(page, FILL, f'{prefix}{field_id}', data[key])
+
+        page_clicks = data.get('button_clicks') or [0]
+        add(page, BUTTON, self._button_id(self.page_definitions.get(page, {}), page_clicks[-1]), sleep_after=2.0)
+        return actions, wait
+
+    def _button_id(self, definition: Dict[str, Any], index: Any) -> str:
+        buttons = definition.get('buttons', [])
+        if isinstance(index, int) and 0 <= index < len(buttons):
+            return buttons[index]['id']
+        return f"button[{index}]"
+
+    def plan_page(self, page_name: str, page_data: Dict[str, Any]) -> List[PlannedAction]:
+        """Field and navigation actions for one page section"""
+        definition = self._definition(page_name)
+        if definition is None:
+            return []
+        page_mappings = self.form_mapping.form_mapping.get(page_name, {})
+        # First YAML path wins, as in FormHandler._process_field_and_dependencies
+        field_names: Dict[str, str] = {}
+        for path, element_id in page_mappings.items():
+            field_names.setdefault(element_id, path)
+
+        walk = _PageWalk(self, page_name, page_data, page_mappings, field_names,
+                         required_group_rows(definition, page_mappings, page_data))
+        for field_def in definition['fields']:
+            walk.field(field_def, definition.get('dependencies', {}), revealed=False)
+
+        for index in page_data.get('button_clicks') or []:
+            walk.actions.append(PlannedAction(page_name, BUTTON, self._button_id(definition, index)))
+        return walk.actions
+
+    def estimate(self, actions: List[PlannedAction]) -> float:
+        """Expected seconds for the actions, from measured latencies where available"""
+        pages = {action.page for action in actions if action.page in FORM_PAGE_ORDER}
+        seconds = sum(self.latencies.get(action.kind) + action.wait for action in actions)
+        return seconds + PAGE_OVERHEAD_SECONDS * len(pages)
+
+    def summarize(self, actions: List[PlannedAction]) -> Dict[str, Any]:
+        """Counts and time estimates overall and per page, plus the ordered actions"""
+        pages: Dict[str, List[PlannedAction]] = {}
+        for action in actions:
+            pages.setdefault(action.page, []).append(action)
+
+        def counts(page_actions: List[PlannedAction]) -> Dict[str, int]:
+            found: Dict[str, int] = {}
+            for action in page_actions:
+                found[action.kind] = found.get(action.kind, 0) + 1
+            return found
+
+        return {
+            "estimated_seconds": round(self.estimate(actions), 1),
+            "action_count": len(actions),
+            "counts": counts(actions),
+            "pages": [
+                {
+                    "page": page,
+                    "action_count": len(page_actions),
+                    "counts": counts(page_actions),
+                    "estimated_seconds": round(self.estimate(page_actions), 1),
+                }
+                for page, page_actions in pages.items()
+            ],
+            "latencies": {
+                kind: {"seconds": round(self.latencies.get(kind), 3), "measured": self.latencies.is_measured(kind)}
+                for kind in ACTION_KINDS
+            },
+            "actions": [action._asdict() for action in actions],
+        }
+
+
+class _PageWalk:
+    """Actions for one page, collected the way FormHandler visits fields"""
+
+    def __init__(self, planner: ActionPlanner, page_name: str, page_data: Dict[str, Any],
+                 page_mappings: Dict[str, str], field_names: Dict[str, str], group_rows: Dict[str, int]):
+        self.planner = planner
+        self.page_name = page_name
+        self.page_data = page_data
+        self.page_mappings = page_mappings
+        self.field_names = field_names
+        self.group_rows = group_rows
+        self.expanded_groups: Set[str] = set()
+        self.processed: Set[str] = set()
+        self.actions: List[PlannedAction] = []
+
+    def field(self, field_def: Dict[str, Any], dependencies: Dict[str, Any], revealed: bool) -> None:
+        field_id = field_def['name']
+        if field_id in self.processed:
+            return
+        field_name = self.field_names.get(field_id) or self.field_names.get(field_id.replace('$', '_'))
+        if not field_name:
+            return
+
+        wait = REVEAL_WAIT_SECONDS if revealed else 0.0
+        value = get_nested_value(self.page_data, field_name)
+        if isinstance(value, list) and value:
+            self.value(field_name, field_def, value[0], 0, wait)
+            add_button_id = field_def.get('add_group_button_id')
+            if add_button_id and len(value) > 1:
+                if add_button_id not in self.expanded_groups:
+                    self.expanded_groups.add(add_button_id)
+                    # The page starts with one row
+                    for _ in range(1, self.group_rows.get(add_button_id, 1)):
+                        self.actions.append(PlannedAction(self.page_name, ADD_ROW, add_button_id))
+                for idx in range(1, len(value)):
+                    self.value(field_name, row_field(field_def, idx), value[idx], idx, 0.0)
+        else:
+            self.value(field_name, field_def, value, None, wait)
+        self.processed.add(field_id)
+
+        if field_def['type'] == 'radio':
+            button_id = field_def.get('button_ids', {}).get(str(value))
+            dependency_key = f"{button_id}.{value}" if button_id else None
+        else:
+            dependency_key = f"{field_id}.{value}"
+        dependency = (dependencies or {}).get(dependency_key)
+        if dependency:
+            for dependent_field in dependency.get('shows', []):
+                if dependent_field:
+                    self.field(dependent_field, dependency.get('dependencies', {}), revealed=True)
+
+    def value(self, field_name: str, field_def: Dict[str, Any], value: Any, array_index: Optional[int],
+              wait: float) -> None:
+        """Actions FormHandler._fill_field takes for one value"""
+        base_field = field_name.split('.')[0]
+        na_value = get_nested_value(self.page_data, f"{field_name}_na")
+        if na_value is None:
+            na_value = get_nested_value(self.page_data, f"{base_field}_na")
+        if isinstance(na_value, list) and array_index is not None:
+            na_value = na_value[array_index] if array_index < len(na_value) else None
+
+        if na_value is not None:
+            na_field_id = self.page_mappings.get(f"{field_name}_na") or self.page_mappings.get(f"{base_field}_na")
+            if na_field_id:
+                if array_index:
+                    na_field_id = na_field_id.replace('_ctl00_', f'_ctl{array_index:02d}_')
+                self.actions.append(PlannedAction(self.page_name, NA_CHECKBOX, na_field_id,
+                                                  str(na_value).lower() == 'true', wait))
+                wait = 0.0
+        if na_value and str(na_value).lower() == 'true':
+            return
+
+        field_type = field_def['type']
+        target = field_def['name']
+        if field_type == 'radio' and isinstance(value, str):
+            target = field_def.get('button_ids', {}).get(value)
+            if not target:
+                return
+        if field_type == 'dropdown' and value not in (None, ''):
+            match = self.planner.option_matcher.resolve(field_def, value)
+            if match:
+                value = match.option
+        self.actions.append(PlannedAction(self.page_name, action_kind(field_type), target, value, wait))
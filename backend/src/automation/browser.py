@@ -2,6 +2,8 @@ from playwright.async_api import async_playwright, Browser, Page
 from typing import Optional, Dict, Any
 import logging
 from mappings.form_mapping import FormMapping, FormPage
+from automation.session_capture import SessionRecorder, SessionReplayer, RECORD_DIR, REPLAY_DIR
+from utils.telemetry import span, BROWSER_SESSIONS_ACTIVE
 import os
 from dotenv import load_dotenv
 from PIL import Image
@@ -11,7 +13,8 @@ import io
 logger = logging.getLogger(__name__)
 
 class BrowserHandler:
-    def __init__(self):
+    def __init__(self, record_dir: Optional[str] = None, replay_dir: Optional[str] = None,
+                 replay_time_scale: Optional[float] = None):
         # Check environment variable for headless mode setting
         self.headless = os.environ.get("HEADLESS_BROWSER", "true").lower() == "true"
         logger.info(f"Browser running in headless mode: {self.headless}")
@@ -26,36 +29,82 @@ class BrowserHandler:
         # Load base URL from environment
         load_dotenv()
         self.base_url = os.getenv('DS160_BASE_URL', 'https://ceac.state.gov/GenNIV/Default.aspx')
+
+        # Offline fixtures: record the session as HAR + DOM snapshots, or serve a recorded one
+        self.record = bool(record_dir or RECORD_DIR)
+        self.record_dir = record_dir
+        self.replay_dir = replay_dir or REPLAY_DIR
+        self.replay_time_scale = replay_time_scale
+        self.recorder: Optional[SessionRecorder] = None
+        self.replayer: Optional[SessionReplayer] = None
     
     async def __aenter__(self):
         """Async context manager entry"""
-        self.playwright, self.browser, self.context = await self.launch_browser()
-        self.page = await self.context.new_page()
-        # Set default timeout after page is initialized
-        self.page.set_default_timeout(self.page_timeout)
+        if self.replay_dir:
+            self.replayer = SessionReplayer(self.replay_dir, self.replay_time_scale)
+        elif self.record:
+            self.recorder = SessionRecorder(self.record_dir)
+        try:
+            await self.launch_browser()
+            self.page = await self.context.new_page()
+            # Set default timeout after page is initialized
+            self.page.set_default_timeout(self.page_timeout)
+        except BaseException:
+            # __aexit__ is not called when entry fails or is cancelled; don't leave Chromium behind
+            await self.__aexit__(None, None, None)
+            raise
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        """Async context manager exit"""
-        if self.browser:
-            await self.browser.close()
-        if self.playwright:
-            await self.playwright.stop()
+        """Async context manager exit; every step runs even if an earlier one fails or the run was cancelled"""
+        browser, playwright, context = self.browser, self.playwright, self.context
+        self.browser = self.playwright = self.context = None
+        try:
+            if self.recorder and context:
+                # Playwright writes the HAR when the context closes
+                await context.close()
+                self.recorder.save_manifest()
+        finally:
+            try:
+                if browser:
+                    BROWSER_SESSIONS_ACTIVE.dec(pool="ds160")
+                    await browser.close()
+            finally:
+                if playwright:
+                    await playwright.stop()
         
     async def launch_browser(self):
-        playwright = await async_playwright().start()
-        browser = await playwright.chromium.launch(
+        # Kept on self as each piece starts, so a failure part way can still be cleaned up
+        self.playwright = await async_playwright().start()
+        self.browser = await self.playwright.chromium.launch(
             headless=self.headless,
             args=[
                 '--window-size=1920,1080',
                 '--disable-blink-features=AutomationControlled'
             ]
         )
-        context = await browser.new_context(
+        BROWSER_SESSIONS_ACTIVE.inc(pool="ds160")
+        self.context = await self.browser.new_context(
             viewport={'width': 1920, 'height': 1080},
-            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36'
+            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36',
+            **(self.recorder.context_options() if self.recorder else {})
         )
-        return playwright, browser, context
+        if self.replayer:
+            await self.replayer.attach(self.context)
+        return self.playwright, self.browser, self.context
+
+    async def snapshot(self, label: str) -> None:
+        """Save the current DOM when recording, no-op otherwise"""
+        if self.recorder:
+            await self.recorder.snapshot(self.page, label)
+
+    def replayed_captcha(self) -> Optional[str]:
+        """CAPTCHA answer from the recording being replayed, if any"""
+        return self.replayer.next_captcha() if self.replayer else None
+
+    def record_captcha(self, text: str) -> None:
+        if self.recorder:
+            self.recorder.record_captcha(text)
 
     async def navigate(self, url: str):
         """Navigate to URL with error handling"""
@@ -249,10 +298,12 @@ class BrowserHandler:
             raise
 
     async def select_dropdown_option(self, selector: str, value: str) -> None:
+        """Select the option whose value or visible text is value, in a single call"""
         try:
             element = await self.page.wait_for_selector(selector, timeout=self.default_timeout)
             if element:
-                await element.select_option(value=value)
+                # Definitions list option texts; some dropdowns use the same string as the value, others a code
+                await element.select_option(value=value, label=value)
             else:
                 logger.warning(f"Dropdown {selector} not found after {self.default_timeout/1000} seconds")
         except TimeoutError:
@@ -282,8 +333,9 @@ class BrowserHandler:
     async def wait(self, seconds: float):
         """Wait for specified number of seconds"""
         try:
-            await self.page.wait_for_timeout(seconds * 1000)  # Convert to milliseconds
-            logging.debug(f"Completed {seconds} second wait")
+            with span("wait", seconds=seconds):
+                await self.page.wait_for_timeout(seconds * 1000)  # Convert to milliseconds
+            logger.debug("Completed %s second wait", seconds)
         except Exception as e:
             logging.error(f"Wait failed: {str(e)}")
             raise
@@ -291,7 +343,8 @@ class BrowserHandler:
     async def click(self, selector: str):
         """Click an element"""
         try:
-            await self.page.click(selector)
+            with span("click", selector=selector):
+                await self.page.click(selector)
             #self.page.wait_for_selector(selector, timeout=self.default_timeout)
             logging.info(f"Clicked element: {selector}")
             return True
@@ -0,0 +1,93 @@
+import hashlib
+import json
+import logging
+from typing import Dict, Any
+
+logger = logging.getLogger(__name__)
+
+# Marks a page definition whose "shows" entries are references into field_table
+COMPACT_FORMAT = "compact-dependencies"
+
+
+def _field_hash(field: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(field, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+
+def compact_definition(definition: Dict[str, Any]) -> Dict[str, Any]:
+    """Store every distinct field definition once and refer to it by key
+
+    Fields are keyed by their id; when the same id shows up with different
+    contents (e.g. a dropdown whose options depend on a parent selection)
+    later variants get an "#n" suffix.
+    """
+    if definition.get('format') == COMPACT_FORMAT:
+        return definition
+
+    field_table: Dict[str, Dict[str, Any]] = {}
+    refs_by_hash: Dict[str, str] = {}
+
+    def ref(field: Dict[str, Any]) -> str:
+        digest = _field_hash(field)
+        if digest in refs_by_hash:
+            return refs_by_hash[digest]
+        key = field['name']
+        variant = 1
+        while key in field_table:
+            variant += 1
+            key = f"{field['name']}#{variant}"
+        field_table[key] = field
+        refs_by_hash[digest] = key
+        return key
+
+    def compact_dependencies(dependencies: Dict[str, Any]) -> Dict[str, Any]:
+        compacted = {}
+        for key, dependency in (dependencies or {}).items():
+            compacted[key] = {
+                'shows': [ref(field) for field in dependency.get('shows', []) if field],
+                'hides': dependency.get('hides', []),
+                'dependencies': compact_dependencies(dependency['dependencies']) if dependency.get('dependencies') else None
+            }
+        return compacted
+
+    fields = [ref(field) for field in definition.get('fields', [])]
+    dependencies = compact_dependencies(definition.get('dependencies', {}))
+
+    return {
+        'format': COMPACT_FORMAT,
+        'field_table': field_table,
+        'fields': fields,
+        'dependencies': dependencies,
+        'buttons': definition.get('buttons', [])
+    }
+
+
+def expand_definition(definition: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn a compact definition back into the standard fields/dependencies/buttons form
+
+    Standard definitions are returned unchanged.
+    """
+    if definition.get('format') != COMPACT_FORMAT:
+        return definition
+
+    field_table = definition.get('field_table', {})
+
+    def resolve(ref: str) -> Dict[str, Any]:
+        if ref not in field_table:
+            raise KeyError(f"Field {ref} missing from dependency table")
+        return field_table[ref]
+
+    def expand_dependencies(dependencies: Dict[str, Any]) -> Dict[str, Any]:
+        expanded = {}
+        for key, dependency in (dependencies or {}).items():
+            expanded[key] = {
+                'shows': [resolve(ref) for ref in dependency.get('shows', [])],
+                'hides': dependency.get('hides', []),
+                'dependencies': expand_dependencies(dependency['dependencies']) if dependency.get('dependencies') else None
+            }
+        return expanded
+
+    return {
+        'fields': [resolve(ref) for ref in definition.get('fields', [])],
+        'dependencies': expand_dependencies(definition.get('dependencies', {})),
+        'buttons': definition.get('buttons', [])
+    }
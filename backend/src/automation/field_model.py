@@ -0,0 +1,207 @@
+import sys
+from collections.abc import Mapping
+from dataclasses import dataclass, fields as dataclass_fields
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Dict, Iterator, Optional, Tuple, Union
+
+from automation.dependency_table import expand_definition
+
+ROW_MARKER = '_ctl00_'
+
+_EMPTY: Mapping = MappingProxyType({})
+
+
+@lru_cache(maxsize=4096)
+def row_id(element_id: str, row: int) -> str:
+    """Element id of a repeated group's row; ids are interned so rows share one string per process"""
+    if not row:
+        return element_id
+    return sys.intern(element_id.replace(ROW_MARKER, f'_ctl{row:02d}_'))
+
+
+class _ReadOnlyMapping(Mapping):
+    """Dict-style reads for the slotted models, so code written against the JSON dicts keeps working
+
+    A key is present when its attribute is not None, mirroring which keys the JSON had."""
+    __slots__ = ()
+    _keys: Tuple[str, ...] = ()
+    _key_set: frozenset = frozenset()
+
+    def __getitem__(self, key: str) -> Any:
+        value = getattr(self, key, None) if key in self._key_set else None
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = getattr(self, key, None) if key in self._key_set else None
+        return default if value is None else value
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._key_set and getattr(self, key, None) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        return (key for key in self._keys if getattr(self, key, None) is not None)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __bool__(self) -> bool:
+        # Checked for every field ("if field:"); a model is never empty, don't count its keys
+        return True
+
+    # Definitions are shared and immutable, identity is equality
+    __eq__ = object.__eq__
+    __hash__ = object.__hash__
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class FieldDef(_ReadOnlyMapping):
+    """One form control from the page definitions
+
+    value holds the option tuple for dropdowns and radios, the default text otherwise;
+    identical option lists (countries, states, days) are one shared tuple."""
+    name: str
+    type: str
+    value: Union[str, Tuple[str, ...], None] = None
+    labels: Optional[Tuple[str, ...]] = None
+    button_ids: Optional[Mapping] = None
+    maxlength: Optional[int] = None
+    optional: Optional[bool] = None
+    has_na_checkbox: Optional[bool] = None
+    na_checkbox_id: Optional[str] = None
+    na_checkbox_text: Optional[str] = None
+    add_group: Optional[bool] = None
+    add_group_button_id: Optional[str] = None
+    label: Optional[str] = None
+    text_phrase: Optional[str] = None
+    parent_text_phrase: Optional[str] = None
+    help_text: Optional[str] = None
+    help_text_phrase: Optional[str] = None
+
+    def at_row(self, row: int) -> Union["FieldDef", "FieldRow"]:
+        """The field as it appears in row `row` of its repeated group, without copying it"""
+        return FieldRow(self, row) if row else self
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class FieldRow(_ReadOnlyMapping):
+    """View of a FieldDef in a later row of a repeated group: only the ids differ"""
+    field: FieldDef
+    row: int
+
+    @property
+    def name(self) -> str:
+        return row_id(self.field.name, self.row)
+
+    @property
+    def na_checkbox_id(self) -> Optional[str]:
+        return row_id(self.field.na_checkbox_id, self.row) if self.field.na_checkbox_id else None
+
+    def __getattr__(self, key: str) -> Any:
+        return getattr(self.field, key)
+
+    def at_row(self, row: int) -> Union[FieldDef, "FieldRow"]:
+        return self.field.at_row(row)
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class DependencyDef(_ReadOnlyMapping):
+    """Fields a trigger value reveals, and the triggers nested under them"""
+    shows: Tuple[FieldDef, ...] = ()
+    hides: Tuple[Any, ...] = ()
+    dependencies: Optional[Mapping] = None
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class PageDef(_ReadOnlyMapping):
+    """A page definition in expanded form, safe to share between concurrent runs"""
+    fields: Tuple[FieldDef, ...]
+    dependencies: Mapping
+    buttons: Tuple[Mapping, ...]
+
+
+for _model, _keys in (
+    (FieldDef, tuple(f.name for f in dataclass_fields(FieldDef))),
+    (DependencyDef, ('shows', 'hides', 'dependencies')),
+    (PageDef, ('fields', 'dependencies', 'buttons')),
+):
+    _model._keys, _model._key_set = _keys, frozenset(_keys)
+FieldRow._keys, FieldRow._key_set = FieldDef._keys, FieldDef._key_set
+
+
+def row_field(field_def: Mapping, row: int) -> Mapping:
+    """Row view of a FieldDef, or a copy with row ids for a plain dict definition"""
+    if isinstance(field_def, (FieldDef, FieldRow)):
+        return field_def.at_row(row)
+    transformed = dict(field_def)
+    for key in ('name', 'na_checkbox_id'):
+        if transformed.get(key):
+            transformed[key] = row_id(transformed[key], row)
+    return transformed
+
+
+class _ModelBuilder:
+    """Converts JSON definitions, sharing strings, option tuples and identical fields across pages"""
+
+    def __init__(self):
+        self._tuples: Dict[Tuple, Tuple] = {}
+        self._fields: Dict[Tuple, FieldDef] = {}
+
+    def _tuple(self, items) -> Tuple:
+        shared = tuple(sys.intern(item) if isinstance(item, str) else item for item in items)
+        return self._tuples.setdefault(shared, shared)
+
+    def field(self, raw: Dict[str, Any]) -> FieldDef:
+        values: Dict[str, Any] = {}
+        for key in FieldDef._keys:
+            value = raw.get(key)
+            if isinstance(value, list):
+                value = self._tuple(value)
+            elif isinstance(value, dict):
+                value = MappingProxyType({sys.intern(k): sys.intern(v) for k, v in value.items()})
+            elif isinstance(value, str) and (key == 'name' or key.endswith('_id') or key == 'type'):
+                value = sys.intern(value)
+            values[key] = value
+        values['maxlength'] = int(values['maxlength']) if str(values['maxlength'] or '').isdigit() else None
+
+        # Same control on several pages or under several triggers: build it once
+        key = tuple(
+            tuple(sorted(value.items())) if isinstance(value, Mapping) else value
+            for value in values.values()
+        )
+        if key not in self._fields:
+            self._fields[key] = FieldDef(**values)
+        return self._fields[key]
+
+    def dependencies(self, raw: Optional[Dict[str, Any]]) -> Mapping:
+        if not raw:
+            return _EMPTY
+        return MappingProxyType({
+            sys.intern(key): DependencyDef(
+                shows=tuple(self.field(field) for field in dependency.get('shows') or [] if field),
+                hides=self._tuple(dependency.get('hides') or []),
+                dependencies=self.dependencies(dependency.get('dependencies')) if dependency.get('dependencies') else None,
+            )
+            for key, dependency in raw.items() if dependency
+        })
+
+    def page(self, definition: Dict[str, Any]) -> PageDef:
+        definition = expand_definition(definition)
+        return PageDef(
+            fields=tuple(self.field(field) for field in definition.get('fields', []) if field),
+            dependencies=self.dependencies(definition.get('dependencies')),
+            buttons=tuple(MappingProxyType(dict(button)) for button in definition.get('buttons', [])),
+        )
+
+
+_builder = _ModelBuilder()
+
+
+def build_page_models(page_definitions: Dict[str, Dict[str, Any]]) -> Dict[str, PageDef]:
+    """Immutable models of loaded page definitions; models already built are passed through"""
+    return {
+        page_name: definition if isinstance(definition, PageDef) else _builder.page(definition)
+        for page_name, definition in page_definitions.items()
+    }
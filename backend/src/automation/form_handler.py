@@ -1,10 +1,18 @@
 from typing import Dict, Any, List, Set
 import logging
 from enum import Enum
-from mappings.form_mapping import FormMapping, FormPage
+from mappings.form_mapping import FormMapping, FormPage, PAGE_SEQUENCE
+from automation.field_model import PageDef, build_page_models, row_field
+from automation.preflight import get_nested_value
+from automation.option_matcher import OptionMatcher
+from automation.action_planner import (
+    ActionLatencies, ActionPlanner, required_group_rows, action_kind, ADD_ROW, BUTTON, CAPTCHA, NA_CHECKBOX, NAVIGATE
+)
+from automation.http_form_engine import HttpFormEngine, UnsupportedPageError
 import json
 import os
 from utils.openai_handler import OpenAIHandler
+from utils.telemetry import span, PAGE_FILL_SECONDS, QUEUE_WAIT_SECONDS
 import time
 from mappings.page_mappings.personal_page1_mapping import form_mapping as personal_page1_mapping
 # Import other page mappings...
@@ -13,6 +21,16 @@ from playwright.async_api import async_playwright
 
 logger = logging.getLogger(__name__)
 
+# Option indexes are built once per process and shared by every run
+option_matcher = OptionMatcher()
+# Measured action timings feed the dry-run planner's time estimates
+action_latencies = ActionLatencies()
+
+# Post application pages over HTTP with the browser's session instead of typing into them
+HTTP_ENGINE_ENABLED = os.getenv('DS160_HTTP_ENGINE', 'false').lower() == 'true'
+# Pages the HTTP engine may fill (comma separated); empty means every page
+HTTP_ENGINE_PAGES = {page.strip() for page in os.getenv('DS160_HTTP_ENGINE_PAGES', '').split(',') if page.strip()}
+
 class FormHandler:
     def __init__(self, progress_queue=None):
         self.field_values = {}
@@ -20,10 +38,13 @@ class FormHandler:
         self.current_page = None
         self.application_id = None
         self.page_errors = {}  # Track errors by page
-        self.processed_array_indices = {}
+        self.group_rows = {}  # Rows each repeated group needs on the current page, by add button id
+        self.expanded_groups = set()  # Add buttons whose rows are already on the page
         self.completed_pages = set()  # Track successfully completed pages
         self.errored_pages = set()  # Track pages with errors
         self.skipped_pages = set()  # Track skipped pages
+        self.option_corrections = {}  # Dropdown values changed to a matching option, by page
+        self.http_engine = None  # HttpFormEngine sharing the browser session, when DS160_HTTP_ENGINE is on
         # Initialize OpenAIHandler without arguments
         self.openai_handler = OpenAIHandler()  # Changed from OpenAIHandler(self)
         
@@ -34,11 +55,27 @@ class FormHandler:
     def set_browser(self, browser):
         self.browser = browser
 
-    async def process_form_pages(self, test_data: dict, page_definitions: dict) -> None:
-        """Process all form pages in sequence"""
+    async def process_form_pages(self, test_data: dict, page_definitions: dict, section_stream=None) -> None:
+        """Process all form pages in sequence
+
+        If a section_stream is given, pages missing from test_data are awaited from it
+        so form filling can start while the YAML is still being generated."""
+        with span("run", streamed=section_stream is not None) as run_span:
+            try:
+                await self._process_form_pages(test_data, page_definitions, section_stream)
+            finally:
+                run_span.set_attributes(
+                    completed=len(self.completed_pages),
+                    errored=len(self.errored_pages),
+                    skipped=len(self.skipped_pages),
+                )
+
+    async def _process_form_pages(self, test_data: dict, page_definitions: dict, section_stream=None) -> None:
         try:
             # Store original test_data for recovery
             self.test_data = test_data
+            # Immutable models are shared as they are; raw JSON definitions are converted once per run
+            page_definitions = build_page_models(page_definitions)
             self.page_definitions = page_definitions
             
             async def handle_timeout_recovery(current_page):
@@ -78,6 +115,9 @@ class FormHandler:
                         await self.browser.page.wait_for_load_state("networkidle")
                         await self.browser.wait(1)
 
+                if self.http_engine:
+                    await self.http_engine.refresh_cookies(self.browser)
+
             # Handle start/retrieve/security pages first
             await self.send_progress("Starting DS-160 process...")
             logger.info("Processing start page...")
@@ -99,35 +139,30 @@ class FormHandler:
             await self.send_progress(f"{second_page} completed successfully")
             await self.browser.wait(1)
 
+            if HTTP_ENGINE_ENABLED:
+                # CAPTCHA is done, the rest of the session can be driven over HTTP
+                self.http_engine = await HttpFormEngine.from_browser(self.browser)
+                self.action_planner = ActionPlanner(page_definitions, latencies=action_latencies)
+                logger.info("HTTP form engine enabled for application pages")
+
             # Get form mapping for URLs
             form_mapping = FormMapping()
 
             # Process remaining pages in sequence
-            page_sequence = [
-                FormPage.PERSONAL1.value,  # p1
-                # FormPage.PERSONAL2.value,  # p2
-                # FormPage.TRAVEL.value,  # p3
-                # FormPage.TRAVEL_COMPANIONS.value,  # p4
-                # FormPage.PREVIOUS_TRAVEL.value,  # p5
-                # FormPage.ADDRESS_PHONE.value,  # p6
-                # FormPage.PPTVISA.value,  # p7
-                # FormPage.USCONTACT.value,  # p8
-                # FormPage.RELATIVES.value,  # p9
-                FormPage.SPOUSE.value,  # p18
-                # FormPage.WORK_EDUCATION1.value,  # p10
-                # FormPage.WORK_EDUCATION2.value,  # p11
-                # FormPage.WORK_EDUCATION3.value,  # p12
-                # FormPage.SECURITY_BACKGROUND1.value,  # p13
-                # FormPage.SECURITY_BACKGROUND2.value,  # p14
-                # FormPage.SECURITY_BACKGROUND3.value,  # p15
-                # FormPage.SECURITY_BACKGROUND4.value,  # p16
-                # FormPage.SECURITY_BACKGROUND5.value  # p17
-            ]
+            page_sequence = PAGE_SEQUENCE
 
             for page_name in page_sequence:
                 retry_count = 0
                 max_retries = 3
                 
+                if section_stream is not None and page_name not in test_data:
+                    logger.info(f"Waiting for {page_name} data from YAML generation...")
+                    await self.send_progress(f"Waiting for {page_name} data...")
+                    with QUEUE_WAIT_SECONDS.time(queue="yaml_section"):
+                        section = await section_stream.get(page_name)
+                    if section is not None:
+                        test_data[page_name] = section
+
                 while retry_count < max_retries:
                     try:
                         if page_name not in test_data:
@@ -136,36 +171,51 @@ class FormHandler:
                             self.skipped_pages.add(page_name)
                             break
 
-                        # Navigate to page URL first
-                        page_url = form_mapping.page_urls.get(page_name)
-                        if page_url:
-                            # Check if we're already on the correct page
-                            current_url = self.browser.page.url
-                            if not current_url.endswith(page_url.split('/')[-1]):
-                                logger.info(f"Navigating to {page_url}")
-                                #await self.send_progress(f"Navigating to {page_name}...")
-                                await self.browser.navigate(page_url)
-                                await self.browser.page.wait_for_load_state("networkidle")
-                                await self.browser.wait(0.3)
-                            else:
-                                logger.info(f"Already on correct page: {page_url}")
-                        else:
-                            logger.warning(f"No URL found for page {page_name}")
-                            await self.send_progress(f"Error: No URL found for page {page_name}")
-                            break
-
-                        logger.info(f"Processing {page_name}...")
-                        await self.send_progress(f"Processing {page_name}...")
-                        self.current_page = page_name
-                        self.field_values = test_data[page_name]
+                        with span("page", page=page_name, attempt=retry_count) as page_span:
+                            # Experimental: post the page without the browser, which takes over if the engine can't
+                            has_errors = None
+                            engine = "http"
+                            started = time.perf_counter()
+                            if self.http_engine and (not HTTP_ENGINE_PAGES or page_name in HTTP_ENGINE_PAGES):
+                                has_errors = await self._fill_page_over_http(page_name)
+
+                            if has_errors is None:
+                                engine = "browser"
+                                # Navigate to page URL first
+                                page_url = form_mapping.page_urls.get(page_name)
+                                if page_url:
+                                    # Check if we're already on the correct page
+                                    current_url = self.browser.page.url
+                                    if not current_url.endswith(page_url.split('/')[-1]):
+                                        logger.info(f"Navigating to {page_url}")
+                                        #await self.send_progress(f"Navigating to {page_name}...")
+                                        with action_latencies.measure(NAVIGATE):
+                                            await self.browser.navigate(page_url)
+                                            await self.browser.page.wait_for_load_state("networkidle")
+                                            await self.browser.wait(0.3)
+                                    else:
+                                        logger.info(f"Already on correct page: {page_url}")
+                                else:
+                                    logger.warning(f"No URL found for page {page_name}")
+                                    await self.send_progress(f"Error: No URL found for page {page_name}")
+                                    break
+
+                                logger.info(f"Processing {page_name}...")
+                                await self.send_progress(f"Processing {page_name}...")
+                                self.current_page = page_name
+                                self.field_values = test_data[page_name]
                         
-                        # Fill form and handle navigation
-                        await self.fill_form(page_definitions[page_name])
-                        await self.browser.wait(0.1)
+                                # Fill form and handle navigation
+                                await self.fill_form(page_definitions[page_name])
+                                await self.browser.snapshot(page_name)
+                                await self.browser.wait(0.1)
                         
-                        # Process navigation and detect errors
-                        has_errors = await self.handle_page_navigation(page_definitions[page_name])
-                        await self.browser.wait(0.1)
+                                # Process navigation and detect errors
+                                has_errors = await self.handle_page_navigation(page_definitions[page_name])
+                                await self.browser.wait(0.1)
+
+                            page_span.set_attributes(engine=engine, errors=len(self.page_errors.get(page_name, [])))
+                            PAGE_FILL_SECONDS.observe(time.perf_counter() - started, page=page_name, engine=engine)
                         
                         # Handle the result based on whether errors were detected
                         if has_errors:
@@ -247,6 +297,14 @@ class FormHandler:
             else:
                 await self.send_progress("DS-160 form completed successfully with no errors!", status="success")
 
+            if self.option_corrections:
+                corrections = [
+                    f"{page}.{c['field']}: {c['value']!r} -> {c['option']!r} ({c['method']})"
+                    for page, page_corrections in self.option_corrections.items()
+                    for c in page_corrections
+                ]
+                await self.send_progress(f"Corrected {len(corrections)} dropdown values:\n" + "\n".join(corrections))
+
             # Send final completion message
             await self.send_progress("DS-160 processing complete", status="complete", 
                                     summary={
@@ -260,6 +318,11 @@ class FormHandler:
             logger.error(f"Error processing forms: {str(e)}")
             await self.send_progress(f"Error processing forms: {str(e)}", status="error")
             raise
+        finally:
+            action_latencies.save()
+            if self.http_engine:
+                await self.http_engine.close()
+                self.http_engine = None
 
     async def handle_page_navigation(self, page_definition: dict) -> bool:
         """Handle standard page navigation including continue page handling
@@ -270,8 +333,9 @@ class FormHandler:
             for i, button_index in enumerate(button_clicks):
                 button = page_definition['buttons'][button_index]
                 logger.info(f"Clicking button: {button['value']}")
-                await self.browser.click(f"#{button['id']}")
-                await self.browser.wait(1)
+                with action_latencies.measure(BUTTON):
+                    await self.browser.click(f"#{button['id']}")
+                    await self.browser.wait(1)
                 
                 # Check for validation errors
                 error_messages = []
@@ -324,7 +388,8 @@ class FormHandler:
     async def handle_field(self, field_id: str, field_type: str, value: Any) -> None:
         try:
             selector = f"#{field_id}"
-            logger.info(f"field_id: {field_id} field_type: {field_type} value: {value}")
+            logger.debug("field_id: %s field_type: %s value: %s", field_id, field_type, value,
+                         extra={'page': self.current_page, 'field_type': field_type})
 
             if field_type in ['text', 'textarea']:
                 await self.browser.fill_input(selector, str(value))
@@ -384,7 +449,14 @@ class FormHandler:
                 
                 logger.info("Got CAPTCHA image, sending to OpenAI for solving...")
                 #await self.send_progress("Solving CAPTCHA with OpenAI...", status="info")
-                captcha_text = await self.openai_handler.solve_captcha(captcha_base64)
+                captcha_text = self.browser.replayed_captcha()
+                if captcha_text:
+                    logger.info("Using the CAPTCHA answer from the replayed session")
+                else:
+                    with span("captcha.solve", image_bytes=len(captcha_base64)), action_latencies.measure(CAPTCHA):
+                        captcha_text = await self.openai_handler.solve_captcha(captcha_base64)
+                    if captcha_text:
+                        self.browser.record_captcha(captcha_text)
                 if not captcha_text:
                     logger.error("Failed to get CAPTCHA solution from OpenAI")
                     #await self.send_progress("Failed to get CAPTCHA solution, retrying...", status="warning")
@@ -470,15 +542,24 @@ class FormHandler:
         """Get the current value of a field"""
         return self.field_values.get(field_name)
 
-    async def fill_form(self, page_definition: dict) -> None:
+    async def fill_form(self, page_definition: PageDef) -> None:
         try:
             form_mapping = FormMapping()
             # Just use current_page directly since form_mapping now uses string keys
             page_mappings = form_mapping.form_mapping.get(self.current_page, {})
-            logger.info(f"page: {self.current_page} mappings: {page_mappings}")
-            logger.info(f"page_definition: {page_definition}")
-            logger.info(f"field values: {self.field_values}")
+            logger.info("Filling %s: %d fields, %d mapped", self.current_page, len(page_definition['fields']),
+                        len(page_mappings), extra={'page': self.current_page})
+            # Full dumps run to hundreds of KB with the option lists, so they are only formatted at DEBUG
+            logger.debug("page: %s mappings: %s", self.current_page, page_mappings)
+            logger.debug("page_definition: %s", page_definition)
+            logger.debug("field values: %s", self.field_values)
             
+            # Work out every repeated group's row count before touching the page
+            self.group_rows = required_group_rows(page_definition, page_mappings, self.field_values)
+            self.expanded_groups = set()
+            if self.group_rows:
+                logger.info(f"Repeated groups on {self.current_page}: {self.group_rows}")
+
             processed_fields = set()
             await self.browser.wait(0.2)
             for field_def in page_definition['fields']:
@@ -510,39 +591,19 @@ class FormHandler:
 
         # Get the value to check if it's an array
         value = await self._get_nested_value(field_name)
-        logger.info(f"field_name: {field_name} value: {value}")
+        logger.debug("field_name: %s value: %s", field_name, value, extra={'page': self.current_page, 'field': field_name})
 
         if isinstance(value, list) and value:
             logger.info(f"Processing array field {field_name} with {len(value)} items")
-            array_name = field_name.split('.')[0]
             
             # Process first element with index 0
             await self._fill_field(field_name, field_def, value[0], page_mappings, array_index=0)
             
-            # For remaining elements, check if fields exist before clicking add button
+            # Add all the group's rows at once the first time any of its fields is reached
             add_button_id = field_def.get('add_group_button_id')
             if add_button_id and len(value) > 1:
+                await self._expand_group(add_button_id, field_def['name'])
                 for idx in range(1, len(value)):
-                    if array_name not in self.processed_array_indices:
-                        self.processed_array_indices[array_name] = set()
-                    
-                    if idx not in self.processed_array_indices[array_name]:
-                        # Check if first field for this index exists
-                        new_field_id = field_def['name'].replace('_ctl00_', f'_ctl{idx:02d}_')
-                        field_exists = await self.browser.page.evaluate(f"""() => {{
-                            return !!document.getElementById('{new_field_id}');
-                        }}""")
-                        
-                        if not field_exists:
-                            logger.info(f"Clicking add group button {add_button_id} for item {idx}")
-                            await self.browser.click(f"#{add_button_id}")
-                            await self.browser.wait(1)
-                        else:
-                            logger.info(f"Field for index {idx} already exists, skipping add group button")
-                        
-                        self.processed_array_indices[array_name].add(idx)
-                    
-                    # Process the field for this index
                     transformed_field_def = self._transform_field_ids(field_def, idx)
                     await self._fill_field(field_name, transformed_field_def, value[idx], page_mappings, array_index=idx)
         else:
@@ -561,15 +622,17 @@ class FormHandler:
             # For other fields, use the field ID and value directly
             dependency_key = f"{field_id}.{value}"
 
-        logger.info(f"Checking dependencies for key: {dependency_key}")
-        logger.info(f"Available dependencies: {list(dependencies.keys()) if dependencies else 'None'}")
+        logger.debug("Checking dependencies for key: %s", dependency_key)
+        logger.debug("Available dependencies: %s", dependencies.keys() if dependencies else None)
         
         if dependencies and dependency_key in dependencies:
-            logger.info(f"Found dependencies for {dependency_key}: {dependencies[dependency_key]}")
             dependency_data = dependencies[dependency_key]
+            logger.info("Found %d dependent fields for %s", len(dependency_data.get('shows') or []), dependency_key,
+                        extra={'page': self.current_page, 'field': field_name})
+            logger.debug("Dependencies for %s: %s", dependency_key, dependency_data)
             for dependent_field in dependency_data.get('shows', []):
                 if dependent_field:
-                    logger.info(f"Processing dependent field: {dependent_field}")
+                    logger.debug("Processing dependent field: %s", dependent_field['name'])
                     await self.browser.wait(0.2)
                     await self._process_field_and_dependencies(
                         dependent_field,
@@ -578,7 +641,61 @@ class FormHandler:
                         processed_fields
                     )
         else:
-            logger.info(f"No dependencies found for {dependency_key}")
+            logger.debug("No dependencies found for %s", dependency_key)
+
+    async def _expand_group(self, add_button_id: str, sample_field_id: str) -> None:
+        """Make sure a repeated group has all the rows the YAML needs, clicking add only for missing ones"""
+        if add_button_id in self.expanded_groups:
+            return
+        self.expanded_groups.add(add_button_id)
+        required = self.group_rows.get(add_button_id, 1)
+
+        # Rows share an id apart from the _ctlNN_ index, e.g. ..._dtlPREV_US_VISIT_ctl01_tbxPREV_US_VISIT_DTEYear
+        prefix, _, suffix = sample_field_id.partition('_ctl00_')
+        count_rows = f"""() => document.querySelectorAll('[id^="{prefix}_ctl"][id$="_{suffix}"]').length"""
+        existing = await self.browser.page.evaluate(count_rows)
+
+        for idx in range(existing, required):
+            logger.info(f"Clicking add group button {add_button_id} for row {idx}")
+            started = time.perf_counter()
+            await self.browser.click(f"#{add_button_id}")
+            # Wait for the postback to render the new row instead of sleeping a fixed time
+            try:
+                await self.browser.page.wait_for_selector(
+                    f"#{prefix}_ctl{idx:02d}_{suffix}", state="attached", timeout=self.browser.page_timeout
+                )
+                action_latencies.record(ADD_ROW, time.perf_counter() - started)
+            except Exception as e:
+                logger.warning(f"Row {idx} of group {add_button_id} did not appear: {str(e)}")
+                break
+
+        if existing < required:
+            rows = await self.browser.page.evaluate(count_rows)
+            if rows < required:
+                logger.warning(f"Group {add_button_id} has {rows} rows, {required} needed")
+            else:
+                logger.info(f"Group {add_button_id} expanded from {existing} to {rows} rows")
+
+    async def _fill_page_over_http(self, page_name: str) -> Any:
+        """Fill and submit a page with the HTTP engine; returns whether it had errors, or None if the browser must do it"""
+        page_url = FormMapping().page_urls.get(page_name)
+        if not page_url:
+            return None
+        self.current_page = page_name
+        self.field_values = self.test_data[page_name]
+        await self.send_progress(f"Processing {page_name}...")
+        actions = self.action_planner.plan_page(page_name, self.field_values)
+        try:
+            result = await self.http_engine.fill_page(page_name, page_url, actions)
+        except UnsupportedPageError as e:
+            logger.warning(f"HTTP engine can't fill {page_name}, using the browser: {str(e)}")
+            await self.http_engine.sync_cookies_to(self.browser)
+            return None
+
+        if result['errors']:
+            self.page_errors.setdefault(page_name, []).extend(result['errors'])
+            logger.warning(f"Validation errors found on {page_name}: {result['errors']}")
+        return bool(result['errors'])
 
     async def _fill_field(self, field_name: str, field_def: Dict[str, Any], value: Any, 
                          page_mappings: Dict[str, str], array_index: int = None) -> None:
@@ -605,7 +722,7 @@ class FormHandler:
         if isinstance(na_value, list) and array_index is not None:
             na_value = na_value[array_index] if array_index < len(na_value) else None
         
-        logger.info(f"processing {field_name} with value: {value} and na_value: {na_value}")
+        logger.debug("processing %s with value: %s and na_value: %s", field_name, value, na_value)
         
         # Process NA checkbox if present
         if na_value is not None:
@@ -617,47 +734,35 @@ class FormHandler:
                     na_field_id = na_field_id.replace('_ctl00_', f'_ctl{array_index:02d}_')
                 
                 should_check = str(na_value).lower() == 'true'
-                logger.info(f"processing na_field_id: {na_field_id} with value: {na_value} and should_check: {should_check}")
-                await self.handle_field(na_field_id, 'checkbox', should_check)
+                logger.debug("processing na_field_id: %s with value: %s and should_check: %s", na_field_id, na_value, should_check)
+                with span("field", page=self.current_page, field=f"{field_name}_na", field_type='checkbox'), \
+                        action_latencies.measure(NA_CHECKBOX):
+                    await self.handle_field(na_field_id, 'checkbox', should_check)
         
         # Only fill value if not NA
         if not na_value or str(na_value).lower() != 'true':
-            await self.handle_field(field_id, field_def['type'], value)
+            if field_def['type'] == 'dropdown' and value not in (None, ''):
+                value = self._resolve_option(field_name, field_def, value)
+            with span("field", page=self.current_page, field=field_name, field_type=field_def['type']), \
+                    action_latencies.measure(action_kind(field_def['type'])):
+                await self.handle_field(field_id, field_def['type'], value)
+
+    def _resolve_option(self, field_name: str, field_def: Dict[str, Any], value: Any) -> Any:
+        """Map a YAML value onto the dropdown's exact option text before touching the browser"""
+        match = option_matcher.resolve(field_def, value)
+        if match is None:
+            logger.warning(f"No option matches {value!r} for {field_name}, trying it as given")
+            return value
+        if match.corrected:
+            logger.info(f"Dropdown {field_name}: {value!r} -> {match.option!r} ({match.method})")
+            self.option_corrections.setdefault(self.current_page, []).append(
+                {"field": field_name, "value": value, "option": match.option, "method": match.method}
+            )
+        return match.option
 
     async def _get_nested_value(self, field_name: str) -> Any:
         """Get value from nested YAML structure using dot notation, handling arrays"""
-        parts = field_name.split('.')
-        value = self.field_values
-        
-        # If requesting just the array itself (e.g., license_details)
-        if len(parts) == 1:
-            return value.get(parts[0])
-        
-        # Handle array access
-        array_name = parts[0]
-        if array_name in value and isinstance(value[array_name], list):
-            array = value[array_name]
-            remaining_parts = parts[1:]
-            
-            # Extract nested values from each array item
-            result = []
-            for item in array:
-                current = item
-                for part in remaining_parts:
-                    if not isinstance(current, dict):
-                        break
-                    current = current.get(part)
-                if current is not None:
-                    result.append(current)
-            return result
-        
-        # Handle regular nested field access
-        for part in parts:
-            if not value or not isinstance(value, dict):
-                return None
-            value = value.get(part)
-        
-        return value
+        return get_nested_value(self.field_values, field_name)
 
     async def handle_retrieve_page(self, form_data: dict) -> bool:
         """Handle either retrieve or security page process"""
@@ -824,18 +929,8 @@ class FormHandler:
             raise
 
     def _transform_field_ids(self, field_def: Dict[str, Any], index: int) -> Dict[str, Any]:
-        """Transform field IDs by replacing _ctl00_ with _ctlXX_ in the middle of the ID"""
-        new_def = field_def.copy()
-        
-        # Transform the main field ID
-        if 'name' in new_def:
-            new_def['name'] = new_def['name'].replace('_ctl00_', f'_ctl{index:02d}_')
-        
-        # Also transform any na_checkbox_id if present
-        if 'na_checkbox_id' in new_def:
-            new_def['na_checkbox_id'] = new_def['na_checkbox_id'].replace('_ctl00_', f'_ctl{index:02d}_')
-        
-        return new_def
+        """Field as it appears in row index, with _ctl00_ replaced by _ctlXX_ in its IDs"""
+        return row_field(field_def, index)
 
     # Add a helper method to send progress updates
     async def send_progress(self, message, status="info", application_id=None, summary=None):
@@ -853,13 +948,20 @@ class FormHandler:
             await self.progress_queue.put(progress_data)
             
     # Add a new method to run with browser context manager
-    async def process_with_browser(self, browser_handler, test_data, page_definitions):
-        """Process form with a browser context manager and report progress"""
-        async with browser_handler as browser:
-            self.set_browser(browser)
-            await self.send_progress("Browser initialized and ready")
-            await self.process_form_pages(test_data, page_definitions)
-            await self.send_progress("DS-160 form processing completed", status="complete")
+    async def process_with_browser(self, browser_handler, test_data, page_definitions, section_stream=None):
+        """Process form with a browser context manager and report progress
+
+        Cancelling the calling task stops at the next await, closes the browser and re-raises."""
+        try:
+            async with browser_handler as browser:
+                self.set_browser(browser)
+                await self.send_progress("Browser initialized and ready")
+                await self.process_form_pages(test_data, page_definitions, section_stream)
+                await self.send_progress("DS-160 form processing completed", status="complete")
+        except asyncio.CancelledError:
+            logger.warning("DS-160 processing cancelled after %d completed pages", len(self.completed_pages))
+            await self.send_progress("DS-160 processing cancelled", status="aborted")
+            raise
         return True
 
     async def start(self):
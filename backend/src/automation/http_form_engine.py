@@ -0,0 +1,337 @@
+import logging
+import re
+from html.parser import HTMLParser
+from typing import Dict, Any, List, NamedTuple, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+import httpx
+
+from utils.telemetry import span
+from automation.action_planner import (
+    PlannedAction, FILL, SELECT, RADIO, CHECKBOX, NA_CHECKBOX, ADD_ROW, BUTTON, NAVIGATE
+)
+
+logger = logging.getLogger(__name__)
+
+REQUEST_TIMEOUT_SECONDS = 30
+CONTINUE_BUTTON_ID = "ctl00_btnContinueApp"
+
+# Target of javascript:__doPostBack('ctl00$...','') in href, onclick or onchange (quotes may be escaped)
+POSTBACK_PATTERN = re.compile(r"""__doPostBack\(\\?['"]([^'"\\]+)""")
+
+# Input types a browser never submits unless they are the clicked button
+BUTTON_INPUT_TYPES = ('submit', 'button', 'image', 'reset')
+
+
+class HttpEngineError(Exception):
+    """A request failed or returned something the engine can't work with"""
+
+
+class UnsupportedPageError(HttpEngineError):
+    """The page needs something only a browser can do; fill it with BrowserHandler instead"""
+
+
+class SessionExpiredError(HttpEngineError):
+    """CEAC answered with the timeout or start page"""
+
+
+class ParsedPage(NamedTuple):
+    url: str
+    fields: Dict[str, str]              # name -> value a browser would submit as the page stands
+    controls: Dict[str, Dict[str, Any]]  # element id -> name, type, value and options
+    postbacks: Dict[str, str]           # element id -> __EVENTTARGET its click or change posts
+    errors: List[str]                   # visible validation messages
+
+
+class _FormParser(HTMLParser):
+    """Collect WebForm controls, hidden state and validation messages from a page"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.fields: Dict[str, str] = {}
+        self.controls: Dict[str, Dict[str, Any]] = {}
+        self.postbacks: Dict[str, str] = {}
+        self.errors: List[str] = []
+        self._select: Optional[Dict[str, Any]] = None
+        self._option: Optional[Dict[str, Any]] = None
+        self._textarea: Optional[Dict[str, Any]] = None
+        self._summary_depth = 0     # >0 while inside .validation-summary-errors
+        self._div_depth = 0
+        self._error_span: Optional[List[str]] = None
+        self._item: Optional[List[str]] = None
+
+    def _postback(self, element_id: Optional[str], attrs: Dict[str, Any]) -> None:
+        for key in ('onclick', 'onchange', 'href'):
+            match = POSTBACK_PATTERN.search(attrs.get(key) or '')
+            if match and element_id:
+                self.postbacks[element_id] = match.group(1)
+                return
+
+    def handle_starttag(self, tag: str, attrs_list):
+        attrs = dict(attrs_list)
+        element_id = attrs.get('id')
+        name = attrs.get('name')
+        disabled = 'disabled' in attrs
+        css = (attrs.get('class') or '').split()
+
+        if tag == 'div':
+            self._div_depth += 1
+            if 'validation-summary-errors' in css and not self._summary_depth:
+                self._summary_depth = self._div_depth
+        elif tag == 'li' and self._summary_depth:
+            self._item = []
+        elif tag == 'span' and 'error-message' in css:
+            style = (attrs.get('style') or '').replace(' ', '').lower()
+            if 'display:none' not in style and 'visibility:hidden' not in style:
+                self._error_span = []
+        elif tag == 'input':
+            input_type = (attrs.get('type') or 'text').lower()
+            value = attrs.get('value') or ''
+            if element_id:
+                self.controls[element_id] = {'name': name, 'type': input_type, 'value': value}
+            if name and not disabled and input_type not in BUTTON_INPUT_TYPES:
+                if input_type in ('radio', 'checkbox'):
+                    if 'checked' in attrs:
+                        self.fields[name] = value or 'on'
+                else:
+                    self.fields[name] = value
+            self._postback(element_id, attrs)
+        elif tag == 'textarea':
+            self._textarea = {'id': element_id, 'name': name, 'disabled': disabled, 'text': []}
+        elif tag == 'select':
+            self._select = {'id': element_id, 'name': name, 'disabled': disabled, 'options': [], 'selected': None}
+            self._postback(element_id, attrs)
+        elif tag == 'option' and self._select is not None:
+            self._option = {'value': attrs.get('value'), 'selected': 'selected' in attrs, 'text': []}
+        elif tag == 'a':
+            match = POSTBACK_PATTERN.search(attrs.get('href') or '')
+            if match and element_id:
+                self.controls[element_id] = {'name': match.group(1), 'type': 'link', 'value': ''}
+                self.postbacks[element_id] = match.group(1)
+
+    def handle_data(self, data: str):
+        if self._textarea is not None:
+            self._textarea['text'].append(data)
+        if self._option is not None:
+            self._option['text'].append(data)
+        if self._item is not None:
+            self._item.append(data)
+        if self._error_span is not None:
+            self._error_span.append(data)
+
+    def handle_endtag(self, tag: str):
+        if tag == 'div':
+            if self._summary_depth == self._div_depth:
+                self._summary_depth = 0
+            self._div_depth -= 1
+        elif tag == 'li' and self._item is not None:
+            text = ''.join(self._item).strip()
+            if text:
+                self.errors.append(text)
+            self._item = None
+        elif tag == 'span' and self._error_span is not None:
+            text = ''.join(self._error_span).strip()
+            if text:
+                self.errors.append(text)
+            self._error_span = None
+        elif tag == 'textarea' and self._textarea is not None:
+            textarea = self._textarea
+            text = ''.join(textarea['text'])
+            if textarea['id']:
+                self.controls[textarea['id']] = {'name': textarea['name'], 'type': 'textarea', 'value': text}
+            if textarea['name'] and not textarea['disabled']:
+                self.fields[textarea['name']] = text
+            self._textarea = None
+        elif tag == 'option' and self._option is not None:
+            label = ''.join(self._option['text']).strip()
+            value = self._option['value'] if self._option['value'] is not None else label
+            self._select['options'].append((value, label))
+            if self._option['selected']:
+                self._select['selected'] = value
+            self._option = None
+        elif tag == 'select' and self._select is not None:
+            select = self._select
+            if select['id']:
+                self.controls[select['id']] = {'name': select['name'], 'type': 'select', 'value': '',
+                                               'options': select['options']}
+            if select['name'] and not select['disabled'] and select['options']:
+                self.fields[select['name']] = select['selected'] if select['selected'] is not None else select['options'][0][0]
+            self._select = None
+
+
+def parse_page(html: str, url: str) -> ParsedPage:
+    """Read the submittable state of a WebForm page"""
+    parser = _FormParser()
+    parser.feed(html)
+    parser.close()
+    return ParsedPage(url, parser.fields, parser.controls, parser.postbacks, parser.errors)
+
+
+class HttpFormEngine:
+    """Fill DS-160 pages by posting the WebForm directly, reusing a browser session's cookies
+
+    Experimental alternative to typing into Chromium: each page is one GET, one POST
+    per auto-postback control or added row, and one POST per navigation button.
+    CAPTCHA and anything the engine doesn't recognise stay with BrowserHandler;
+    UnsupportedPageError tells the caller to fall back.
+    """
+
+    def __init__(self, cookies: Optional[List[Dict[str, Any]]] = None, user_agent: Optional[str] = None,
+                 origin: Optional[str] = None):
+        self.origin = origin
+        headers = {'User-Agent': user_agent} if user_agent else {}
+        self.client = httpx.AsyncClient(headers=headers, follow_redirects=True, timeout=REQUEST_TIMEOUT_SECONDS)
+        self.set_cookies(cookies or [])
+        self.requests = 0
+        self.last_page: Optional[ParsedPage] = None
+
+    @classmethod
+    async def from_browser(cls, browser, origin: Optional[str] = None) -> "HttpFormEngine":
+        """Engine sharing the ASP.NET session of a BrowserHandler that is past the CAPTCHA"""
+        cookies = await browser.context.cookies()
+        user_agent = await browser.page.evaluate("() => navigator.userAgent")
+        return cls(cookies, user_agent, origin)
+
+    def set_cookies(self, cookies: List[Dict[str, Any]]) -> None:
+        for cookie in cookies:
+            self.client.cookies.set(cookie['name'], cookie['value'],
+                                    domain=cookie.get('domain', ''), path=cookie.get('path', '/'))
+
+    async def refresh_cookies(self, browser) -> None:
+        """Pick up a new session after the browser recovered from a timeout"""
+        self.client.cookies.clear()
+        self.set_cookies(await browser.context.cookies())
+        self.last_page = None
+
+    async def sync_cookies_to(self, browser) -> None:
+        """Give the browser any cookies the server set on our requests before it takes over"""
+        cookies = [
+            {'name': cookie.name, 'value': cookie.value, 'domain': cookie.domain, 'path': cookie.path or '/'}
+            for cookie in self.client.cookies.jar
+        ]
+        if cookies:
+            await browser.context.add_cookies(cookies)
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    def _url(self, url: str) -> str:
+        if not self.origin:
+            return url
+        origin = urlsplit(self.origin)
+        parts = urlsplit(url)
+        return urlunsplit((origin.scheme, origin.netloc, parts.path, parts.query, parts.fragment))
+
+    def _page(self, response: httpx.Response) -> ParsedPage:
+        self.requests += 1
+        url = str(response.url)
+        path = urlsplit(url).path
+        if path.endswith("SessionTimedOut.aspx") or path.endswith("Default.aspx"):
+            raise SessionExpiredError(f"Session timeout, server returned {path}")
+        if response.status_code >= 400:
+            raise HttpEngineError(f"{response.request.method} {path} returned {response.status_code}")
+        self.last_page = parse_page(response.text, url)
+        return self.last_page
+
+    async def load(self, url: str) -> ParsedPage:
+        """GET a page, reusing the last response when a Next button already landed on it"""
+        url = self._url(url)
+        if self.last_page and urlsplit(self.last_page.url)[2:4] == urlsplit(url)[2:4]:
+            return self.last_page
+        return self._page(await self.client.get(url))
+
+    async def post(self, page: ParsedPage, fields: Dict[str, str], event_target: str = '',
+                   submit: Optional[Dict[str, Any]] = None) -> ParsedPage:
+        """Post the form back as a browser would for a control's postback or a clicked submit button"""
+        data = dict(fields)
+        data['__EVENTTARGET'] = event_target
+        data['__EVENTARGUMENT'] = ''
+        if submit:
+            data[submit['name']] = submit['value']
+        with span("http.post", target=event_target or submit['name'], url=page.url) as post_span:
+            response = await self.client.post(page.url, data=data)
+            post_span.set_attributes(status=response.status_code, bytes=len(response.content))
+        return self._page(response)
+
+    async def fill_page(self, page_name: str, url: str, actions: List[PlannedAction]) -> Dict[str, Any]:
+        """Apply one page's planned actions; returns the status dict with any validation errors"""
+        requests_before = self.requests
+        page = await self.load(url)
+        fields = dict(page.fields)
+        errors: List[str] = []
+        buttons = [action for action in actions if action.kind == BUTTON]
+
+        for action in actions:
+            if action.kind == NAVIGATE:
+                continue
+            control = page.controls.get(action.target)
+            if control is None or not control.get('name'):
+                raise UnsupportedPageError(f"{page_name}: {action.kind} target {action.target} is not on the page")
+            name = control['name']
+
+            if action.kind == FILL:
+                fields[name] = '' if action.value is None else str(action.value)
+            elif action.kind == SELECT:
+                value = self._option_value(page_name, action, control)
+                if value is None:
+                    continue
+                fields[name] = value
+            elif action.kind == RADIO:
+                fields[name] = control['value']
+            elif action.kind in (CHECKBOX, NA_CHECKBOX):
+                if bool(action.value):
+                    fields[name] = control['value'] or 'on'
+                else:
+                    fields.pop(name, None)
+            elif action.kind == ADD_ROW:
+                page = await self._click(page, fields, action.target, control)
+                fields = dict(page.fields)
+                continue
+            elif action.kind == BUTTON:
+                page = await self._click(page, fields, action.target, control)
+                errors.extend(page.errors)
+                if action is not buttons[-1] and CONTINUE_BUTTON_ID in page.controls:
+                    logger.info("Continue page detected, posting Continue Application")
+                    page = await self._click(page, page.fields, CONTINUE_BUTTON_ID, page.controls[CONTINUE_BUTTON_ID])
+                fields = dict(page.fields)
+                continue
+            else:
+                raise UnsupportedPageError(f"{page_name}: no HTTP handling for {action.kind}")
+
+            # Auto-postback controls re-render the page to show or hide dependent fields
+            if action.target in page.postbacks:
+                page = await self.post(page, fields, event_target=page.postbacks[action.target])
+                fields = dict(page.fields)
+
+        logger.info(f"Filled {page_name} over HTTP with {self.requests - requests_before} requests")
+        return {
+            "status": "warning" if errors else "success",
+            "errors": errors,
+            "requests": self.requests - requests_before,
+            "url": page.url,
+        }
+
+    async def _click(self, page: ParsedPage, fields: Dict[str, str], element_id: str,
+                     control: Dict[str, Any]) -> ParsedPage:
+        if control['type'] in BUTTON_INPUT_TYPES:
+            return await self.post(page, fields, submit=control)
+        if element_id in page.postbacks:
+            return await self.post(page, fields, event_target=page.postbacks[element_id])
+        raise UnsupportedPageError(f"Don't know how to click {element_id} ({control['type']})")
+
+    def _option_value(self, page_name: str, action: PlannedAction, control: Dict[str, Any]) -> Optional[str]:
+        """Posted value of the option whose value or visible text is the planned value"""
+        wanted = '' if action.value is None else str(action.value)
+        for value, label in control.get('options', []):
+            if wanted in (value, label):
+                return value
+        if not wanted:
+            # Blank YAML values leave the dropdown as it is, like the browser path
+            return None
+        raise UnsupportedPageError(f"{page_name}: {wanted!r} is not an option of {action.target}")
@@ -0,0 +1,220 @@
+import bisect
+import logging
+import re
+import unicodedata
+from typing import Dict, Any, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+EXACT = "exact"
+NORMALIZED = "normalized"
+ABBREVIATION = "abbreviation"
+PREFIX = "prefix"
+FUZZY = "fuzzy"
+
+# Shortest input tried for prefix matching; shorter ones are too ambiguous
+MIN_PREFIX_LENGTH = 3
+
+US_STATE_ABBREVIATIONS = {
+    "AL": "ALABAMA", "AK": "ALASKA", "AS": "AMERICAN SAMOA", "AZ": "ARIZONA", "AR": "ARKANSAS",
+    "CA": "CALIFORNIA", "CO": "COLORADO", "CT": "CONNECTICUT", "DE": "DELAWARE",
+    "DC": "DISTRICT OF COLUMBIA", "FL": "FLORIDA", "GA": "GEORGIA", "GU": "GUAM", "HI": "HAWAII",
+    "ID": "IDAHO", "IL": "ILLINOIS", "IN": "INDIANA", "IA": "IOWA", "KS": "KANSAS", "KY": "KENTUCKY",
+    "LA": "LOUISIANA", "ME": "MAINE", "MD": "MARYLAND", "MA": "MASSACHUSETTS", "MI": "MICHIGAN",
+    "MN": "MINNESOTA", "MS": "MISSISSIPPI", "MO": "MISSOURI", "MT": "MONTANA", "NE": "NEBRASKA",
+    "NV": "NEVADA", "NH": "NEW HAMPSHIRE", "NJ": "NEW JERSEY", "NM": "NEW MEXICO", "NY": "NEW YORK",
+    "NC": "NORTH CAROLINA", "ND": "NORTH DAKOTA", "MP": "NORTHERN MARIANA ISLANDS", "OH": "OHIO",
+    "OK": "OKLAHOMA", "OR": "OREGON", "PA": "PENNSYLVANIA", "PR": "PUERTO RICO", "RI": "RHODE ISLAND",
+    "SC": "SOUTH CAROLINA", "SD": "SOUTH DAKOTA", "TN": "TENNESSEE", "TX": "TEXAS", "UT": "UTAH",
+    "VT": "VERMONT", "VI": "VIRGIN ISLANDS", "VA": "VIRGINIA", "WA": "WASHINGTON", "WV": "WEST VIRGINIA",
+    "WI": "WISCONSIN", "WY": "WYOMING",
+}
+
+# Names for a state that no prefix or spelling match can safely find ("WASHINGTON DC" is not WASHINGTON)
+US_STATE_ALIASES = {
+    "WASHINGTON DC": "DISTRICT OF COLUMBIA",
+    "WASHINGTON D.C.": "DISTRICT OF COLUMBIA",
+    "D.C.": "DISTRICT OF COLUMBIA",
+}
+
+# Full month names, for dropdowns that list months as JAN, FEB, ...
+MONTH_ABBREVIATIONS = {
+    "JANUARY": "JAN", "FEBRUARY": "FEB", "MARCH": "MAR", "APRIL": "APR", "MAY": "MAY", "JUNE": "JUN",
+    "JULY": "JUL", "AUGUST": "AUG", "SEPTEMBER": "SEP", "SEPT": "SEP", "OCTOBER": "OCT", "NOVEMBER": "NOV", "DECEMBER": "DEC",
+}
+
+# Common names the country dropdowns spell differently
+COUNTRY_ALIASES = {
+    "US": "UNITED STATES OF AMERICA",
+    "USA": "UNITED STATES OF AMERICA",
+    "UNITED STATES": "UNITED STATES OF AMERICA",
+    "UK": "UNITED KINGDOM",
+    "GREAT BRITAIN": "UNITED KINGDOM",
+    "UAE": "UNITED ARAB EMIRATES",
+    "SOUTH KOREA": "KOREA, REPUBLIC OF (SOUTH)",
+    "NORTH KOREA": "KOREA, DEMOCRATIC REPUBLIC OF (NORTH)",
+    "RUSSIAN FEDERATION": "RUSSIA",
+    "CZECHIA": "CZECH REPUBLIC",
+    "IVORY COAST": "COTE D`IVOIRE",
+    "MYANMAR": "BURMA",
+    "VATICAN": "HOLY SEE (VATICAN CITY)",
+}
+
+# Option texts ending in a code such as "(H1B)" can be chosen by the code alone
+TRAILING_CODE = re.compile(r'\(([A-Z0-9/ ]+)\)\s*$')
+
+
+def normalize(text: Any) -> str:
+    """Uppercase, strip accents and drop punctuation and spaces so cosmetic differences don't matter"""
+    text = unicodedata.normalize('NFKD', str(text))
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    text = re.sub(r'[^A-Z0-9]+', '', text.upper())
+    # Day and month numbers: "1" and "01" are the same option
+    return str(int(text)) if text.isdigit() else text
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance, giving up early once it exceeds limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+_STATE_KEYS = {normalize(code): name for code, name in {**US_STATE_ABBREVIATIONS, **US_STATE_ALIASES}.items()}
+_MONTH_KEYS = {normalize(name): abbreviation for name, abbreviation in MONTH_ABBREVIATIONS.items()}
+_COUNTRY_KEYS = {normalize(alias): name for alias, name in COUNTRY_ALIASES.items()}
+
+
+class OptionMatch(NamedTuple):
+    option: str     # exact option text from the page definition
+    method: str     # EXACT, NORMALIZED, ABBREVIATION, PREFIX or FUZZY
+
+    @property
+    def corrected(self) -> bool:
+        return self.method != EXACT
+
+
+class OptionIndex:
+    """Lookup structure for one dropdown's option list"""
+
+    def __init__(self, options: List[str]):
+        self.options = [str(option) for option in options]
+        self._exact = set(self.options)
+        self._normalized: Dict[str, str] = {}
+        for option in self.options:
+            self._normalized.setdefault(normalize(option), option)
+        self._sorted_keys = sorted(self._normalized)
+
+        codes: Dict[str, List[str]] = {}
+        for option in self.options:
+            match = TRAILING_CODE.search(option.upper())
+            if match:
+                codes.setdefault(normalize(match.group(1)), []).append(option)
+        self._codes = {code: found[0] for code, found in codes.items() if len(found) == 1}
+
+        # Two letter state codes only mean states in a state list ("GA" is also a country)
+        state_names = sum(normalize(name) in self._normalized for name in US_STATE_ABBREVIATIONS.values())
+        self._state_keys = _STATE_KEYS if state_names > len(US_STATE_ABBREVIATIONS) // 2 else {}
+
+    def match(self, value: Any) -> Optional[OptionMatch]:
+        """Find the option a value most likely means, or None if nothing is close enough"""
+        text = str(value).strip()
+        if text in self._exact:
+            return OptionMatch(text, EXACT)
+
+        key = normalize(text)
+        if not key:
+            return None
+        if key in self._normalized:
+            return OptionMatch(self._normalized[key], NORMALIZED)
+
+        for alias in (self._state_keys.get(key), _COUNTRY_KEYS.get(key)):
+            if alias and normalize(alias) in self._normalized:
+                return OptionMatch(self._normalized[normalize(alias)], ABBREVIATION)
+        if key in self._codes:
+            return OptionMatch(self._codes[key], ABBREVIATION)
+
+        option = self._prefix_match(key)
+        if option:
+            return OptionMatch(option, PREFIX)
+
+        option = self._fuzzy_match(key)
+        if option:
+            return OptionMatch(option, FUZZY)
+        return None
+
+    def _prefix_match(self, key: str) -> Optional[str]:
+        if len(key) < MIN_PREFIX_LENGTH:
+            return None
+        # Value is the start of exactly one option, e.g. "NEW Y"
+        start = bisect.bisect_left(self._sorted_keys, key)
+        candidates = []
+        for option_key in self._sorted_keys[start:]:
+            if not option_key.startswith(key):
+                break
+            candidates.append(option_key)
+        if len(candidates) == 1:
+            return self._normalized[candidates[0]]
+        if candidates:
+            return None
+
+        # An option is the start of the value only for month names ("AUGUST" for "AUG"); anything
+        # else ("INDIANA" for INDIA, "WASHINGTON DC" for WASHINGTON) is a different option
+        month = _MONTH_KEYS.get(key)
+        if month and month in self._normalized:
+            return self._normalized[month]
+        return None
+
+    def _fuzzy_match(self, key: str) -> Optional[str]:
+        limit = max(1, len(key) // 5)
+        best: List[Tuple[int, str]] = []
+        for option_key in self._sorted_keys:
+            # Extra characters after a whole option are a different option, not a typo
+            if key.startswith(option_key):
+                continue
+            distance = edit_distance(key, option_key, limit)
+            if distance <= limit:
+                best.append((distance, option_key))
+        if not best:
+            return None
+        best.sort()
+        # Ties are ambiguous; better to report than to guess
+        if len(best) > 1 and best[0][0] == best[1][0]:
+            return None
+        return self._normalized[best[0][1]]
+
+
+class OptionMatcher:
+    """Per-dropdown option indexes built from the form definitions' value lists
+
+    Indexes are keyed by the option list itself, so the many dropdowns that share
+    the country, state, day and month lists share one index.
+    """
+
+    def __init__(self):
+        self._indexes: Dict[Tuple[str, ...], OptionIndex] = {}
+
+    def index_for(self, field_def: Dict[str, Any]) -> Optional[OptionIndex]:
+        options = field_def.get('value')
+        if not isinstance(options, (list, tuple)) or not options:
+            return None
+        # Field models already share one tuple of strings per distinct option list
+        key = options if isinstance(options, tuple) else tuple(str(option) for option in options)
+        if key not in self._indexes:
+            self._indexes[key] = OptionIndex(options)
+        return self._indexes[key]
+
+    def resolve(self, field_def: Dict[str, Any], value: Any) -> Optional[OptionMatch]:
+        """Option for a dropdown value; None when the field has no option list or nothing matches"""
+        index = self.index_for(field_def)
+        if index is None:
+            return None
+        return index.match(value)
@@ -0,0 +1,262 @@
+import logging
+from typing import Dict, Any, List, NamedTuple, Optional, Set
+
+from mappings.form_mapping import FormMapping, FormPage
+from automation.dependency_table import expand_definition
+from automation.option_matcher import OptionMatcher
+
+logger = logging.getLogger(__name__)
+
+ERROR = "error"
+WARNING = "warning"
+
+# Pages FormHandler drives with their own logic; only their buttons are checked
+ENTRY_PAGES = (FormPage.START.value, FormPage.RETRIEVE.value, FormPage.SECURITY.value)
+
+
+class ValidationIssue(NamedTuple):
+    page: str
+    field: str          # YAML path, or "" for page level problems
+    message: str
+    severity: str       # ERROR stops the run, WARNING is reported but allowed
+
+
+def get_nested_value(values: Dict[str, Any], field_name: str) -> Any:
+    """Get a value from page YAML using dot notation; "list.key" collects key from every list item"""
+    parts = field_name.split('.')
+    value = values
+
+    # If requesting just the array itself (e.g., license_details)
+    if len(parts) == 1:
+        return value.get(parts[0])
+
+    # Handle array access
+    array_name = parts[0]
+    if array_name in value and isinstance(value[array_name], list):
+        result = []
+        for item in value[array_name]:
+            current = item
+            for part in parts[1:]:
+                if not isinstance(current, dict):
+                    break
+                current = current.get(part)
+            if current is not None:
+                result.append(current)
+        return result
+
+    # Handle regular nested field access
+    for part in parts:
+        if not value or not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def _leaf_paths(data: Dict[str, Any], prefix: str = '') -> List[str]:
+    """Dotted paths of every leaf, with list items addressed without an index like the page mappings"""
+    paths = []
+    for key, value in data.items():
+        path = f"{prefix}.{key}" if prefix else key
+        items = value if isinstance(value, list) else [value]
+        nested = [item for item in items if isinstance(item, dict)]
+        if nested:
+            for item in nested:
+                paths.extend(p for p in _leaf_paths(item, path) if p not in paths)
+        else:
+            paths.append(path)
+    return paths
+
+
+def _is_true(value: Any) -> bool:
+    return str(value).lower() == 'true'
+
+
+def _is_empty(value: Any) -> bool:
+    return value is None or value == "" or value == []
+
+
+class PreflightValidator:
+    """Check input YAML against the page definitions without a browser
+
+    Walks each page the way FormHandler.fill_form does (mapped fields, then the
+    fields revealed by the chosen values) so every problem the browser would hit
+    later is reported at once.
+    """
+
+    def __init__(self, page_definitions: Dict[str, Dict[str, Any]], form_mapping: Optional[FormMapping] = None):
+        self.page_definitions = page_definitions
+        self.form_mapping = form_mapping or FormMapping()
+        self.option_matcher = OptionMatcher()
+        self._expanded: Dict[str, Dict[str, Any]] = {}
+
+    def _definition(self, page_name: str) -> Optional[Dict[str, Any]]:
+        if page_name not in self._expanded and page_name in self.page_definitions:
+            self._expanded[page_name] = expand_definition(self.page_definitions[page_name])
+        return self._expanded.get(page_name)
+
+    def validate(self, form_data: Dict[str, Any]) -> List[ValidationIssue]:
+        """Return every problem found in the YAML, errors and warnings"""
+        if not isinstance(form_data, dict):
+            return [ValidationIssue("", "", "YAML must be a mapping of page sections", ERROR)]
+
+        issues: List[ValidationIssue] = []
+        start_page = form_data.get(FormPage.START.value)
+        if not isinstance(start_page, dict):
+            issues.append(ValidationIssue(FormPage.START.value, "", "Missing required section", ERROR))
+        else:
+            clicks = start_page.get('button_clicks') or []
+            if clicks and clicks[0] == 0:
+                second_page = FormPage.SECURITY.value
+            else:
+                second_page = FormPage.RETRIEVE.value
+            if not isinstance(form_data.get(second_page), dict):
+                issues.append(ValidationIssue(second_page, "", "Missing required section", ERROR))
+
+        for page_name, page_data in form_data.items():
+            definition = self._definition(page_name)
+            if definition is None:
+                continue
+            if not isinstance(page_data, dict):
+                issues.append(ValidationIssue(page_name, "", "Section must be a mapping of fields", ERROR))
+                continue
+            issues.extend(self._check_buttons(page_name, page_data, definition))
+            if page_name not in ENTRY_PAGES:
+                issues.extend(self.validate_page(page_name, page_data))
+        return issues
+
+    def _check_buttons(self, page_name: str, page_data: Dict[str, Any], definition: Dict[str, Any]) -> List[ValidationIssue]:
+        buttons = definition.get('buttons', [])
+        clicks = page_data.get('button_clicks')
+        if not clicks:
+            return [ValidationIssue(page_name, "button_clicks", "Missing button_clicks", ERROR)]
+        if not isinstance(clicks, list):
+            return [ValidationIssue(page_name, "button_clicks", "button_clicks must be a list of button indices", ERROR)]
+        issues = []
+        for index in clicks:
+            if not isinstance(index, int) or isinstance(index, bool) or not 0 <= index < len(buttons):
+                issues.append(ValidationIssue(
+                    page_name, "button_clicks",
+                    f"Button index {index!r} out of range, page has {len(buttons)} buttons", ERROR
+                ))
+        return issues
+
+    def validate_page(self, page_name: str, page_data: Dict[str, Any]) -> List[ValidationIssue]:
+        """Check one page section's field values"""
+        definition = self._definition(page_name)
+        if definition is None:
+            return [ValidationIssue(page_name, "", "No page definition", ERROR)]
+
+        page_mappings = self.form_mapping.form_mapping.get(page_name, {})
+        # First YAML path wins, as in FormHandler._process_field_and_dependencies
+        field_names: Dict[str, str] = {}
+        for path, element_id in page_mappings.items():
+            field_names.setdefault(element_id, path)
+
+        issues: List[ValidationIssue] = [
+            ValidationIssue(page_name, path, "Not mapped to any form field, value will be ignored", WARNING)
+            for path in _leaf_paths(page_data)
+            if path != 'button_clicks' and path not in page_mappings
+            # _na values without their own checkbox still stop the base field from being filled
+            and not (path.endswith('_na') and path[:-3] in page_mappings)
+        ]
+        processed: Set[str] = set()
+        for field_def in definition['fields']:
+            self._check_field(page_name, page_data, field_def, field_names,
+                              definition.get('dependencies', {}), processed, issues, revealed=False)
+        return issues
+
+    def _check_field(self, page_name: str, page_data: Dict[str, Any], field_def: Dict[str, Any],
+                     field_names: Dict[str, str], dependencies: Dict[str, Any],
+                     processed: Set[str], issues: List[ValidationIssue], revealed: bool) -> None:
+        field_id = field_def['name']
+        if field_id in processed:
+            return
+        field_name = field_names.get(field_id) or field_names.get(field_id.replace('$', '_'))
+        if not field_name:
+            return
+        processed.add(field_id)
+
+        value = get_nested_value(page_data, field_name)
+        na_value = get_nested_value(page_data, f"{field_name}_na")
+        if na_value is None:
+            na_value = get_nested_value(page_data, f"{field_name.split('.')[0]}_na")
+        if na_value == []:
+            na_value = None
+
+        if isinstance(value, list) and value:
+            if len(value) > 1 and not field_def.get('add_group_button_id'):
+                issues.append(ValidationIssue(
+                    page_name, field_name, f"{len(value)} entries given but the form has room for one", ERROR
+                ))
+            for index, item in enumerate(value):
+                if isinstance(na_value, list):
+                    item_na = na_value[index] if index < len(na_value) else None
+                else:
+                    item_na = na_value
+                self._check_value(page_name, f"{field_name}[{index}]", field_def, item, item_na, revealed, issues)
+            return
+
+        self._check_value(page_name, field_name, field_def, value, na_value, revealed, issues)
+
+        # Walk into the fields this value reveals
+        if field_def['type'] == 'radio':
+            button_id = field_def.get('button_ids', {}).get(str(value))
+            dependency_key = f"{button_id}.{value}" if button_id else None
+        else:
+            dependency_key = f"{field_id}.{value}"
+        dependency = (dependencies or {}).get(dependency_key)
+        if dependency:
+            for dependent_field in dependency.get('shows', []):
+                if dependent_field:
+                    self._check_field(page_name, page_data, dependent_field, field_names,
+                                      dependency.get('dependencies', {}), processed, issues, revealed=True)
+
+    def _check_value(self, page_name: str, field_name: str, field_def: Dict[str, Any], value: Any,
+                     na_value: Any, revealed: bool, issues: List[ValidationIssue]) -> None:
+        field_type = field_def['type']
+        if na_value is not None and not isinstance(na_value, bool) and str(na_value).lower() not in ('true', 'false', ''):
+            issues.append(ValidationIssue(page_name, f"{field_name}_na", f"Expected true/false, got {na_value!r}", ERROR))
+        if _is_true(na_value):
+            return
+
+        if _is_empty(value):
+            if revealed and not field_def.get('optional') and field_type != 'checkbox':
+                issues.append(ValidationIssue(
+                    page_name, field_name, "Required by an earlier answer but no value given", WARNING
+                ))
+            return
+
+        if isinstance(value, (dict, list)):
+            issues.append(ValidationIssue(page_name, field_name, f"Expected a single value, got {type(value).__name__}", ERROR))
+            return
+
+        if field_type in ('text', 'textarea'):
+            maxlength = field_def.get('maxlength')
+            if maxlength and len(str(value)) > int(maxlength):
+                issues.append(ValidationIssue(
+                    page_name, field_name, f"{len(str(value))} characters exceeds maximum length of {maxlength}", ERROR
+                ))
+        elif field_type == 'dropdown':
+            options = field_def.get('value')
+            if isinstance(options, (list, tuple)) and str(value) not in options:
+                match = self.option_matcher.resolve(field_def, value)
+                if match:
+                    issues.append(ValidationIssue(
+                        page_name, field_name, f"{value!r} will be selected as {match.option!r} ({match.method} match)", WARNING
+                    ))
+                else:
+                    issues.append(ValidationIssue(page_name, field_name, f"{value!r} is not one of the dropdown options", ERROR))
+        elif field_type == 'radio':
+            if str(value) not in field_def.get('button_ids', {}):
+                allowed = '/'.join(field_def.get('button_ids', {}))
+                issues.append(ValidationIssue(page_name, field_name, f"{value!r} is not a valid choice ({allowed})", ERROR))
+        elif field_type == 'checkbox':
+            if not isinstance(value, bool) and str(value).lower() not in ('true', 'false'):
+                issues.append(ValidationIssue(page_name, field_name, f"Expected true/false, got {value!r}", ERROR))
+
+
+def summarize(issues: List[ValidationIssue]) -> Dict[str, Any]:
+    """Group issues for API responses and progress messages"""
+    errors = [issue._asdict() for issue in issues if issue.severity == ERROR]
+    warnings = [issue._asdict() for issue in issues if issue.severity == WARNING]
+    return {"valid": not errors, "errors": errors, "warnings": warnings}
@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import os
+import secrets
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from utils.telemetry import BROWSER_SESSIONS_CAPACITY, DS160_RUNS, QUEUE_WAIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Chromium instances the DS-160 routes may run at once; later runs wait for a slot
+MAX_CONCURRENT_RUNS = int(os.getenv('DS160_MAX_BROWSERS', '4'))
+# Finished runs stay visible on GET /runs/{run_id} this long
+RUN_RETENTION_SECONDS = int(os.getenv('DS160_RUN_RETENTION', '3600'))
+# Progress messages kept per run for status requests
+RUN_HISTORY = 50
+# Only these keys of a progress message are kept; payloads such as the generated
+# YAML or validation results go to the run's own stream and nowhere else
+NOTED_KEYS = ('status', 'message', 'run_id', 'section')
+
+
+@dataclass(eq=False)
+class Run:
+    """One DS-160 run: its worker task, progress queue and how it ended"""
+    run_id: str
+    kind: str
+    detached: bool
+    queue: asyncio.Queue
+    status: str = 'queued'
+    error: Optional[str] = None
+    created: float = field(default_factory=time.time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    messages: Deque[Dict[str, Any]] = field(default_factory=lambda: deque(maxlen=RUN_HISTORY))
+    task: Optional[asyncio.Task] = None
+    # Helpers that only serve this run (e.g. YAML generation) and stop with it
+    companions: List[asyncio.Task] = field(default_factory=list)
+    listening: bool = True
+
+    def note(self, message: Dict[str, Any]) -> None:
+        self.messages.append({key: message[key] for key in NOTED_KEYS if key in message})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'run_id': self.run_id,
+            'kind': self.kind,
+            'status': self.status,
+            'detached': self.detached,
+            'listening': self.listening,
+            'error': self.error,
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished,
+            'messages': list(self.messages),
+        }
+
+
+class RunRegistry:
+    """Tracks DS-160 runs and limits how many hold a browser at once
+
+    A run whose listener goes away is cancelled, unless it was started detached;
+    cancellation unwinds FormHandler and BrowserHandler, so the browser is closed
+    and the slot returned before the run is recorded as aborted."""
+
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT_RUNS):
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._runs: Dict[str, Run] = {}
+        BROWSER_SESSIONS_CAPACITY.set(max_concurrent, pool="ds160")
+
+    def start(self, kind: str, work: Callable[[], Awaitable[Any]], queue: asyncio.Queue,
+              detached: bool = False, companions: Optional[List[asyncio.Task]] = None) -> Run:
+        """Run `work` as soon as a browser slot is free"""
+        self._prune()
+        run = Run(secrets.token_hex(8), kind, detached, queue, companions=list(companions or []))
+        run.task = asyncio.create_task(self._run(run, work))
+        self._runs[run.run_id] = run
+        logger.info("Run %s (%s) created, detached=%s", run.run_id, kind, detached, extra={'run_id': run.run_id})
+        return run
+
+    async def _run(self, run: Run, work: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            if self._slots.locked():
+                await run.queue.put({"status": "info", "message": "Waiting for a free browser..."})
+            waiting_since = time.monotonic()
+            async with self._slots:
+                QUEUE_WAIT_SECONDS.observe(time.monotonic() - waiting_since, queue="ds160_browser")
+                run.status = 'running'
+                run.started = time.time()
+                result = await work()
+        except asyncio.CancelledError:
+            self._finish(run, 'aborted')
+            raise
+        except Exception as e:
+            self._finish(run, 'failed', str(e))
+            raise
+        self._finish(run, 'completed')
+        return result
+
+    def _finish(self, run: Run, status: str, error: Optional[str] = None) -> None:
+        run.status = status
+        run.error = error
+        run.finished = time.time()
+        for task in run.companions:
+            if not task.done():
+                task.cancel()
+        DS160_RUNS.inc(kind=run.kind, status=status)
+        elapsed = run.finished - (run.started or run.created)
+        log = logger.warning if status == 'aborted' else logger.info
+        log("Run %s %s after %.1fs%s", run.run_id, status, elapsed, f": {error}" if error else "",
+            extra={'run_id': run.run_id, 'run_status': status})
+
+    def listener_gone(self, run: Run) -> None:
+        """The client stopped reading: cancel the run, or keep it going unattended if detached"""
+        run.listening = False
+        if run.task is None or run.task.done():
+            return
+        if run.detached:
+            logger.info("Run %s continues detached", run.run_id)
+            asyncio.create_task(self._drain(run))
+        else:
+            logger.info("Client of run %s disconnected, cancelling", run.run_id)
+            run.task.cancel()
+
+    async def _drain(self, run: Run) -> None:
+        """Keep a detached run's progress queue empty, remembering recent messages for status requests"""
+        while not (run.task.done() and run.queue.empty()):
+            try:
+                run.note(await asyncio.wait_for(run.queue.get(), timeout=1.0))
+            except asyncio.TimeoutError:
+                continue
+
+    def cancel(self, run_id: str) -> Optional[Run]:
+        run = self._runs.get(run_id)
+        if run and run.task and not run.task.done():
+            run.task.cancel()
+        return run
+
+    def get(self, run_id: str) -> Optional[Run]:
+        return self._runs.get(run_id)
+
+    def counts(self) -> Dict[str, Dict[str, int]]:
+        """Number of retained runs per kind and status"""
+        self._prune()
+        counts: Dict[str, Dict[str, int]] = {}
+        for run in self._runs.values():
+            by_status = counts.setdefault(run.kind, {})
+            by_status[run.status] = by_status.get(run.status, 0) + 1
+        return counts
+
+    def _prune(self) -> None:
+        cutoff = time.time() - RUN_RETENTION_SECONDS
+        for run_id, run in list(self._runs.items()):
+            if run.finished and run.finished < cutoff:
+                del self._runs[run_id]
+
+    async def shutdown(self) -> None:
+        """Cancel every unfinished run and wait for their browsers to close"""
+        tasks = [run.task for run in self._runs.values() if run.task and not run.task.done()]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+runs = RunRegistry()
@@ -0,0 +1,151 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Recordings hold the applicant's data and session cookies, keep them out of git
+DEFAULT_RECORD_ROOT = Path(__file__).parent.parent / "logs" / "sessions"
+
+# Set to record every BrowserHandler session under this directory, one folder per run
+RECORD_DIR = os.getenv('DS160_RECORD_DIR')
+# Set to a recorded session folder to serve all traffic from it instead of the network
+REPLAY_DIR = os.getenv('DS160_REPLAY_DIR')
+# 1.0 replays the recorded response times, 0.25 four times faster, 0 as fast as possible
+REPLAY_TIME_SCALE = float(os.getenv('DS160_REPLAY_TIME_SCALE', '1.0'))
+
+HAR_NAME = "session.har"
+MANIFEST_NAME = "manifest.json"
+DOM_DIR = "dom"
+
+
+def _label(text: str) -> str:
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', text).strip('_') or 'page'
+
+
+def _request_key(method: str, url: str) -> Tuple[str, str]:
+    return method.upper(), url.split('#', 1)[0]
+
+
+class SessionRecorder:
+    """Captures a browser session as HAR plus a DOM snapshot of each form page"""
+
+    def __init__(self, directory: Optional[Path] = None):
+        root = Path(RECORD_DIR) if RECORD_DIR else DEFAULT_RECORD_ROOT
+        self.directory = Path(directory) if directory else root / time.strftime('%Y%m%d-%H%M%S')
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.started = time.monotonic()
+        self.snapshots: List[Dict[str, Any]] = []
+        self.captcha_solutions: List[str] = []
+
+    @property
+    def har_path(self) -> Path:
+        return self.directory / HAR_NAME
+
+    def context_options(self) -> Dict[str, Any]:
+        """new_context() arguments that make Playwright write the HAR when the context closes"""
+        return {
+            'record_har_path': str(self.har_path),
+            'record_har_content': 'embed',
+            'record_har_mode': 'full',
+        }
+
+    async def snapshot(self, page, label: str) -> None:
+        """Save the page's current DOM, numbered in the order the pages were visited"""
+        try:
+            html = await page.content()
+            path = self.directory / DOM_DIR / f"{len(self.snapshots):02d}_{_label(label)}.html"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(html, encoding='utf-8')
+            self.snapshots.append({
+                'label': label,
+                'url': page.url,
+                'file': str(path.relative_to(self.directory)),
+                'elapsed': round(time.monotonic() - self.started, 3),
+            })
+        except Exception as e:
+            logger.warning(f"Could not snapshot {label}: {str(e)}")
+
+    def record_captcha(self, text: str) -> None:
+        """Replays resubmit the same CAPTCHA answer instead of calling OpenAI again"""
+        self.captcha_solutions.append(text)
+
+    def save_manifest(self) -> None:
+        """Write the manifest next to the HAR, replacing the file atomically"""
+        manifest = {
+            'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'duration': round(time.monotonic() - self.started, 3),
+            'har': HAR_NAME,
+            'snapshots': self.snapshots,
+            'captcha_solutions': self.captcha_solutions,
+        }
+        try:
+            path = self.directory / MANIFEST_NAME
+            tmp_path = path.with_suffix('.tmp')
+            with open(tmp_path, 'w') as f:
+                json.dump(manifest, f, indent=2)
+            tmp_path.replace(path)
+            logger.info(f"Recorded session to {self.directory}")
+        except Exception as e:
+            logger.error(f"Error saving session manifest {self.directory}: {str(e)}")
+
+
+class SessionReplayer:
+    """Serves a recorded session through Playwright routing, with scaled response timing
+
+    Responses come from Playwright's own HAR router, which matches on URL, method and,
+    for the WebForm POSTs, the posted body; a request the recording does not contain is
+    aborted so a replay never touches the network. In front of it, each request waits
+    its recorded response time multiplied by time_scale."""
+
+    def __init__(self, directory: Path, time_scale: Optional[float] = None):
+        self.directory = Path(directory)
+        self.time_scale = REPLAY_TIME_SCALE if time_scale is None else time_scale
+        self.manifest: Dict[str, Any] = {}
+        manifest_path = self.directory / MANIFEST_NAME
+        if manifest_path.exists():
+            with open(manifest_path) as f:
+                self.manifest = json.load(f)
+        self.har_path = self.directory / self.manifest.get('har', HAR_NAME)
+        if not self.har_path.exists():
+            raise FileNotFoundError(f"No recorded session at {self.har_path}")
+
+        self._timings: Dict[Tuple[str, str], List[float]] = defaultdict(list)
+        with open(self.har_path) as f:
+            for entry in json.load(f)['log']['entries']:
+                request = entry['request']
+                self._timings[_request_key(request['method'], request['url'])].append(entry.get('time', 0) / 1000)
+        self._served: Dict[Tuple[str, str], int] = defaultdict(int)
+        self._captcha_solutions = list(self.manifest.get('captcha_solutions', []))
+        self.delayed_seconds = 0.0
+
+    async def attach(self, context) -> None:
+        """Route every request of the context through the recording"""
+        await context.route_from_har(str(self.har_path), not_found='abort')
+        if self.time_scale > 0:
+            # Registered last so it runs first, then falls through to the HAR router
+            await context.route('**/*', self._delay)
+        logger.info(f"Replaying session from {self.directory} at time scale {self.time_scale}")
+
+    async def _delay(self, route) -> None:
+        key = _request_key(route.request.method, route.request.url)
+        timings = self._timings.get(key)
+        if timings:
+            # The same URL is hit repeatedly by postbacks; take the recorded times in order
+            index = min(self._served[key], len(timings) - 1)
+            self._served[key] += 1
+            delay = timings[index] * self.time_scale
+            self.delayed_seconds += delay
+            await asyncio.sleep(delay)
+        await route.fallback()
+
+    def next_captcha(self) -> Optional[str]:
+        if not self._captcha_solutions:
+            return None
+        return self._captcha_solutions.pop(0)
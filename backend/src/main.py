@@ -1,8 +1,12 @@
 import yaml
 import json
 from automation.form_handler import FormHandler
-from mappings.form_mapping import FormMapping
+from mappings.form_mapping import FormMapping, load_page_definitions
 from automation.browser import BrowserHandler
+from automation.preflight import PreflightValidator, summarize
+from automation.action_planner import ActionPlanner
+from automation.field_model import build_page_models
+from utils.logging_config import configure_logging
 import logging
 #from backend.src.mappings.form_mapping import FormPage
 from dotenv import load_dotenv
@@ -18,13 +22,9 @@ if str(src_path) not in sys.path:
 logger = logging.getLogger(__name__)
 
 def setup_logging():
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.StreamHandler(),
-            logging.FileHandler('ds160_automation.log')
-        ]
+    configure_logging(
+        [logging.StreamHandler(), logging.FileHandler('ds160_automation.log')],
+        fmt='%(asctime)s - %(levelname)s - %(message)s'
     )
 
 def load_json(file_path: str) -> dict:
@@ -46,9 +46,13 @@ def main():
     
     # Load environment variables from .env file
     load_dotenv()
+
+    # --dry-run prints the action plan and time estimate instead of opening a browser
+    args = [arg for arg in sys.argv[1:] if arg != '--dry-run']
+    dry_run = len(args) < len(sys.argv) - 1
     
     # Verify OpenAI API key is set
-    if not os.getenv('OPENAI_API_KEY'):
+    if not dry_run and not os.getenv('OPENAI_API_KEY'):
         raise ValueError("OPENAI_API_KEY not found in environment variables")
     
     logger.info("Starting DS-160 form automation...")
@@ -56,7 +60,7 @@ def main():
         # Get YAML path from environment variable or command line argument
         yaml_path = (
             os.getenv('DS160_INPUT_YAML') or 
-            (len(sys.argv) > 1 and sys.argv[1]) or 
+            (args and args[0]) or 
             'data/input/ds160_from_o1.yaml'
         )
         
@@ -87,47 +91,32 @@ def main():
         available_files = os.listdir(form_definitions_dir)
         logger.info(f"Found files: {available_files}")
 
-        # Map enum values to actual file names (now with _definition suffix)
-        page_name_mappings = {
-            "start_page": "p0_start_page_definition",
-            "retrieve_page": "p0_retrieve_page_definition",
-            "security_page": "p0_security_page_definition",
-            "timeout_page": "p0_timeout_page_definition",
-            "personal_page1": "p1_personal1_definition",
-            "personal_page2": "p2_personal2_definition",
-            "travel_page": "p3_travel_definition",
-            "travel_companions_page": "p4_travelcompanions_definition",
-            "previous_travel_page": "p5_previousustravel_definition",
-            "address_phone_page": "p6_addressphone_definition",
-            "pptvisa_page": "p7_pptvisa_definition",
-            "us_contact_page": "p8_uscontact_definition",
-            "relatives_page": "p9_relatives_definition",
-            "spouse_page": "p18_spouse_definition",
-            "workeducation1_page": "p10_workeducation1_definition",
-            "workeducation2_page": "p11_workeducation2_definition",
-            "workeducation3_page": "p12_workeducation3_definition",
-            "security_background1_page": "p13_securityandbackground1_definition",
-            "security_background2_page": "p14_securityandbackground2_definition",
-            "security_background3_page": "p15_securityandbackground3_definition",
-            "security_background4_page": "p16_securityandbackground4_definition",
-            "security_background5_page": "p17_securityandbackground5_definition"
-        }
-
         # Load form definitions
-        for enum_value, file_prefix in page_name_mappings.items():
-            file_path = os.path.join(form_definitions_dir, f"{file_prefix}.json")
-            
-            if os.path.exists(file_path):
-                logger.info(f"Loading definition for {enum_value} from {file_path}")
-                page_definitions[enum_value] = load_json(file_path)
-            else:
-                logger.warning(f"Definition file not found: {file_path}")
+        page_definitions.update(build_page_models(load_page_definitions(form_definitions_dir)))
 
         if not page_definitions:
             raise ValueError("No form definitions were loaded")
 
         logger.info(f"Loaded definitions for pages: {list(page_definitions.keys())}")
 
+        # Catch bad values before the browser spends time on start page and CAPTCHA
+        validation = summarize(PreflightValidator(page_definitions).validate(test_data))
+        for issue in validation['warnings']:
+            logger.warning(f"Pre-flight: {issue['page']}.{issue['field']}: {issue['message']}")
+        for issue in validation['errors']:
+            logger.error(f"Pre-flight: {issue['page']}.{issue['field']}: {issue['message']}")
+        if not validation['valid']:
+            raise ValueError(f"Input YAML failed pre-flight validation with {len(validation['errors'])} errors")
+
+        if dry_run:
+            planner = ActionPlanner(page_definitions)
+            plan = planner.summarize(planner.plan(test_data))
+            for page in plan['pages']:
+                logger.info(f"Plan: {page['page']}: {page['action_count']} actions, ~{page['estimated_seconds']}s {page['counts']}")
+            logger.info(f"Plan: {plan['action_count']} actions, estimated {plan['estimated_seconds']}s")
+            print(json.dumps(plan, indent=2, default=str))
+            return 0
+
         # Initialize handlers
         form_handler = FormHandler()
         
@@ -1,5 +1,7 @@
 from enum import Enum
+from pathlib import Path
 from typing import Dict, Any, Optional
+import json
 import logging
 
 class FormPage(Enum):
@@ -27,6 +29,92 @@ class FormPage(Enum):
     SPOUSE = "spouse_page"  # p18
     
 
+# Page definition file (without .json) for each FormPage value. This is the one
+# place the page -> definition table lives; loaders and scripts/compile_mappings.py use it.
+PAGE_DEFINITION_FILES = {
+    FormPage.START.value: "p0_start_page_definition",
+    FormPage.RETRIEVE.value: "p0_retrieve_page_definition",
+    FormPage.SECURITY.value: "p0_security_page_definition",
+    FormPage.TIMEOUT.value: "p0_timeout_page_definition",
+    FormPage.PERSONAL1.value: "p1_personal1_definition",
+    FormPage.PERSONAL2.value: "p2_personal2_definition",
+    FormPage.TRAVEL.value: "p3_travel_definition",
+    FormPage.TRAVEL_COMPANIONS.value: "p4_travelcompanions_definition",
+    FormPage.PREVIOUS_TRAVEL.value: "p5_previousustravel_definition",
+    FormPage.ADDRESS_PHONE.value: "p6_addressphone_definition",
+    FormPage.PPTVISA.value: "p7_pptvisa_definition",
+    FormPage.USCONTACT.value: "p8_uscontact_definition",
+    FormPage.RELATIVES.value: "p9_relatives_definition",
+    FormPage.WORK_EDUCATION1.value: "p10_workeducation1_definition",
+    FormPage.WORK_EDUCATION2.value: "p11_workeducation2_definition",
+    FormPage.WORK_EDUCATION3.value: "p12_workeducation3_definition",
+    FormPage.SECURITY_BACKGROUND1.value: "p13_securityandbackground1_definition",
+    FormPage.SECURITY_BACKGROUND2.value: "p14_securityandbackground2_definition",
+    FormPage.SECURITY_BACKGROUND3.value: "p15_securityandbackground3_definition",
+    FormPage.SECURITY_BACKGROUND4.value: "p16_securityandbackground4_definition",
+    FormPage.SECURITY_BACKGROUND5.value: "p17_securityandbackground5_definition",
+    FormPage.SPOUSE.value: "p18_spouse_definition"
+}
+
+# Order of the application pages on the site; each page's "Next" button leads to the one after it
+FORM_PAGE_ORDER = (
+    FormPage.PERSONAL1.value,
+    FormPage.PERSONAL2.value,
+    FormPage.TRAVEL.value,
+    FormPage.TRAVEL_COMPANIONS.value,
+    FormPage.PREVIOUS_TRAVEL.value,
+    FormPage.ADDRESS_PHONE.value,
+    FormPage.PPTVISA.value,
+    FormPage.USCONTACT.value,
+    FormPage.RELATIVES.value,
+    FormPage.SPOUSE.value,
+    FormPage.WORK_EDUCATION1.value,
+    FormPage.WORK_EDUCATION2.value,
+    FormPage.WORK_EDUCATION3.value,
+    FormPage.SECURITY_BACKGROUND1.value,
+    FormPage.SECURITY_BACKGROUND2.value,
+    FormPage.SECURITY_BACKGROUND3.value,
+    FormPage.SECURITY_BACKGROUND4.value,
+    FormPage.SECURITY_BACKGROUND5.value,
+)
+
+# Pages FormHandler fills after start and retrieve/security, in this order
+PAGE_SEQUENCE = [
+    FormPage.PERSONAL1.value,  # p1
+    # FormPage.PERSONAL2.value,  # p2
+    # FormPage.TRAVEL.value,  # p3
+    # FormPage.TRAVEL_COMPANIONS.value,  # p4
+    # FormPage.PREVIOUS_TRAVEL.value,  # p5
+    # FormPage.ADDRESS_PHONE.value,  # p6
+    # FormPage.PPTVISA.value,  # p7
+    # FormPage.USCONTACT.value,  # p8
+    # FormPage.RELATIVES.value,  # p9
+    FormPage.SPOUSE.value,  # p18
+    # FormPage.WORK_EDUCATION1.value,  # p10
+    # FormPage.WORK_EDUCATION2.value,  # p11
+    # FormPage.WORK_EDUCATION3.value,  # p12
+    # FormPage.SECURITY_BACKGROUND1.value,  # p13
+    # FormPage.SECURITY_BACKGROUND2.value,  # p14
+    # FormPage.SECURITY_BACKGROUND3.value,  # p15
+    # FormPage.SECURITY_BACKGROUND4.value,  # p16
+    # FormPage.SECURITY_BACKGROUND5.value  # p17
+]
+
+
+def load_page_definitions(definitions_dir: Path) -> Dict[str, Dict[str, Any]]:
+    """Load every page definition found in definitions_dir, keyed by FormPage value"""
+    page_definitions = {}
+    for page_name, file_prefix in PAGE_DEFINITION_FILES.items():
+        file_path = Path(definitions_dir) / f"{file_prefix}.json"
+        if not file_path.exists():
+            logging.error(f"MISSING DEFINITION: {file_path}")
+            continue
+        with open(file_path) as f:
+            page_definitions[page_name] = json.load(f)
+        logging.info(f"Loaded {page_name} with {len(page_definitions[page_name].get('fields', []))} fields")
+    return page_definitions
+
+
 class FormMapping:
     def __init__(self):
         # Import individual page mappings
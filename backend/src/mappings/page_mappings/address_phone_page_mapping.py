@@ -4,7 +4,7 @@ form_mapping = {
     "home_address.street2": "ctl00_SiteContentPlaceHolder_FormView1_tbxAPP_ADDR_LN2",
     "home_address.city": "ctl00_SiteContentPlaceHolder_FormView1_tbxAPP_ADDR_CITY",
     "home_address.state": "ctl00_SiteContentPlaceHolder_FormView1_tbxAPP_ADDR_STATE",
-    "home_address.state_na": "ctl00_SiteContentPlaceHolder_FormView1_cbAPP_ADDR_STATE_NA",
+    "home_address.state_na": "ctl00_SiteContentPlaceHolder_FormView1_cbexAPP_ADDR_STATE_NA",
     "home_address.postal_code": "ctl00_SiteContentPlaceHolder_FormView1_tbxAPP_ADDR_POSTAL_CD",
     "home_address.country": "ctl00_SiteContentPlaceHolder_FormView1_ddlCountry",
     
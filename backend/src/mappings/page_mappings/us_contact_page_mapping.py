@@ -10,5 +10,5 @@ form_mapping = {
     "address.postal_code": "ctl00_SiteContentPlaceHolder_FormView1_tbxUS_POC_ADDR_POSTAL_CD",
     "phone": "ctl00_SiteContentPlaceHolder_FormView1_tbxUS_POC_HOME_TEL",
     "email": "ctl00_SiteContentPlaceHolder_FormView1_tbxUS_POC_EMAIL_ADDR",
-    "email_na": "ctl00_SiteContentPlaceHolder_FormView1_cbxUS_POC_EMAIL_ADDR_NA"
+    "email_na": "ctl00_SiteContentPlaceHolder_FormView1_cbexUS_POC_EMAIL_ADDR_NA"
 } 
\ No newline at end of file
@@ -18,21 +18,20 @@ def load_yaml_templates():
                     sort_keys=False)
 
 # Generate the prompt using the templates
-PDF_TO_YAML_PROMPT = f'''Convert the following extracted text from a PDF DS-160 form into a structured YAML format.
+PDF_TO_YAML_PROMPT = f'''Convert the following extracted text from a PDF DS-160 form into DS-160 form data.
 
-Important: Return ONLY the raw YAML content. Do not include any markdown formatting, code blocks, or backticks.
-
-Use this exact structure:
+Return one JSON object with a key per section. The structure below is written as YAML; use its exact
+fields and nesting in the JSON:
 
 {load_yaml_templates()}
 
 Rules:
 1. Use Y/N for yes/no fields
-2. Use true/false for boolean fields (like _na fields)
+2. Fields ending in _na are JSON booleans (true/false), not strings
 3. Use 3-letter format for months (JAN, FEB, etc.)
 4. Preserve any special characters in names/addresses
 5. Use empty string "" for missing values
 6. Keep array structures for repeated elements (other_names, travel_companions, etc.)
-7. Include button_clicks arrays as shown in template
+7. Include "button_clicks" arrays as shown in template
 8. Maintain exact field names and hierarchy
 ''' 
\ No newline at end of file
@@ -1,14 +1,11 @@
-import os
 import asyncio
 import logging
 import time
-import shutil
 from typing import Dict, Any, List, Optional, Tuple
 from pathlib import Path
 import json
 import yaml
 from datetime import datetime
-import tempfile
 import re
 import base64
 import mimetypes
@@ -19,9 +16,16 @@ import io
 mimetypes.init()
 
 from .openai_handler import OpenAIHandler
+from .image_processing import rasterize_pdf, prepare_vision_images
+from .structured_output import response_format, parse_response, prune_empty, to_yaml
 
 logger = logging.getLogger(__name__)
 
+TRAVEL_SECTIONS = ("travel_page", "travel_companions_page", "previous_travel_page", "us_contact_page")
+
+# JSON output repeats every template key, so it needs more room than the old YAML
+VISION_MAX_TOKENS = 8000
+
 class DocumentHandler:
     def __init__(self):
         self.openai_handler = OpenAIHandler()
@@ -31,6 +35,8 @@ class DocumentHandler:
         self.docs_log_dir = self.log_dir / "documents"
         self.docs_log_dir.mkdir(exist_ok=True)
         self.templates_dir = Path(__file__).parent.parent / "templates" / "yaml_files"
+        # Only the first pages of each upload carry the information we need
+        self.pdf_page_limits = {'license': 2, 'visa': 1, 'travelTicket': 3}
         
     async def process_data(self, files_data: Dict[str, bytes], metadata: Dict[str, Any]) -> Dict[str, Any]:
         """Process uploaded documents and metadata in a single OpenAI call"""
@@ -56,52 +62,29 @@ class DocumentHandler:
                         f.write(file_content)
                     logger.info(f"Saved original {file_type} document to {original_file_path}")
             
-            # Prepare images for OpenAI processing
+            # Prepare images for OpenAI processing, keeping them in memory
             for file_type, file_content in files_data.items():
                 if file_content:
                     if file_content.startswith(b'%PDF'):
                         # Handle PDF conversion
                         logger.info(f"Converting PDF for {file_type}")
-                        try:
-                            image_paths = await self.convert_pdf_to_images(file_content, file_type)
-                            if image_paths:  # Add check to make sure paths were returned
-                                for i, path in enumerate(image_paths):
-                                    key = f"{file_type}_page{i}" if i > 0 else file_type
-                                    prepared_files[key] = path
-                                    # Save converted image
-                                    suffix = f"_page{i}" if i > 0 else ""
-                                    log_path = session_dir / f"converted_{file_type}{suffix}.jpg"
-                                    shutil.copy2(path, log_path)
-                            else:
-                                # Fallback: If PDF conversion fails, save the PDF directly
-                                logger.warning(f"PDF conversion failed for {file_type}, sending PDF directly to OpenAI")
-                                
-                                # Save PDF for processing
-                                pdf_path = session_dir / f"original_{file_type}.pdf"
-                                with open(pdf_path, "wb") as f:
-                                    f.write(file_content)
-                                
-                                # Add to prepared files
-                                prepared_files[file_type] = str(pdf_path)
-                        except Exception as e:
-                            # Another fallback in case of conversion errors
-                            logger.error(f"Error converting PDF: {str(e)}")
-                            logger.warning(f"Sending PDF directly to OpenAI as fallback")
-                            
-                            # Save PDF for processing
-                            pdf_path = session_dir / f"original_{file_type}.pdf"
-                            with open(pdf_path, "wb") as f:
-                                f.write(file_content)
-                            
-                            # Add to prepared files
-                            prepared_files[file_type] = str(pdf_path)
+                        page_images = await self.convert_pdf_to_images(file_content, file_type)
+                        if page_images:
+                            for i, page_image in enumerate(page_images):
+                                key = f"{file_type}_page{i}" if i > 0 else file_type
+                                prepared_files[key] = page_image
+                                # Save converted image
+                                suffix = f"_page{i}" if i > 0 else ""
+                                log_path = session_dir / f"converted_{file_type}{suffix}.jpg"
+                                with open(log_path, "wb") as f:
+                                    f.write(page_image)
+                        else:
+                            # Fallback: If PDF conversion fails, send the PDF directly
+                            logger.warning(f"PDF conversion failed for {file_type}, sending PDF directly to OpenAI")
+                            prepared_files[file_type] = file_content
                     else:
                         # Handle image files directly
-                        extension = self._get_extension_for_file_type(file_type, file_content)
-                        temp_path = session_dir / f"temp_{file_type}{extension}"
-                        with open(temp_path, "wb") as f:
-                            f.write(file_content)
-                        prepared_files[file_type] = str(temp_path)
+                        prepared_files[file_type] = file_content
             
             # Load YAML templates
             templates_text = self._load_travel_templates()
@@ -109,13 +92,8 @@ class DocumentHandler:
             
             # Build prompt with document data and metadata
             documents_text = "\n\n=== DOCUMENT CONTENT ===\n"
-            for doc_type, text in prepared_files.items():
-                documents_text += f"\n--- {doc_type.upper()} ---\n{text}\n"
-                
-                # Save each document's text separately
-                doc_file = session_dir / f"document_{doc_type}_text.txt"
-                with open(doc_file, "w") as f:
-                    f.write(text)
+            for doc_type in prepared_files:
+                documents_text += f"\n--- {doc_type.upper()} ---\n(attached as image)\n"
             
             # Format metadata for the prompt
             metadata_text = "\n\n=== SELECTED DATA ===\n"
@@ -123,7 +101,7 @@ class DocumentHandler:
             # Include YAML-ready data if available
             if 'yamlData' in metadata:
                 yaml_data = metadata['yamlData']
-                metadata_text += "\nUse this information to populate output YAML. Use address in input yaml to populate 'Address Where You Will Stay in the U.S.' and travel companions to populate 'companions' array in travel_companions_page section"
+                metadata_text += "\nUse this information to populate the output. Use address in input yaml to populate 'Address Where You Will Stay in the U.S.' and travel companions to populate 'companions' array in travel_companions_page section"
                 yaml_str = yaml.dump(yaml_data, sort_keys=False)
                 metadata_text += yaml_str
                 
@@ -134,7 +112,7 @@ class DocumentHandler:
             
             # Create the system message
             system_message = f"""
-            Convert these document contents and selected data to DS-160 YAML format for these sections:
+            Convert these document contents and selected data to DS-160 form data for these sections, returned as one JSON object with a key per section:
             - travel_page
             - travel_companions_page
             - previous_travel_page
@@ -201,36 +179,27 @@ class DocumentHandler:
                                             
             Rules:
             1. If PRE-FORMATTED YAML DATA is provided above, use it as a starting point and prioritize that data.
-            2. Create YAML for each of the four travel sections following the template format
+            2. Each travel section is an object with the fields and nesting of its template (the templates are written as YAML, the answer is JSON)
             3. Use "Y"/"N" for yes/no fields
-            4. Use "true"/"false" for boolean fields (yaml fields that end with _na)
-            5. Add button_clicks: [1, 2] at the end of each section
+            4. Fields that end with _na are JSON booleans: true or false, not strings
+            5. Set "button_clicks" to [1, 2] in each section
             6. For dates, use day format as 2 digits (01-31) if date is unavailable (if only year and month or only year is provided) use 01
             7. For month use 3-letter format (JAN, FEB, etc.), if only year is provided and no month is included use "JAN"
             8. For year use 4 digits such as 2020, 2021, 2022, etc.
             9. Use the provided address data to populate contact fields if applicable
             10. If the selected companions are available, use them in the travel_companions_page section
             11. Extract previous travel information like visa numbers, dates of entry/exit from the documents if available
-            12. Only generate YAML structure without any comments or explanations before or after 
+            12. Leave fields that are not in the templates above empty 
             13. For zip code use 5 digits
             14. For state select full state name not abbreviation and use uppercase for state
-            15. If none chosen for travel companions then populate travel_companions_page section with empty array
+            15. If none chosen for travel companions, set traveling_with_others to "N"
             Output format:
-            travel_page:
-              # travel fields from template
-              button_clicks: [1, 2]
-              
-            travel_companions_page:
-              # travel companions fields from template
-              button_clicks: [1, 2]
-              
-            previous_travel_page:
-              # previous travel fields from template
-              button_clicks: [1, 2]
-              
-            us_contact_page:
-              # us contact fields from template
-              button_clicks: [1, 2]
+            {{
+              "travel_page": {{ travel fields from template, "button_clicks": [1, 2] }},
+              "travel_companions_page": {{ travel companions fields from template, "button_clicks": [1, 2] }},
+              "previous_travel_page": {{ previous travel fields from template, "button_clicks": [1, 2] }},
+              "us_contact_page": {{ us contact fields from template, "button_clicks": [1, 2] }}
+            }}
             """
 
             
@@ -243,24 +212,29 @@ class DocumentHandler:
             user_message = []
             user_message.append({
                 "type": "text", 
-                "text": "Extract information from these documents and create YAML for DS-160 travel sections. Focus on names, dates, addresses, ID/visa numbers, and travel information."
+                "text": "Extract information from these documents and fill the DS-160 travel sections. Focus on names, dates, addresses, ID/visa numbers, and travel information."
             })
             
+            # Crop, downscale and re-encode images to what the model actually uses
+            prepared_files, image_stats, image_totals = await prepare_vision_images(prepared_files)
+            with open(session_dir / "image_stats.json", "w") as f:
+                json.dump({"images": image_stats, "totals": image_totals}, f, indent=2)
+
             # Add each image
-            for file_type, file_path in prepared_files.items():
-                with open(file_path, "rb") as img_file:
-                    base64_image = base64.b64encode(img_file.read()).decode('utf-8')
-                    
-                    user_message.append({
-                        "type": "text", 
-                        "text": f"Document type: {file_type.upper()}"
-                    })
-                    user_message.append({
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:image/jpeg;base64,{base64_image}"
-                        }
-                    })
+            for file_type, image_bytes in prepared_files.items():
+                base64_image = base64.b64encode(image_bytes).decode('utf-8')
+                
+                user_message.append({
+                    "type": "text", 
+                    "text": f"Document type: {file_type.upper()}"
+                })
+                user_message.append({
+                    "type": "image_url",
+                    "image_url": {
+                        "url": f"data:image/jpeg;base64,{base64_image}",
+                        "detail": image_stats[file_type]["detail"]
+                    }
+                })
             
             # Log the user message structure (without base64 data)
             user_message_log = []
@@ -282,46 +256,29 @@ class DocumentHandler:
                     {"role": "system", "content": system_message},
                     {"role": "user", "content": user_message}
                 ],
-                max_tokens=4000
+                max_tokens=VISION_MAX_TOKENS,
+                response_format=response_format(TRAVEL_SECTIONS)
             )
             
-            # Get the response and clean it
-            result = response.choices[0].message.content
-            
             # Save raw response
+            result = response.choices[0].message.content
             raw_file = session_dir / "openai_response.txt"
             with open(raw_file, "w") as f:
-                f.write(result)
+                f.write(result or "")
+            
+            # The schema requires every template field; drop the ones the images didn't fill
+            parsed_yaml = prune_empty(parse_response(response.choices[0].message))
             
-            # Clean up YAML code block markers
-            result = result.strip()
-            if result.startswith('```yaml'):
-                result = result[7:]
-            if result.startswith('```'):
-                result = result[3:]
-            if result.endswith('```'):
-                result = result[:-3]
-            result = result.strip()
-            
-            # Save cleaned YAML
+            # Save final YAML
             yaml_file = session_dir / "final_yaml.yaml"
             with open(yaml_file, "w") as f:
-                f.write(result)
+                f.write(to_yaml(parsed_yaml))
             
-            # Parse YAML data
-            try:
-                parsed_yaml = yaml.safe_load(result)
-                return {
-                    "status": "success",
-                    "data": parsed_yaml
-                }
-            except Exception as e:
-                logger.error(f"Error parsing YAML data: {str(e)}")
-                return {
-                    "status": "error",
-                    "message": f"Error parsing YAML data: {str(e)}",
-                    "raw_yaml": result
-                }
+            return {
+                "status": "success",
+                "data": parsed_yaml,
+                "image_stats": image_totals
+            }
                 
         except Exception as e:
             logger.error(f"Error processing documents: {str(e)}", exc_info=True)
@@ -329,66 +286,15 @@ class DocumentHandler:
                 "status": "error",
                 "message": str(e)
             }
-        finally:
-            # Clean up temporary files
-            for file_path in prepared_files.values():
-                if os.path.exists(file_path) and not str(file_path).startswith(str(session_dir)):
-                    try:
-                        os.unlink(file_path)
-                    except Exception as e:
-                        logger.error(f"Error removing temp file: {str(e)}")
     
-    async def convert_pdf_to_images(self, pdf_content: bytes, file_type: str) -> List[str]:
-        """Convert PDF content to a list of image file paths"""
+    async def convert_pdf_to_images(self, pdf_content: bytes, file_type: str) -> List[bytes]:
+        """Convert the relevant PDF pages to in-memory JPEG images using the process pool"""
         try:
-            # Import pdf2image here to avoid dependency issues if not installed
-            from pdf2image import convert_from_bytes
-            
-            # Create a directory for PDF conversions
-            pdf_conversion_dir = self.docs_log_dir / "pdf_conversions"
-            pdf_conversion_dir.mkdir(exist_ok=True)
-            
-            # Create a timestamped subdirectory for this specific conversion
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            conversion_dir = pdf_conversion_dir / f"{file_type}_{timestamp}"
-            conversion_dir.mkdir(exist_ok=True)
-            
-            # Save original PDF for reference
-            pdf_path = conversion_dir / f"original_{file_type}.pdf"
-            with open(pdf_path, "wb") as f:
-                f.write(pdf_content)
-            logger.info(f"Saved original PDF to {pdf_path}")
-            
-            # Convert PDF bytes to images
-            logger.info(f"Converting PDF for {file_type} to images")
-            images = convert_from_bytes(
-                pdf_content,
-                dpi=200,  # Adjust DPI as needed for clarity vs file size
-                fmt="jpeg",
-                transparent=False
-            )
-            
-            image_paths = []
-            for i, image in enumerate(images):
-                # Save each page as an image with proper extension directly in the conversion directory
-                output_path = conversion_dir / f"{file_type}_page{i}.jpg"
-                image.save(str(output_path), "JPEG")
-                logger.info(f"Saved PDF page {i+1} for {file_type} to {output_path}")
-                
-                # Also save to a temp file for processing
-                with tempfile.NamedTemporaryFile(delete=False, suffix=f"_{file_type}_page{i}.jpg") as temp:
-                    image.save(temp.name, "JPEG")
-                    image_paths.append(temp.name)
-            
-            # Save a summary file with paths
-            summary_path = conversion_dir / "conversion_summary.txt"
-            with open(summary_path, "w") as f:
-                f.write(f"Original PDF: {pdf_path}\n\n")
-                f.write(f"Converted {len(images)} pages to images:\n")
-                for i in range(len(images)):
-                    f.write(f"Page {i+1}: {conversion_dir / f'{file_type}_page{i}.jpg'}\n")
-            
-            return image_paths
+            max_pages = self.pdf_page_limits.get(file_type)
+            logger.info(f"Converting PDF for {file_type} to images (max pages: {max_pages or 'default'})")
+            page_images = await rasterize_pdf(pdf_content, max_pages=max_pages)
+            logger.info(f"Converted {len(page_images)} PDF pages for {file_type}")
+            return page_images
             
         except ImportError:
             logger.error("pdf2image is not installed. Please install it with: pip install pdf2image")
@@ -463,7 +369,7 @@ class DocumentHandler:
             # Include YAML-ready data if available
             if 'yamlData' in metadata:
                 yaml_data = metadata['yamlData']
-                metadata_text += "\nUse this information to populate output YAML. Use address in input yaml to populate 'Address Where You Will Stay in the U.S.' and travel companions to populate 'companions' array in travel_companions_page section"
+                metadata_text += "\nUse this information to populate the output. Use address in input yaml to populate 'Address Where You Will Stay in the U.S.' and travel companions to populate 'companions' array in travel_companions_page section"
                 yaml_str = yaml.dump(yaml_data, sort_keys=False)
                 metadata_text += yaml_str
                 
@@ -474,7 +380,7 @@ class DocumentHandler:
             
             # Complete prompt
             prompt = f"""
-            Convert these document contents and selected data to DS-160 YAML format for these sections:
+            Convert these document contents and selected data to DS-160 form data for these sections, returned as one JSON object with a key per section:
             - travel_page
             - travel_companions_page
             - previous_travel_page
@@ -541,10 +447,10 @@ class DocumentHandler:
                                             
             Rules:
             1. If PRE-FORMATTED YAML DATA is provided above, use it as a starting point and prioritize that data.
-            2. Create YAML for each of the four travel sections following the template format
+            2. Each travel section is an object with the fields and nesting of its template (the templates are written as YAML, the answer is JSON)
             3. Use "Y"/"N" for yes/no fields
-            4. Use "true"/"false" for boolean fields (yaml fields that end with _na)
-            5. Add button_clicks: [1, 2] at the end of each section
+            4. Fields that end with _na are JSON booleans: true or false, not strings
+            5. Set "button_clicks" to [1, 2] in each section
             6. For dates, use day format as 2 digits (01-31) if date is unavailable (if only year and month or only year is provided) use 01
             7. For month use 3-letter format (JAN, FEB, etc.), if only year is provided and no month is included use "JAN"
             8. For year use 4 digits such as 2020, 2021, 2022, etc.
@@ -553,21 +459,12 @@ class DocumentHandler:
             11. Extract previous travel information like visa numbers, dates of entry/exit from the documents if available
             
             Output format:
-            travel_page:
-              # travel fields from template
-              button_clicks: [1, 2]
-              
-            travel_companions_page:
-              # travel companions fields from template
-              button_clicks: [1, 2]
-              
-            previous_travel_page:
-              # previous travel fields from template
-              button_clicks: [1, 2]
-              
-            us_contact_page:
-              # us contact fields from template
-              button_clicks: [1, 2]
+            {{
+              "travel_page": {{ travel fields from template, "button_clicks": [1, 2] }},
+              "travel_companions_page": {{ travel companions fields from template, "button_clicks": [1, 2] }},
+              "previous_travel_page": {{ previous travel fields from template, "button_clicks": [1, 2] }},
+              "us_contact_page": {{ us contact fields from template, "button_clicks": [1, 2] }}
+            }}
             """
             
             # Save prompt to file for debugging
@@ -582,27 +479,18 @@ class DocumentHandler:
                 model="gpt-4o",
                 messages=[
                     {"role": "system", "content": prompt}
-                ]
+                ],
+                response_format=response_format(TRAVEL_SECTIONS)
             )
             
-            result = response.choices[0].message.content
-            
             # Save raw response
             raw_response_file = yaml_log_dir / "raw_openai_response.txt"
             with open(raw_response_file, "w") as f:
-                f.write(result)
+                f.write(response.choices[0].message.content or "")
+            
+            result = to_yaml(parse_response(response.choices[0].message))
             
-            # Clean up YAML code block markers
-            result = result.strip()
-            if result.startswith('```yaml'):
-                result = result[7:]  # Remove ```yaml prefix
-            if result.startswith('```'):
-                result = result[3:]  # Remove ``` prefix
-            if result.endswith('```'):
-                result = result[:-3]  # Remove ``` suffix
-            result = result.strip()
-            
-            # Save cleaned YAML
+            # Save converted YAML
             cleaned_yaml_file = yaml_log_dir / "cleaned_yaml.yaml"
             with open(cleaned_yaml_file, "w") as f:
                 f.write(result)
@@ -5,67 +5,27 @@ import asyncio
 import re
 import yaml
 import os
-from openai import AsyncOpenAI
 import random
 from pathlib import Path
 from datetime import datetime, timedelta
-import pandas as pd
-import math
+
+from .openai_handler import get_shared_client
+from .travel_history import TravelVisit, process_travel_history, render_previous_travel
+from .structured_output import response_format, parse_response, to_yaml
 
 logger = logging.getLogger(__name__)
 
+# The I94 table is rendered into YAML directly; set to true to let GPT-4o format it when that fails
+LLM_FALLBACK = os.getenv('I94_LLM_FALLBACK', 'false').lower() == 'true'
+
 class I94Handler:
     def __init__(self):
         self.base_url = "https://i94.cbp.dhs.gov/search/history-search"
-        self.client = AsyncOpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        self.client = get_shared_client()
 
-    def process_travel_data(self, table_text: str) -> List[Tuple[str, str, int]]:
-        # Convert text to DataFrame
-        lines = [line.split('\t') for line in table_text.strip().split('\n')]
-        df = pd.DataFrame(lines[1:], columns=lines[0])  # Skip header row
-        
-        # Convert date strings to datetime
-        df['DATE'] = pd.to_datetime(df['DATE'])
-        
-        # Check if first row is Departure, if not add current date as Departure
-        if df.iloc[0]['TYPE'] != 'Departure':
-            current_date = pd.Timestamp.now()
-            new_row = pd.DataFrame([{
-                'Row': '0',
-                'DATE': current_date,
-                'TYPE': 'Departure',
-                'LOCATION': df.iloc[0]['LOCATION']
-            }])
-            df = pd.concat([new_row, df]).reset_index(drop=True)
-        
-        visits = []
-        i = 0
-        visit_count = 0
-        
-        while i < len(df) - 1 and visit_count < 5:
-            departure_row = df.iloc[i]
-            arrival_row = df.iloc[i + 1]
-            
-            if departure_row['TYPE'] == 'Departure' and arrival_row['TYPE'] == 'Arrival':
-                # Calculate months between arrival and departure and round up
-                days = (departure_row['DATE'] - arrival_row['DATE']).days
-                months = math.ceil(days / 30.44)  # Round up to nearest month
-                
-                # Format dates
-                arrival_date = arrival_row['DATE'].strftime('%d-%b-%Y').upper()
-                
-                visits.append((
-                    str(visit_count + 1),
-                    arrival_date,
-                    months  # Now an integer
-                ))
-                
-                visit_count += 1
-                i += 2
-            else:
-                i += 1
-        
-        return visits
+    def process_travel_data(self, table_text: str) -> List[TravelVisit]:
+        """Pair arrivals with departures from the I94 history table, latest visit first"""
+        return process_travel_history(table_text)
 
     def merge_yaml_data(self, original_yaml: Dict, new_yaml: Dict) -> Dict:
         """Merge new YAML data into original, keeping original values where new is empty"""
@@ -92,18 +52,33 @@ class I94Handler:
         
         return merged
 
+    async def build_previous_travel(self, page_text: str) -> Dict[str, Any]:
+        """Build the previous_travel_page section, asking the LLM only if the table can't be rendered directly"""
+        try:
+            return render_previous_travel(self.process_travel_data(page_text))
+        except Exception as e:
+            if not LLM_FALLBACK:
+                raise
+            logger.warning(f"Could not render I94 history directly, falling back to GPT-4o: {str(e)}")
+
+        with open('src/templates/yaml_files/previous_travel_page.yaml', 'r') as f:
+            yaml_template = f.read()
+        response = await self.generate_yaml_from_i94(page_text, yaml_template)
+        return yaml.safe_load(response)
+
     async def generate_yaml_from_i94(self, page_content: str, yaml_template: str) -> str:
         try:
-            # Process the table data first
-            visits = self.process_travel_data(page_content)
-            
-            # Create a formatted summary for OpenAI
-            visits_summary = "\n".join([
-                f"Visit {num}:\n"
-                f"  Arrival Date: {date}\n"
-                f"  Length of Stay: {months} months"
-                for num, date, months in visits
-            ])
+            # Process the table data first; if it doesn't parse let the model read the raw text
+            try:
+                visits = self.process_travel_data(page_content)
+                visits_summary = "\n".join([
+                    f"Visit {num}:\n"
+                    f"  Arrival Date: {date}\n"
+                    f"  Length of Stay: {months} months"
+                    for num, date, months, _ in visits
+                ])
+            except ValueError:
+                visits_summary = page_content
             
             prompt = f"""
             Given this processed I94 travel history and YAML template, please format the data according to the template.
@@ -154,7 +129,7 @@ class I94Handler:
             previous_visa: "Y"   # Have you ever been issued a U.S. Visa? If any arrival dates are found in input, mark "Y" else leave empty "" 
 
             
-            Please format the response as valid YAML matching the template structure.
+            Return a JSON object with the fields and nesting of the template (the template is written as YAML).
             Rules:
             1. Use the exact dates provided (already in correct format)
             2. Use the calculated lengths of stay provided
@@ -165,25 +140,15 @@ class I94Handler:
             response = await self.client.chat.completions.create(
                 model="gpt-4o",
                 messages=[
-                    {"role": "system", "content": "You are a helpful assistant that processes I94 travel history data and converts it to YAML format."},
+                    {"role": "system", "content": "You are a helpful assistant that processes I94 travel history data into DS-160 form data."},
                     {"role": "user", "content": prompt}
                 ],
-                temperature=0
+                temperature=0,
+                response_format=response_format(("previous_travel_page",))
             )
             
-            result = response.choices[0].message.content
             logger.info("Received response from GPT-4o")
-            
-            # Clean up YAML code block markers if present
-            result = result.strip()
-            if result.startswith('```yaml'):
-                result = result[7:]
-            if result.startswith('```'):
-                result = result[3:]
-            if result.endswith('```'):
-                result = result[:-3]
-            
-            return result.strip()
+            return to_yaml(parse_response(response.choices[0].message))
             
         except Exception as e:
             logger.error(f"Error in GPT-4 processing: {str(e)}")
@@ -325,13 +290,8 @@ class I94Handler:
                             f.write(page_text)
                         logger.info(f"Saved raw content to {raw_content_file}")
 
-                        # Load the previous travel YAML template
-                        with open('src/templates/yaml_files/previous_travel_page.yaml', 'r') as f:
-                            yaml_template = f.read()
-                        
                         # Process the I94 data and get new YAML
-                        response = await self.generate_yaml_from_i94(page_text, yaml_template)
-                        new_yaml = yaml.safe_load(response)
+                        new_yaml = await self.build_previous_travel(page_text)
 
                         # Save for debugging
                         with open(log_dir / f"new_yaml_{timestamp}.yaml", 'w') as f:
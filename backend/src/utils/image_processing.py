@@ -0,0 +1,241 @@
+import os
+import io
+import math
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Rasterization settings, overridable from the environment
+DEFAULT_DPI = int(os.getenv('PDF_RASTER_DPI', '200'))
+DEFAULT_MAX_PAGES = int(os.getenv('PDF_RASTER_MAX_PAGES', '3'))
+POOL_WORKERS = int(os.getenv('PDF_RASTER_WORKERS', str(min(4, os.cpu_count() or 1))))
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Get the shared process pool for CPU-bound image work, creating it on first use"""
+    global _process_pool
+    if _process_pool is None:
+        logger.info(f"Starting image process pool with {POOL_WORKERS} workers")
+        _process_pool = ProcessPoolExecutor(max_workers=POOL_WORKERS)
+    return _process_pool
+
+
+def shutdown_process_pool() -> None:
+    """Shut down the shared process pool"""
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
+
+def _count_pdf_pages(pdf_content: bytes) -> int:
+    """Return the number of pages in a PDF (runs in a worker process)"""
+    from pdf2image import pdfinfo_from_bytes
+    info = pdfinfo_from_bytes(pdf_content)
+    return int(info.get('Pages', 0))
+
+
+def _render_pdf_page(pdf_content: bytes, page_number: int, dpi: int) -> bytes:
+    """Render a single PDF page to JPEG bytes (runs in a worker process)"""
+    from pdf2image import convert_from_bytes
+    images = convert_from_bytes(
+        pdf_content,
+        dpi=dpi,
+        fmt="jpeg",
+        first_page=page_number,
+        last_page=page_number,
+        transparent=False
+    )
+    if not images:
+        return b''
+    buffer = io.BytesIO()
+    images[0].convert('RGB').save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+
+async def rasterize_pdf(pdf_content: bytes, dpi: Optional[int] = None, max_pages: Optional[int] = None) -> List[bytes]:
+    """Convert the first max_pages pages of a PDF to in-memory JPEGs, one worker per page"""
+    dpi = dpi or DEFAULT_DPI
+    max_pages = max_pages or DEFAULT_MAX_PAGES
+
+    loop = asyncio.get_running_loop()
+    pool = get_process_pool()
+
+    page_count = await loop.run_in_executor(pool, _count_pdf_pages, pdf_content)
+    pages_to_render = min(page_count, max_pages)
+    logger.info(f"Rasterizing {pages_to_render} of {page_count} PDF pages at {dpi} DPI")
+
+    pages = await asyncio.gather(*[
+        loop.run_in_executor(pool, _render_pdf_page, pdf_content, page_number, dpi)
+        for page_number in range(1, pages_to_render + 1)
+    ])
+    return [page for page in pages if page]
+
+
+# Vision settings per upload type: detail level and JPEG quality.
+# "high" keeps small print legible, "low" is enough for large-print pages.
+VISION_PROFILES = {
+    'license': {'detail': 'high', 'quality': 80},
+    'visa': {'detail': 'high', 'quality': 80},
+    'travelTicket': {'detail': 'high', 'quality': 75},
+    'passportFirst': {'detail': 'high', 'quality': 85},
+    'passportLast': {'detail': 'low', 'quality': 75},
+}
+DEFAULT_VISION_PROFILE = {'detail': 'high', 'quality': 80}
+
+# gpt-4o image sizing: high detail fits the image in 2048x2048, then scales the
+# short side down to 768 and bills 170 tokens per 512px tile plus 85 base tokens.
+# Low detail is a flat 85 tokens for a 512x512 image.
+HIGH_DETAIL_MAX_SIDE = 2048
+HIGH_DETAIL_SHORT_SIDE = 768
+LOW_DETAIL_MAX_SIDE = 512
+BASE_TOKENS = 85
+TILE_TOKENS = 170
+TILE_SIZE = 512
+
+# Cropping margin around the detected document, and the smallest region we trust
+CROP_MARGIN = 0.02
+MIN_CROP_AREA = 0.3
+
+
+def get_vision_profile(doc_type: str) -> Dict[str, Any]:
+    """Get the vision profile for an upload type, ignoring any _pageN suffix"""
+    base_type = doc_type.split('_page')[0]
+    return VISION_PROFILES.get(base_type, DEFAULT_VISION_PROFILE)
+
+
+def _effective_size(width: int, height: int, detail: str) -> Tuple[int, int]:
+    """Size the model actually sees an image at for a detail level"""
+    if detail == 'low':
+        scale = min(1.0, LOW_DETAIL_MAX_SIDE / max(width, height))
+        return max(1, int(width * scale)), max(1, int(height * scale))
+
+    scale = min(1.0, HIGH_DETAIL_MAX_SIDE / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, HIGH_DETAIL_SHORT_SIDE / min(width, height))
+    return max(1, int(width * scale)), max(1, int(height * scale))
+
+
+def estimate_image_tokens(width: int, height: int, detail: str) -> int:
+    """Estimate gpt-4o input tokens for an image of the given size"""
+    if detail == 'low':
+        return BASE_TOKENS
+    width, height = _effective_size(width, height, detail)
+    tiles = math.ceil(width / TILE_SIZE) * math.ceil(height / TILE_SIZE)
+    return BASE_TOKENS + TILE_TOKENS * tiles
+
+
+def _find_document_box(image) -> Optional[Tuple[int, int, int, int]]:
+    """Find the document region by separating it from a uniform background"""
+    from PIL import Image, ImageChops
+
+    gray = image.convert('L')
+    width, height = gray.size
+    # Sample the corners to estimate the background colour
+    corners = [gray.getpixel((0, 0)), gray.getpixel((width - 1, 0)),
+               gray.getpixel((0, height - 1)), gray.getpixel((width - 1, height - 1))]
+    background = sorted(corners)[len(corners) // 2]
+
+    diff = ImageChops.difference(gray, Image.new('L', gray.size, background))
+    mask = diff.point(lambda value: 255 if value > 30 else 0)
+    box = mask.getbbox()
+    if not box:
+        return None
+
+    left, top, right, bottom = box
+    margin_x, margin_y = int(width * CROP_MARGIN), int(height * CROP_MARGIN)
+    box = (max(0, left - margin_x), max(0, top - margin_y),
+           min(width, right + margin_x), min(height, bottom + margin_y))
+
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    # Skip crops that barely help or that look like a misdetection
+    if area > 0.95 * width * height or area < MIN_CROP_AREA * width * height:
+        return None
+    return box
+
+
+def _prepare_image(image_bytes: bytes, detail: str, quality: int) -> Tuple[bytes, Dict[str, Any]]:
+    """Crop, resize and re-encode an image for a vision call (runs in a worker process)"""
+    from PIL import Image, ImageOps
+
+    image = Image.open(io.BytesIO(image_bytes))
+    image = ImageOps.exif_transpose(image).convert('RGB')
+    original_size = image.size
+
+    box = _find_document_box(image)
+    if box:
+        image = image.crop(box)
+
+    target_size = _effective_size(image.width, image.height, detail)
+    if target_size != image.size:
+        image = image.resize(target_size, Image.LANCZOS)
+
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=quality, optimize=True)
+    prepared = buffer.getvalue()
+
+    stats = {
+        'detail': detail,
+        'cropped': box is not None,
+        'original_size': list(original_size),
+        'prepared_size': list(image.size),
+        'original_bytes': len(image_bytes),
+        'prepared_bytes': len(prepared),
+        # Without a detail setting the API treats large images as high detail
+        'original_tokens': estimate_image_tokens(*original_size, 'high'),
+        'prepared_tokens': estimate_image_tokens(*image.size, detail),
+    }
+    return prepared, stats
+
+
+async def prepare_vision_image(image_bytes: bytes, doc_type: str) -> Tuple[bytes, Dict[str, Any]]:
+    """Prepare an uploaded image for gpt-4o using the profile for its document type"""
+    profile = get_vision_profile(doc_type)
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(
+            get_process_pool(), _prepare_image, image_bytes, profile['detail'], profile['quality']
+        )
+    except Exception as e:
+        # Anything PIL cannot open (e.g. a PDF fallback) is sent unchanged
+        logger.warning(f"Could not prepare {doc_type} image, sending original: {str(e)}")
+        return image_bytes, {
+            'detail': 'high',
+            'cropped': False,
+            'original_bytes': len(image_bytes),
+            'prepared_bytes': len(image_bytes),
+            'original_tokens': None,
+            'prepared_tokens': None,
+        }
+
+
+async def prepare_vision_images(images: Dict[str, bytes]) -> Tuple[Dict[str, bytes], Dict[str, Dict[str, Any]], Dict[str, Any]]:
+    """Prepare a set of images concurrently, returning images, per-image stats and totals"""
+    keys = list(images)
+    results = await asyncio.gather(*[prepare_vision_image(images[key], key) for key in keys])
+
+    prepared = {key: result[0] for key, result in zip(keys, results)}
+    stats = {key: result[1] for key, result in zip(keys, results)}
+
+    original_bytes = sum(item['original_bytes'] for item in stats.values())
+    prepared_bytes = sum(item['prepared_bytes'] for item in stats.values())
+    original_tokens = sum(item['original_tokens'] or 0 for item in stats.values())
+    prepared_tokens = sum(item['prepared_tokens'] or 0 for item in stats.values())
+    totals = {
+        'original_bytes': original_bytes,
+        'prepared_bytes': prepared_bytes,
+        'bytes_saved': original_bytes - prepared_bytes,
+        'original_tokens': original_tokens,
+        'prepared_tokens': prepared_tokens,
+        'tokens_saved': original_tokens - prepared_tokens,
+    }
+    logger.info(
+        f"Prepared {len(prepared)} images: {original_bytes} -> {prepared_bytes} bytes, "
+        f"~{original_tokens} -> ~{prepared_tokens} tokens"
+    )
+    return prepared, stats, totals
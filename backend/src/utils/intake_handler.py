@@ -0,0 +1,163 @@
+import asyncio
+import copy
+import logging
+import time
+from typing import Dict, Any, List, Optional, AsyncIterator
+
+from .passport_handler import PassportHandler
+from .document_handler import DocumentHandler
+from .linkedin_handler import LinkedInHandler
+from .i94_handler import I94Handler
+
+logger = logging.getLogger(__name__)
+
+# When two sources disagree on a value, the earlier source in this list wins.
+# Passport data is read straight off the document, I94 is the official travel
+# record, uploaded documents come next and LinkedIn is self-reported.
+SOURCE_PRIORITY = ['passport', 'i94', 'documents', 'linkedin']
+
+PASSPORT_FILES = ('passportFirst', 'passportLast')
+DOCUMENT_FILES = ('license', 'visa', 'travelTicket')
+
+
+def _is_empty(value: Any) -> bool:
+    return value is None or value == "" or value == [] or value == {}
+
+
+def merge_source_data(results: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Merge section data from several sources, filling gaps and recording conflicts"""
+    merged: Dict[str, Any] = {}
+    origins: Dict[str, str] = {}
+    conflicts: List[Dict[str, Any]] = []
+
+    def merge_into(target: Dict[str, Any], incoming: Dict[str, Any], source: str, path: str):
+        for key, value in incoming.items():
+            key_path = f"{path}.{key}" if path else key
+            if _is_empty(value):
+                target.setdefault(key, copy.deepcopy(value))
+                continue
+
+            existing = target.get(key)
+            if _is_empty(existing):
+                target[key] = copy.deepcopy(value)
+                origins[key_path] = source
+            elif isinstance(existing, dict) and isinstance(value, dict):
+                merge_into(existing, value, source, key_path)
+            elif existing != value:
+                # Lists are kept whole: mixing entries from two sources gives nonsense
+                conflicts.append({
+                    "path": key_path,
+                    "kept": existing,
+                    "kept_source": origins.get(key_path, _find_origin(origins, key_path)),
+                    "discarded": value,
+                    "discarded_source": source
+                })
+
+    ordered = sorted(results, key=lambda s: SOURCE_PRIORITY.index(s) if s in SOURCE_PRIORITY else len(SOURCE_PRIORITY))
+    for source in ordered:
+        data = results[source]
+        if isinstance(data, dict):
+            merge_into(merged, data, source, "")
+
+    return {"data": merged, "conflicts": conflicts}
+
+
+def _find_origin(origins: Dict[str, str], path: str) -> Optional[str]:
+    """Find which source set a value, looking at parent paths for nested values"""
+    while path:
+        if path in origins:
+            return origins[path]
+        path = path.rpartition('.')[0]
+    return None
+
+
+class IntakeHandler:
+    def __init__(self):
+        self.passport_handler = PassportHandler()
+        self.document_handler = DocumentHandler()
+        self.linkedin_handler = LinkedInHandler()
+        self.i94_handler = I94Handler()
+
+    def _build_jobs(self, files_data: Dict[str, bytes], linkedin_url: Optional[str],
+                    i94_data: Optional[Dict[str, Any]], metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """Create a coroutine for every source present in the request"""
+        jobs = {}
+
+        passport_files = {k: v for k, v in files_data.items() if k in PASSPORT_FILES and v}
+        if passport_files:
+            jobs['passport'] = self.passport_handler.process_data(passport_files, metadata)
+
+        document_files = {k: v for k, v in files_data.items() if k in DOCUMENT_FILES and v}
+        if document_files:
+            jobs['documents'] = self.document_handler.process_data(document_files, metadata)
+
+        if linkedin_url:
+            jobs['linkedin'] = self.linkedin_handler.process_data({"url": linkedin_url})
+
+        if i94_data:
+            jobs['i94'] = self.i94_handler.process_data(i94_data)
+
+        return jobs
+
+    async def process(self, files_data: Dict[str, bytes], linkedin_url: Optional[str] = None,
+                      i94_data: Optional[Dict[str, Any]] = None,
+                      metadata: Optional[Dict[str, Any]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Run every source concurrently, yielding an event as each finishes and the merged result last"""
+        start_time = time.monotonic()
+        jobs = self._build_jobs(files_data, linkedin_url, i94_data, metadata or {})
+        if not jobs:
+            yield {"status": "error", "message": "No intake sources provided"}
+            return
+
+        logger.info(f"Starting intake with sources: {list(jobs.keys())}")
+        yield {"status": "info", "message": f"Processing sources: {', '.join(jobs)}", "sources": list(jobs)}
+
+        async def run_source(name: str, job) -> tuple:
+            source_start = time.monotonic()
+            try:
+                result = await job
+            except Exception as e:
+                logger.error(f"Intake source {name} failed: {str(e)}", exc_info=True)
+                result = {"status": "error", "message": str(e)}
+            return name, result, time.monotonic() - source_start
+
+        tasks = [asyncio.create_task(run_source(name, job)) for name, job in jobs.items()]
+        results: Dict[str, Dict[str, Any]] = {}
+        source_status: Dict[str, Dict[str, Any]] = {}
+
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                name, result, duration = await next_done
+                status = result.get("status", "error")
+                source_status[name] = {"status": status, "duration": round(duration, 2)}
+                if status == "success":
+                    results[name] = result.get("data") or {}
+                    source_status[name]["sections"] = list(results[name].keys()) if isinstance(results[name], dict) else []
+                else:
+                    source_status[name]["message"] = result.get("message")
+                logger.info(f"Intake source {name} finished with status {status} in {duration:.2f}s")
+                yield {
+                    "status": "source_complete" if status == "success" else "source_error",
+                    "source": name,
+                    "duration": round(duration, 2),
+                    "message": result.get("message", f"{name} processed"),
+                    "data": results.get(name)
+                }
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+        merged = merge_source_data(results)
+        if merged["conflicts"]:
+            logger.info(f"Intake merge resolved {len(merged['conflicts'])} conflicts")
+
+        total_duration = time.monotonic() - start_time
+        yield {
+            "status": "complete",
+            "message": f"Intake completed in {total_duration:.2f}s",
+            "duration": round(total_duration, 2),
+            "sources": source_status,
+            "data": merged["data"],
+            "conflicts": merged["conflicts"]
+        }
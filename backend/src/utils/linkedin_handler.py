@@ -7,14 +7,35 @@ from pathlib import Path
 import json
 import yaml
 from datetime import datetime
-from playwright.async_api import async_playwright
 import re
 import random
 
 from .openai_handler import OpenAIHandler
+from .organization_directory import get_organization_directory
+from .linkedin_session import get_session_pool, is_signed_out_url
+from .linkedin_profile_cache import content_hash, get_profile_cache
+from .structured_output import response_format, parse_response, to_yaml
 
 logger = logging.getLogger(__name__)
 
+# Organizations per batched address lookup call
+ORG_LOOKUP_CHUNK_SIZE = int(os.getenv('ORG_LOOKUP_CHUNK_SIZE', '8'))
+
+# Save screenshots and HTML of every details page (slow, for debugging selectors)
+DEBUG_CAPTURE = os.getenv('LINKEDIN_DEBUG_CAPTURE', 'false').lower() == 'true'
+# Items of the experience/education list on /details/ pages
+DETAILS_LIST_SELECTOR = "main li.pvs-list__paged-list-item, main li.artdeco-list__item"
+DETAILS_WAIT_MS = int(os.getenv('LINKEDIN_DETAILS_WAIT_MS', '15000'))
+# /details/<section>/ pages scraped for a profile, in output order
+PROFILE_SECTIONS = ("experience", "education")
+
+# DS-160 sections generated from a profile
+WORK_EDUCATION_SECTIONS = ("workeducation1_page", "workeducation2_page")
+
+
+class SignedOutError(Exception):
+    """LinkedIn redirected a details page to the login or auth wall"""
+
 class LinkedInHandler:
     def __init__(self):
         # Try loading credentials from environment variables first
@@ -30,6 +51,9 @@ class LinkedInHandler:
         self.log_dir = Path(__file__).parent.parent / "logs"
         self.log_dir.mkdir(exist_ok=True)
         self.templates_dir = Path(__file__).parent.parent / "templates" / "yaml_files"
+        self.organization_directory = get_organization_directory()
+        self.session_pool = get_session_pool(self.log_dir)
+        self.profile_cache = get_profile_cache()
         
     def _load_credentials_from_dotenv(self):
         """Load LinkedIn credentials directly from .env file"""
@@ -70,16 +94,33 @@ class LinkedInHandler:
                 
             profile_url = data['url']
             logger.info(f"Processing LinkedIn profile: {profile_url}")
-            
-            # Extract LinkedIn data
-            profile_data = await self.extract_linkedin_data(profile_url)
-            
-            if not profile_data:
+
+            cached = self.profile_cache.get(profile_url)
+            sections: Dict[str, Dict[str, str]] = {}
+            if cached:
+                if self.profile_cache.is_trusted(cached):
+                    logger.info(f"Using cached LinkedIn data for {profile_url}")
+                    return self._cached_result(cached)
+
+                # Cheap freshness check: only the experience page, compared by hash
+                sections = await self.fetch_profile_sections(profile_url, ("experience",))
+                if sections and sections["experience"]["hash"] == cached.get("experience_hash"):
+                    logger.info(f"LinkedIn experience unchanged for {profile_url}, using cached data")
+                    self.profile_cache.touch(profile_url)
+                    return self._cached_result(cached)
+
+            # Full scrape, reusing the experience page if the freshness check already loaded it
+            missing = tuple(section for section in PROFILE_SECTIONS if section not in sections)
+            fetched = await self.fetch_profile_sections(profile_url, missing)
+            if not fetched:
                 return {
                     "status": "error",
                     "message": "Failed to extract data from LinkedIn profile"
                 }
-                
+            sections.update(fetched)
+            sections = {section: sections[section] for section in PROFILE_SECTIONS}
+            profile_data = self._format_profile_data(profile_url, sections)
+
             # Save raw data to file
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             raw_data_file = self.log_dir / f"linkedin_raw_{timestamp}.txt"
@@ -89,8 +130,12 @@ class LinkedInHandler:
             
             logger.info(f"Saved raw LinkedIn data to {raw_data_file}")
             
-            # Convert to YAML using OpenAI
-            yaml_data = await self.generate_yaml_from_linkedin(profile_data)
+            # Convert to YAML using OpenAI, unless the scraped text is identical to the cached one
+            if cached and cached.get("yaml") and cached.get("raw_hash") == content_hash(profile_data):
+                logger.info("LinkedIn text unchanged, reusing cached YAML")
+                yaml_data = cached["yaml"]
+            else:
+                yaml_data = await self.generate_yaml_from_linkedin(profile_data)
             
             if not yaml_data:
                 return {
@@ -108,6 +153,7 @@ class LinkedInHandler:
             # Parse YAML data
             try:
                 parsed_yaml = yaml.safe_load(yaml_data)
+                self.profile_cache.put(profile_url, profile_data, sections["experience"]["hash"], yaml_data)
                 return {
                     "status": "success",
                     "data": parsed_yaml
@@ -127,202 +173,95 @@ class LinkedInHandler:
                 "message": str(e)
             }
             
+    def _cached_result(self, cached: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "status": "success",
+            "data": yaml.safe_load(cached["yaml"]),
+            "cached": True
+        }
+
     async def extract_linkedin_data(self, profile_url: str) -> Optional[str]:
-        """Extract education and work experience data from LinkedIn profile using Playwright"""
+        """Extract education and work experience data from LinkedIn profile using the shared session"""
+        sections = await self.fetch_profile_sections(profile_url, PROFILE_SECTIONS)
+        return self._format_profile_data(profile_url, sections) if sections else None
+
+    async def fetch_profile_sections(self, profile_url: str, sections: Tuple[str, ...]) -> Dict[str, Dict[str, str]]:
+        """Load the given /details/ pages concurrently, returning {section: {"text", "hash"}} or {} on failure"""
         try:
-            headless = os.environ.get("HEADLESS_BROWSER", "true").lower() == "true"
-            logger.info(f"Launching browser with headless={headless}")
-            
             if not self.username or not self.password:
                 logger.error(f"LinkedIn credentials not found")
-                return None
-            
-            # Create dedicated LinkedIn logs directory
-            linkedin_logs_dir = self.log_dir / "linkedin"
-            linkedin_logs_dir.mkdir(exist_ok=True)
-            logger.info(f"LinkedIn logs will be saved to {linkedin_logs_dir}")
-            
-            # Use more modern user agent that's less likely to trigger security
-            modern_user_agent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
-            
-            # Generate a unique session ID for this extraction
-            session_id = f"linkedin_session_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-            session_log_dir = linkedin_logs_dir / session_id
-            session_log_dir.mkdir(exist_ok=True)
-            logger.info(f"Created session log directory: {session_log_dir}")
-            
-            async with async_playwright() as p:
-                # Log browser launch details
-                logger.info(f"Browser environment: Render={os.environ.get('IS_RENDER', 'false')}")
-                
-                # More advanced browser evasion techniques
-                browser = await p.chromium.launch(
-                    headless=headless,
-                    args=[
-                        '--window-size=1920,1080',
-                        '--disable-blink-features=AutomationControlled',
-                        '--no-sandbox',
-                        '--disable-setuid-sandbox',
-                        '--disable-dev-shm-usage',
-                        '--disable-infobars',
-                        '--ignore-certificate-errors',
-                        '--ignore-certificate-errors-spki-list',
-                        '--disable-web-security',
-                        '--disable-features=IsolateOrigins,site-per-process',
-                        '--disable-site-isolation-trials',
-                        # Disguise as regular Chrome
-                        '--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36',
-                    ]
-                )
-                
-                # Use more sophisticated fingerprint evasion
-                context = await browser.new_context(
-                    viewport={"width": 1920, "height": 1080},
-                    user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36",
-                    locale="en-US",
-                    timezone_id="America/New_York",
-                    has_touch=False, 
-                    permissions=["geolocation"],
-                    color_scheme="light",
-                    java_script_enabled=True,
-                    extra_http_headers={
-                        "Accept-Language": "en-US,en;q=0.9",
-                        "Sec-CH-UA": '"Google Chrome";v="123", "Chromium";v="123", "Not=A?Brand";v="99"',
-                        "Sec-CH-UA-Mobile": "?0",
-                        "Sec-CH-UA-Platform": '"Windows"'
-                    }
-                )
-                
-                # Add cookie handling to persist session data if available
-                cookie_file = self.log_dir / "linkedin_cookies.json"
-                if cookie_file.exists():
-                    try:
-                        cookies = json.loads(cookie_file.read_text())
-                        await context.add_cookies(cookies)
-                        logger.info("Loaded cookies from previous session")
-                    except Exception as e:
-                        logger.error(f"Failed to load cookies: {e}")
-                
-                context.set_default_timeout(90000)
-                page = await context.new_page()
-                
-                # Add more human-like behavior
-                await page.evaluate("""
-                    // Override navigator properties to avoid detection
-                    Object.defineProperty(navigator, 'webdriver', {
-                        get: () => false
-                    });
-                    
-                    // Add more natural browser properties
-                    window.chrome = {
-                        runtime: {}
-                    };
-                    
-                    // Simulate human-like values for various navigator properties
-                    Object.defineProperty(navigator, 'plugins', {
-                        get: () => {
-                            return [1, 2, 3, 4, 5];
-                        }
-                    });
-                    
-                    Object.defineProperty(navigator, 'languages', {
-                        get: () => ['en-US', 'en']
-                    });
-                """)
-                
+                return {}
+
+            session_log_dir = None
+            if DEBUG_CAPTURE:
+                session_id = f"linkedin_session_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+                session_log_dir = self.log_dir / "linkedin" / session_id
+                session_log_dir.mkdir(parents=True, exist_ok=True)
+                logger.info(f"Created session log directory: {session_log_dir}")
+
+            profile_url = profile_url.rstrip('/')
+            for attempt in range(2):
                 try:
-                    # Login process
-                    logger.info("Attempting LinkedIn login with anti-detection measures")
-                    
-                    # Take screenshots for debugging
-                    log_dir = self.log_dir / "linkedin_debug"
-                    log_dir.mkdir(exist_ok=True)
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    
-                    if not await self._login_with_security_handling(page, log_dir, timestamp):
-                        return None
-                    
-                    # Get data from both detail pages
-                    profile_data = []
-                    
-                    # Get experience details
-                    experience_url = f"{profile_url}/details/experience/"
-                    logger.info(f"Navigating to experience details: {experience_url}")
-                    await page.goto(experience_url, wait_until="domcontentloaded", timeout=60000)
-                    await page.wait_for_timeout(5000)  # Wait for dynamic content
-                    
-                    # Take screenshot of experience page
-                    await page.screenshot(path=session_log_dir / "04_experience_page.png", full_page=True)
-                    logger.info(f"Saved experience page screenshot")
-                    
-                    # Save experience page HTML for debugging
-                    experience_html = await page.content()
-                    with open(session_log_dir / "04_experience_page_html.txt", "w") as f:
-                        f.write(experience_html)
-                    logger.info(f"Saved experience page HTML content")
-                    
-                    experience_content = await page.evaluate("""
-                        () => {
-                            return document.body.innerText;
-                        }
-                    """)
-                    profile_data.append("\n=== EXPERIENCE DETAILS ===\n")
-                    profile_data.append(experience_content)
-                    
-                    # Get education details
-                    education_url = f"{profile_url}/details/education/"
-                    logger.info(f"Navigating to education details: {education_url}")
-                    await page.goto(education_url, wait_until="domcontentloaded", timeout=60000)
-                    await page.wait_for_timeout(5000)  # Wait for dynamic content
-                    
-                    # Take screenshot of education page
-                    await page.screenshot(path=session_log_dir / "05_education_page.png", full_page=True)
-                    logger.info(f"Saved education page screenshot")
-                    
-                    # Save education page HTML for debugging
-                    education_html = await page.content()
-                    with open(session_log_dir / "05_education_page_html.txt", "w") as f:
-                        f.write(education_html)
-                    logger.info(f"Saved education page HTML content")
-                    
-                    education_content = await page.evaluate("""
-                        () => {
-                            return document.body.innerText;
-                        }
-                    """)
-                    profile_data.append("\n=== EDUCATION DETAILS ===\n")
-                    profile_data.append(education_content)
-                    
-                    # Save the full content
-                    result = [
-                        f"LinkedIn Profile URL: {profile_url}",
-                        f"Experience URL: {experience_url}",
-                        f"Education URL: {education_url}",
-                        "\n",
-                        *profile_data
-                    ]
-                    
-                    # Save cookies for future use
-                    try:
-                        cookies = await context.cookies()
-                        cookie_file.write_text(json.dumps(cookies))
-                        logger.info("Saved cookies for future sessions")
-                    except Exception as e:
-                        logger.error(f"Failed to save cookies: {e}")
-                    
-                    return "\n".join(result)
-                    
-                except Exception as e:
-                    logger.error(f"Error during extraction: {str(e)}")
-                    raise
-                finally:
-                    await page.wait_for_timeout(10000)
-                    await browser.close()
-                
+                    async with self.session_pool.session(self._login_with_security_handling) as context:
+                        # Each details page loads side by side in its own tab
+                        results = await asyncio.gather(*[
+                            self._extract_details_page(context, f"{profile_url}/details/{section}/", session_log_dir, section)
+                            for section in sections
+                        ])
+                    return dict(zip(sections, results))
+                except SignedOutError as e:
+                    logger.warning(f"LinkedIn session signed out during extraction: {str(e)}")
+                    self.session_pool.invalidate()
+                    if attempt:
+                        raise
+
         except Exception as e:
             logger.error(f"Error in LinkedIn data extraction: {str(e)}", exc_info=True)
-            return None
-    
+            return {}
+
+    def _format_profile_data(self, profile_url: str, sections: Dict[str, Dict[str, str]]) -> str:
+        profile_url = profile_url.rstrip('/')
+        result = [f"LinkedIn Profile URL: {profile_url}"]
+        result += [f"{section.capitalize()} URL: {profile_url}/details/{section}/" for section in sections]
+        result.append("\n")
+        for section, content in sections.items():
+            result.append(f"\n=== {section.upper()} DETAILS ===\n")
+            result.append(content["text"])
+        return "\n".join(result)
+
+    async def _extract_details_page(self, context, url: str, session_log_dir: Optional[Path], name: str) -> Dict[str, str]:
+        """Open a profile details page in a new tab and return its text and a hash of its list items"""
+        page = await context.new_page()
+        try:
+            logger.info(f"Navigating to {url}")
+            await page.goto(url, wait_until="domcontentloaded", timeout=60000)
+            if is_signed_out_url(page.url):
+                raise SignedOutError(page.url)
+
+            # The details list is rendered client side; an empty section never gets items
+            try:
+                await page.wait_for_selector(DETAILS_LIST_SELECTOR, state="attached", timeout=DETAILS_WAIT_MS)
+            except Exception:
+                logger.info(f"No detail items rendered on {url} within {DETAILS_WAIT_MS}ms")
+
+            if session_log_dir:
+                await page.screenshot(path=session_log_dir / f"{name}_page.png", full_page=True)
+                with open(session_log_dir / f"{name}_page_html.txt", "w") as f:
+                    f.write(await page.content())
+                logger.info(f"Saved {name} page screenshot and HTML")
+
+            content = await page.evaluate("""
+                (selector) => {
+                    const main = document.querySelector('main');
+                    const items = Array.from(document.querySelectorAll(selector)).map(li => li.innerText);
+                    return { text: (main || document.body).innerText, items: items.join('\\n') };
+                }
+            """, DETAILS_LIST_SELECTOR)
+            # Hash only the list items so sidebars and notification counts don't count as changes
+            return {"text": content["text"], "hash": content_hash(content["items"] or content["text"])}
+        finally:
+            await page.close()
+
     async def _login_with_security_handling(self, page, log_dir, timestamp):
         """Enhanced login function that handles security challenges"""
         try:
@@ -361,7 +300,7 @@ class LinkedInHandler:
             await page.click("button[type='submit']")
             
             # Take screenshot immediately after clicking submit
-            await page.wait_for_timeout(2000)
+            await page.wait_for_load_state("domcontentloaded")
             await page.screenshot(path=session_folder / "02_after_submit.png")
             
             # First check for security verification screen
@@ -464,12 +403,7 @@ class LinkedInHandler:
             logger.info(f"Extracted {len(companies_and_institutions)} organizations for address lookup")
             
             # Perform address lookups for all organizations
-            address_data = {}
-            for org_type, org_name in companies_and_institutions:
-                address = await self._lookup_organization_address(org_name, org_type)
-                if address:
-                    address_data[org_name] = address
-                    logger.info(f"Found address for {org_name}: {address}")
+            address_data = await self._lookup_organization_addresses(companies_and_institutions)
             
             # Add address data to the prompt
             address_info = "\n\nOrganization contact information:\n"
@@ -480,7 +414,7 @@ class LinkedInHandler:
             
             # Complete prompt with address data
             prompt = f"""
-            Convert this LinkedIn profile data to DS-160 YAML format for these three sections:
+            Convert this LinkedIn profile data to DS-160 form data for these sections, returned as one JSON object with a key per section:
             - workeducation1_page
             - workeducation2_page
             
@@ -494,10 +428,10 @@ class LinkedInHandler:
             {templates_text}
             
             Rules:
-            1. Create YAML for each of the three work/education sections following the template format
+            1. Each section is an object with the fields and nesting of its template (the templates are written as YAML, the answer is JSON)
             2. Use "Y"/"N" for yes/no fields
-            3. Use "true"/"false" for boolean fields (yaml fields that end with _na)
-            4. Add button_clicks: [1, 2] at the end of each section
+            3. Fields that end with _na are JSON booleans: true or false, not strings
+            4. Set "button_clicks" to [1, 2] in each section
             5. For dates, use day format as 2 digits (01-31) if date is unavailable (if only year and month or only year is provied) use 01
             6. For month use 3-letter format (JAN, FEB, etc.), if only year is provided an no month is included use "JAN"
             7. For year use 4 digits such as 2020, 2021, 2022, etc.
@@ -529,14 +463,10 @@ class LinkedInHandler:
            
             
             Output format:
-            workeducation1_page:
-              # work history fields from template
-              button_clicks: [1, 2]
-              
-            workeducation2_page:
-              # education history fields from template
-              button_clicks: [1, 2]
-              
+            {{
+              "workeducation1_page": {{ work history fields from template, "button_clicks": [1, 2] }},
+              "workeducation2_page": {{ education history fields from template, "button_clicks": [1, 2] }}
+            }}
             """
             
             # Save prompt to file
@@ -553,20 +483,11 @@ class LinkedInHandler:
                 model="gpt-4o",
                 messages=[
                     {"role": "system", "content": prompt}
-                ]
+                ],
+                response_format=response_format(WORK_EDUCATION_SECTIONS)
             )
             
-            result = response.choices[0].message.content
-            
-            # Clean up YAML code block markers
-            result = result.strip()
-            if result.startswith('```yaml'):
-                result = result[7:]  # Remove ```yaml prefix
-            if result.startswith('```'):
-                result = result[3:]  # Remove ``` prefix
-            if result.endswith('```'):
-                result = result[:-3]  # Remove ``` suffix
-            result = result.strip()
+            result = to_yaml(parse_response(response.choices[0].message))
             
             return result
             
@@ -574,8 +495,8 @@ class LinkedInHandler:
             logger.error(f"Error generating YAML from LinkedIn data: {str(e)}", exc_info=True)
             return None
     
-    async def _extract_organizations(self, linkedin_data: str) -> List[Tuple[str, str]]:
-        """Extract company and educational institution names from LinkedIn data using GPT"""
+    async def _extract_organizations(self, linkedin_data: str) -> List[Tuple[str, str, str]]:
+        """Extract company and educational institution names and locations from LinkedIn data using GPT"""
         try:
             prompt = f"""
             Extract all company names and educational institutions from this LinkedIn profile data.
@@ -584,7 +505,8 @@ class LinkedInHandler:
             LinkedIn data:
             {linkedin_data}
             
-            For each organization, identify whether it's a company or educational institution.
+            For each organization, identify whether it's a company or educational institution,
+            and the location (city, country) shown for it in the profile if any.
             """
             
             # Define the function for GPT to call
@@ -610,6 +532,10 @@ class LinkedInHandler:
                                                 "type": "string",
                                                 "enum": ["company", "educational_institution"],
                                                 "description": "Type of organization"
+                                            },
+                                            "location": {
+                                                "type": "string",
+                                                "description": "City and country shown for the organization, empty if not shown"
                                             }
                                         },
                                         "required": ["name", "type"]
@@ -634,13 +560,13 @@ class LinkedInHandler:
             tool_call = response.choices[0].message.tool_calls[0]
             result = json.loads(tool_call.function.arguments)
             
-            # Convert to the format we need: List[Tuple[str, str]]
+            # Convert to the format we need: List[Tuple[str, str, str]]
             organizations = []
             for org in result.get("organizations", []):
                 org_name = org.get("name")
                 org_type = org.get("type")
                 if org_name and org_type:
-                    organizations.append((org_type, org_name))
+                    organizations.append((org_type, org_name, org.get("location", "")))
             
             return organizations
             
@@ -648,15 +574,44 @@ class LinkedInHandler:
             logger.error(f"Error extracting organizations: {str(e)}")
             return []
     
-    async def _lookup_organization_address(self, org_name: str, location: str = None) -> Optional[Dict]:
-        """Look up contact information for an organization with location hint"""
+    async def _lookup_organization_addresses(self, organizations: List[Tuple[str, str, str]]) -> Dict[str, Dict]:
+        """Look up contact information for all organizations, using the directory cache first"""
+        address_data, missing = self.organization_directory.split_cached(organizations)
+        logger.info(f"Organization directory hits: {len(address_data)}, lookups needed: {len(missing)}")
+        if not missing:
+            return address_data
+
+        # One function call per chunk, all chunks in flight at once
+        chunks = [missing[i:i + ORG_LOOKUP_CHUNK_SIZE] for i in range(0, len(missing), ORG_LOOKUP_CHUNK_SIZE)]
+        results = await asyncio.gather(*[self._lookup_organization_batch(chunk) for chunk in chunks])
+
+        for chunk, contacts in zip(chunks, results):
+            for org_type, org_name, location in chunk:
+                contact = contacts.get(org_name)
+                if contact:
+                    address_data[org_name] = contact
+                    self.organization_directory.put(org_name, location, contact)
+                    logger.info(f"Found address for {org_name}: {contact}")
+
+        self.organization_directory.save()
+        return address_data
+
+    async def _lookup_organization_batch(self, organizations: List[Tuple[str, str, str]]) -> Dict[str, Dict]:
+        """Look up contact information for several organizations in a single GPT call"""
         try:
-            # Modify prompt to include location if provided
-            prompt = f"Find the contact information for {org_name}"
-            if location and location.strip():
-                prompt += f" in {location}"
-            
-            prompt += ". Include the street address, city, state/province, postal code, country, and phone number if available."
+            # Results come back by number; the model may reformat names ("Google LLC" for "Google")
+            org_lines = []
+            for index, (org_type, org_name, location) in enumerate(organizations, 1):
+                line = f"{index}. {org_name} ({org_type.replace('_', ' ')})"
+                if location and location.strip():
+                    line += f" in {location}"
+                org_lines.append(line)
+
+            prompt = (
+                "Find the contact information for each of these organizations. Include the street address, "
+                "city, state/province, postal code, country, and phone number if available. "
+                "Identify each organization by its number in this list.\n\n" + "\n".join(org_lines)
+            )
             
             # Define the function for GPT to call
             tools = [
@@ -664,36 +619,49 @@ class LinkedInHandler:
                     "type": "function",
                     "function": {
                         "name": "provide_contact_info",
-                        "description": f"Provide address and phone details for {org_name}",
+                        "description": "Provide address and phone details for each organization",
                         "parameters": {
                             "type": "object",
                             "properties": {
-                                "street_address": {
-                                    "type": "string",
-                                    "description": "Street address including building number and street name"
-                                },
-                                "city": {
-                                    "type": "string",
-                                    "description": "City name"
-                                },
-                                "state_province": {
-                                    "type": "string",
-                                    "description": "State or province name"
-                                },
-                                "postal_code": {
-                                    "type": "string",
-                                    "description": "Postal or ZIP code"
-                                },
-                                "country": {
-                                    "type": "string",
-                                    "description": "Country name"
-                                },
-                                "phone_number": {
-                                    "type": "string",
-                                    "description": "Phone number with country code but without hypen, space or any other characters"
+                                "organizations": {
+                                    "type": "array",
+                                    "items": {
+                                        "type": "object",
+                                        "properties": {
+                                            "index": {
+                                                "type": "integer",
+                                                "description": "Number of the organization in the request list"
+                                            },
+                                            "street_address": {
+                                                "type": "string",
+                                                "description": "Street address including building number and street name"
+                                            },
+                                            "city": {
+                                                "type": "string",
+                                                "description": "City name"
+                                            },
+                                            "state_province": {
+                                                "type": "string",
+                                                "description": "State or province name"
+                                            },
+                                            "postal_code": {
+                                                "type": "string",
+                                                "description": "Postal or ZIP code"
+                                            },
+                                            "country": {
+                                                "type": "string",
+                                                "description": "Country name"
+                                            },
+                                            "phone_number": {
+                                                "type": "string",
+                                                "description": "Phone number with country code but without hypen, space or any other characters"
+                                            }
+                                        },
+                                        "required": ["index", "street_address", "city", "state_province", "country"]
+                                    }
                                 }
                             },
-                            "required": ["street_address", "city", "state_province", "country"]
+                            "required": ["organizations"]
                         }
                     }
                 }
@@ -710,12 +678,18 @@ class LinkedInHandler:
             # Parse the response
             tool_call = response.choices[0].message.tool_calls[0]
             result = json.loads(tool_call.function.arguments)
-            
-            # Log the address and phone found
-            logger.info(f"Contact info found for {org_name}: {result}")
-            
-            return result
+
+            contacts = {}
+            for contact in result.get("organizations", []):
+                index = contact.pop("index", None)
+                if isinstance(index, int) and 1 <= index <= len(organizations):
+                    contacts[organizations[index - 1][1]] = contact
+                else:
+                    logger.warning(f"Ignoring contact info with unknown organization number: {index!r}")
+
+            logger.info(f"Contact info found for {len(contacts)} of {len(organizations)} organizations")
+            return contacts
             
         except Exception as e:
-            logger.error(f"Error looking up contact info for {org_name}: {str(e)}")
-            return None 
\ No newline at end of file
+            logger.error(f"Error looking up contact info for {len(organizations)} organizations: {str(e)}")
+            return {}
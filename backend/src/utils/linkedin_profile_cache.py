@@ -0,0 +1,113 @@
+import os
+import hashlib
+import json
+import logging
+import re
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = Path(__file__).parent.parent / "logs" / "linkedin_profile_cache.json"
+
+# Entries older than this are scraped again from scratch
+CACHE_TTL_SECONDS = int(os.getenv('LINKEDIN_CACHE_TTL_SECONDS', str(7 * 24 * 3600)))
+# Entries younger than this are returned without even checking the experience page
+CACHE_TRUST_SECONDS = int(os.getenv('LINKEDIN_CACHE_TRUST_SECONDS', '3600'))
+
+
+def normalize_profile_url(url: str) -> str:
+    """Reduce a profile URL to linkedin.com/in/<slug> so variants share an entry"""
+    match = re.search(r'linkedin\.com/in/([^/?#]+)', url, re.IGNORECASE)
+    if match:
+        return f"linkedin.com/in/{match.group(1).lower()}"
+    return url.strip().rstrip('/').lower()
+
+
+def content_hash(text: str) -> str:
+    """Hash text ignoring whitespace differences"""
+    return hashlib.sha256(' '.join(text.split()).encode()).hexdigest()
+
+
+class LinkedInProfileCache:
+    """Persistent cache of extracted LinkedIn text and generated YAML keyed by profile URL"""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path or os.getenv('LINKEDIN_PROFILE_CACHE_PATH') or DEFAULT_CACHE_PATH)
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path) as f:
+                self._entries = json.load(f)
+            logger.info(f"Loaded {len(self._entries)} LinkedIn profiles from {self.path}")
+        except Exception as e:
+            logger.error(f"Error loading LinkedIn profile cache {self.path}: {str(e)}")
+            self._entries = {}
+
+    def save(self) -> None:
+        """Write the cache to disk, replacing the file atomically"""
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix('.tmp')
+            with open(tmp_path, 'w') as f:
+                json.dump(self._entries, f, indent=2)
+            tmp_path.replace(self.path)
+        except Exception as e:
+            logger.error(f"Error saving LinkedIn profile cache {self.path}: {str(e)}")
+
+    def get(self, profile_url: str) -> Optional[Dict[str, Any]]:
+        """Get the cached entry for a profile unless it has expired"""
+        key = normalize_profile_url(profile_url)
+        entry = self._entries.get(key)
+        if not entry:
+            return None
+        if time.time() - entry.get('fetched_at', 0) > CACHE_TTL_SECONDS:
+            logger.info(f"LinkedIn cache entry for {key} expired")
+            del self._entries[key]
+            return None
+        return entry
+
+    def is_trusted(self, entry: Dict[str, Any]) -> bool:
+        """Whether an entry is recent enough to use without a freshness check"""
+        return time.time() - entry.get('checked_at', 0) < CACHE_TRUST_SECONDS
+
+    def put(self, profile_url: str, raw_data: str, experience_hash: str, yaml_data: str) -> None:
+        now = time.time()
+        self._entries[normalize_profile_url(profile_url)] = {
+            'raw_data': raw_data,
+            'raw_hash': content_hash(raw_data),
+            'experience_hash': experience_hash,
+            'yaml': yaml_data,
+            'fetched_at': now,
+            'checked_at': now
+        }
+        self.save()
+
+    def touch(self, profile_url: str) -> None:
+        """Record that a freshness check found the profile unchanged"""
+        entry = self._entries.get(normalize_profile_url(profile_url))
+        if entry:
+            entry['checked_at'] = time.time()
+            self.save()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_cache: Optional[LinkedInProfileCache] = None
+
+
+def get_profile_cache() -> LinkedInProfileCache:
+    """Return the process-wide profile cache, loading it on first use
+
+    The /linkedin route and the intake handler must share it, or each save would
+    overwrite the entries the other one wrote."""
+    global _cache
+    if _cache is None:
+        _cache = LinkedInProfileCache()
+    return _cache
@@ -0,0 +1,218 @@
+import os
+import asyncio
+import json
+import logging
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Optional
+
+from playwright.async_api import async_playwright
+
+from utils.telemetry import BROWSER_SESSIONS_ACTIVE, BROWSER_SESSIONS_CAPACITY, QUEUE_WAIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Profiles extracted at the same time through the shared context (each uses two tabs)
+MAX_CONCURRENT_PROFILES = int(os.getenv('LINKEDIN_MAX_CONCURRENT', '2'))
+# How long a successful login check is trusted before the feed is checked again
+SESSION_CHECK_SECONDS = int(os.getenv('LINKEDIN_SESSION_CHECK_SECONDS', '300'))
+# Close the browser after this long without requests; it is relaunched on demand
+SESSION_IDLE_SECONDS = int(os.getenv('LINKEDIN_SESSION_IDLE_SECONDS', '900'))
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36"
+
+LAUNCH_ARGS = [
+    '--window-size=1920,1080',
+    '--disable-blink-features=AutomationControlled',
+    '--no-sandbox',
+    '--disable-setuid-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-infobars',
+    '--ignore-certificate-errors',
+    '--ignore-certificate-errors-spki-list',
+    '--disable-web-security',
+    '--disable-features=IsolateOrigins,site-per-process',
+    '--disable-site-isolation-trials',
+    f'--user-agent={USER_AGENT}',
+]
+
+# Runs before any page script in every tab of the context
+STEALTH_SCRIPT = """
+    Object.defineProperty(navigator, 'webdriver', { get: () => false });
+    window.chrome = { runtime: {} };
+    Object.defineProperty(navigator, 'plugins', { get: () => [1, 2, 3, 4, 5] });
+    Object.defineProperty(navigator, 'languages', { get: () => ['en-US', 'en'] });
+"""
+
+# URL fragments LinkedIn redirects to when the session is no longer signed in
+SIGNED_OUT_MARKERS = ('/login', '/authwall', '/checkpoint', '/uas/login')
+
+LoginFunc = Callable[[Any, Path, str], Awaitable[bool]]
+
+
+def is_signed_out_url(url: str) -> bool:
+    return any(marker in url for marker in SIGNED_OUT_MARKERS)
+
+
+class LinkedInSessionPool:
+    """One long-lived, signed-in LinkedIn browser context shared by all profile extractions"""
+
+    def __init__(self, cookie_file: Path, debug_dir: Path):
+        self.cookie_file = cookie_file
+        self.debug_dir = debug_dir
+        self.headless = os.environ.get("HEADLESS_BROWSER", "true").lower() == "true"
+        self._playwright = None
+        self._browser = None
+        self._context = None
+        self._verified_at = 0.0
+        self._last_used = 0.0
+        self._active = 0
+        self._lock = asyncio.Lock()
+        self._slots = asyncio.Semaphore(MAX_CONCURRENT_PROFILES)
+        BROWSER_SESSIONS_CAPACITY.set(MAX_CONCURRENT_PROFILES, pool="linkedin")
+        self._idle_task: Optional[asyncio.Task] = None
+
+    async def _start(self) -> None:
+        logger.info(f"Launching LinkedIn browser with headless={self.headless}")
+        self._playwright = await async_playwright().start()
+        self._browser = await self._playwright.chromium.launch(headless=self.headless, args=LAUNCH_ARGS)
+        self._context = await self._browser.new_context(
+            viewport={"width": 1920, "height": 1080},
+            user_agent=USER_AGENT,
+            locale="en-US",
+            timezone_id="America/New_York",
+            has_touch=False,
+            permissions=["geolocation"],
+            color_scheme="light",
+            java_script_enabled=True,
+            extra_http_headers={
+                "Accept-Language": "en-US,en;q=0.9",
+                "Sec-CH-UA": '"Google Chrome";v="123", "Chromium";v="123", "Not=A?Brand";v="99"',
+                "Sec-CH-UA-Mobile": "?0",
+                "Sec-CH-UA-Platform": '"Windows"'
+            }
+        )
+        await self._context.add_init_script(STEALTH_SCRIPT)
+        self._context.set_default_timeout(90000)
+
+        if self.cookie_file.exists():
+            try:
+                await self._context.add_cookies(json.loads(self.cookie_file.read_text()))
+                logger.info("Loaded cookies from previous session")
+            except Exception as e:
+                logger.error(f"Failed to load cookies: {e}")
+        self._verified_at = 0.0
+
+    async def _is_alive(self) -> bool:
+        return bool(self._browser and self._browser.is_connected() and self._context)
+
+    async def _ensure_signed_in(self, login: LoginFunc) -> None:
+        """Check the feed loads with the current cookies and log in again if it doesn't"""
+        if time.monotonic() - self._verified_at < SESSION_CHECK_SECONDS:
+            return
+
+        page = await self._context.new_page()
+        try:
+            await page.goto("https://www.linkedin.com/feed/", wait_until="domcontentloaded", timeout=30000)
+            if not is_signed_out_url(page.url):
+                logger.info("Reusing signed-in LinkedIn session")
+            else:
+                logger.info("LinkedIn session expired, logging in")
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                if not await login(page, self.debug_dir, timestamp):
+                    raise RuntimeError("LinkedIn login failed")
+            self._verified_at = time.monotonic()
+            await self.save_cookies()
+        finally:
+            await page.close()
+
+    async def save_cookies(self) -> None:
+        """Persist the context cookies so refreshed tokens survive a restart"""
+        if not self._context:
+            return
+        try:
+            cookies = await self._context.cookies()
+            tmp_file = self.cookie_file.with_suffix('.tmp')
+            tmp_file.write_text(json.dumps(cookies))
+            tmp_file.replace(self.cookie_file)
+        except Exception as e:
+            logger.error(f"Failed to save cookies: {e}")
+
+    def invalidate(self) -> None:
+        """Force a sign-in check on the next use, e.g. after landing on the auth wall"""
+        self._verified_at = 0.0
+
+    @asynccontextmanager
+    async def session(self, login: LoginFunc):
+        """Yield the shared signed-in context; callers open and close their own tabs"""
+        waiting_since = time.monotonic()
+        async with self._slots:
+            QUEUE_WAIT_SECONDS.observe(time.monotonic() - waiting_since, queue="linkedin_slot")
+            async with self._lock:
+                if not await self._is_alive():
+                    await self._close()
+                    await self._start()
+                await self._ensure_signed_in(login)
+                self._active += 1
+                BROWSER_SESSIONS_ACTIVE.set(self._active, pool="linkedin")
+            try:
+                yield self._context
+            finally:
+                self._active -= 1
+                BROWSER_SESSIONS_ACTIVE.set(self._active, pool="linkedin")
+                self._last_used = time.monotonic()
+                await self.save_cookies()
+                self._schedule_idle_close()
+
+    def _schedule_idle_close(self) -> None:
+        if self._idle_task and not self._idle_task.done():
+            return
+        self._idle_task = asyncio.create_task(self._close_when_idle())
+
+    async def _close_when_idle(self) -> None:
+        while True:
+            await asyncio.sleep(SESSION_IDLE_SECONDS)
+            async with self._lock:
+                if self._active == 0 and time.monotonic() - self._last_used >= SESSION_IDLE_SECONDS:
+                    logger.info("Closing idle LinkedIn browser")
+                    await self._close()
+                    return
+
+    async def _close(self) -> None:
+        try:
+            if self._browser:
+                await self._browser.close()
+            if self._playwright:
+                await self._playwright.stop()
+        except Exception as e:
+            logger.error(f"Error closing LinkedIn browser: {str(e)}")
+        finally:
+            self._playwright = self._browser = self._context = None
+
+    async def close(self) -> None:
+        """Save cookies and shut the browser down"""
+        if self._idle_task and not self._idle_task.done():
+            self._idle_task.cancel()
+        async with self._lock:
+            await self.save_cookies()
+            await self._close()
+
+
+_session_pool: Optional[LinkedInSessionPool] = None
+
+
+def get_session_pool(log_dir: Path) -> LinkedInSessionPool:
+    """Return the process-wide LinkedIn session pool, creating it on first use"""
+    global _session_pool
+    if _session_pool is None:
+        debug_dir = log_dir / "linkedin_debug"
+        debug_dir.mkdir(parents=True, exist_ok=True)
+        _session_pool = LinkedInSessionPool(log_dir / "linkedin_cookies.json", debug_dir)
+    return _session_pool
+
+
+async def close_session_pool() -> None:
+    if _session_pool is not None:
+        await _session_pool.close()
@@ -0,0 +1,117 @@
+import atexit
+import json
+import logging
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, List, Optional
+
+DEFAULT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(funcName)s - %(message)s'
+
+# "text" keeps the classic line format, "json" writes one object per line with any extra= fields
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text').lower()
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+# Per-module levels, e.g. "automation.form_handler=DEBUG,utils.linkedin_handler=WARNING"
+LOG_LEVELS = os.getenv('LOG_LEVELS', '')
+# Keep only a fraction of a module's records below WARNING, e.g. "automation.browser=0.1"
+LOG_SAMPLE = os.getenv('LOG_SAMPLE', '')
+
+# Attributes every LogRecord has; anything else on a record came from extra=
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+_listener: Optional[QueueListener] = None
+
+
+def _parse_pairs(text: str) -> Dict[str, str]:
+    pairs = {}
+    for item in text.split(','):
+        name, sep, value = item.partition('=')
+        if sep and name.strip() and value.strip():
+            pairs[name.strip()] = value.strip()
+    return pairs
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, including fields passed with extra="""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'func': record.funcName,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Pass every Nth record below WARNING for the configured logger prefixes"""
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        # Longest prefix first so "automation.form_handler" wins over "automation"
+        self.intervals = sorted(
+            ((prefix, max(1, round(1 / rate)) if rate > 0 else 0) for prefix, rate in rates.items()),
+            key=lambda item: -len(item[0]),
+        )
+        self._counts: Dict[str, int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        for prefix, interval in self.intervals:
+            if record.name == prefix or record.name.startswith(prefix + '.'):
+                if not interval:
+                    return False
+                count = self._counts.get(prefix, 0)
+                self._counts[prefix] = count + 1
+                return count % interval == 0
+        return True
+
+
+def configure_logging(handlers: List[logging.Handler], fmt: str = DEFAULT_FORMAT) -> None:
+    """Route all logging through a queue so callers never wait on file or console writes
+
+    The given handlers run on a background listener thread. Messages are formatted
+    when the record is queued, so hot paths should pass %-style arguments at DEBUG
+    and let disabled levels skip formatting entirely."""
+    global _listener
+    stop_logging()
+
+    formatter = JsonFormatter() if LOG_FORMAT == 'json' else logging.Formatter(fmt)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    sample_rates = {name: float(rate) for name, rate in _parse_pairs(LOG_SAMPLE).items()}
+    if sample_rates:
+        queue_handler.addFilter(SamplingFilter(sample_rates))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(LOG_LEVEL)
+    for name, level in _parse_pairs(LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level.upper())
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def stop_logging() -> None:
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
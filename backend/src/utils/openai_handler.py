@@ -1,19 +1,49 @@
 import os
 import openai
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, AsyncIterator, Tuple
 from pathlib import Path
 import json
 import yaml
 from prompts.pdf_to_yaml import PDF_TO_YAML_PROMPT
+from .section_stream import JsonSectionSplitter
+from .structured_output import response_format, parse_response, to_yaml, validate_section
+from utils.telemetry import instrument_openai_client
 from datetime import datetime
 import asyncio
 import re
 
 logger = logging.getLogger(__name__)
 
-class OpenAIHandler:
-    def __init__(self):
+# Sections the full DS-160 extraction produces, in form order
+DS160_SECTIONS = (
+    "personal_page1",
+    "personal_page2",
+    "travel_page",
+    "travel_companions_page",
+    "previous_travel_page",
+    "address_phone_page",
+    "pptvisa_page",
+    "us_contact_page",
+    "relatives_page",
+    "spouse_page",
+    "workeducation1_page",
+    "workeducation2_page",
+    "workeducation3_page",
+    "security_background1_page",
+    "security_background2_page",
+    "security_background3_page",
+    "security_background4_page",
+    "security_background5_page",
+)
+
+_shared_client: Optional[openai.AsyncOpenAI] = None
+
+
+def get_shared_client() -> openai.AsyncOpenAI:
+    """Get the process-wide AsyncOpenAI client so all handlers reuse one connection pool"""
+    global _shared_client
+    if _shared_client is None:
         # Try multiple possible environment variable names
         api_key = (
             os.getenv('OPENAI_API_KEY') or 
@@ -25,7 +55,14 @@ class OpenAIHandler:
             print("Available environment variables:", list(os.environ.keys()))
             raise ValueError("OpenAI API key not found in environment variables")
         
-        self.client = openai.AsyncOpenAI(api_key=api_key)
+        _shared_client = openai.AsyncOpenAI(api_key=api_key)
+        # Every chat completion gets an llm.call span, latency and token metrics
+        instrument_openai_client(_shared_client)
+    return _shared_client
+
+class OpenAIHandler:
+    def __init__(self):
+        self.client = get_shared_client()
         self.templates_dir = Path(__file__).parent.parent / "templates" / "yaml_files"
         logger.info(f"Template directory path: {self.templates_dir}")
 
@@ -38,14 +75,15 @@ class OpenAIHandler:
         with open(template_path) as f:
             return yaml.safe_load(f)
             
-    async def generate_yaml_from_text(self, text: str) -> str:
-        try:
-            # Load raw YAML templates with comments
-            templates_text = self._load_raw_yaml_templates()
-            logger.info("Loaded raw YAML templates with comments")
-            
-            prompt = f"""
-            Convert this PDF text to YAML format matching these templates.
+    def _build_yaml_prompt(self, text: str) -> str:
+        """Build the PDF text to YAML prompt from the raw templates"""
+        # Load raw YAML templates with comments
+        templates_text = self._load_raw_yaml_templates()
+        logger.info("Loaded raw YAML templates with comments")
+        
+        return f"""
+            Convert this PDF text to DS-160 form data matching these templates: one JSON object with a key per section,
+            each section an object with the fields and nesting of its template (the templates are written as YAML).
             
             PDF TEXT:
             {text}
@@ -75,7 +113,7 @@ class OpenAIHandler:
                - security_background5_page
 
             2. Button clicks should be an array of numbers, like:
-               button_clicks: [1, 2]
+               "button_clicks": [1, 2]
 
             3. Other rules remain same:
                - Make sure you pay attention to instructions that follow every yaml field after # in same line on the input yaml sample 
@@ -86,7 +124,7 @@ class OpenAIHandler:
                - workeducation1_page, workeducation2_page, workeducation3_page are found in "Work/Education/Training Information" section of the DS-160 input text
                - security_background1_page, security_background2_page, security_background3_page, security_background4_page, security_background5_page are found in "Security and Background" section of the DS-160 input text
                - Use "Y"/"N" for yes/no fields
-               - Use "true"/"false" for boolean fields (yaml fields that end with _na)
+               - Fields that end with _na are JSON booleans: true or false, not strings
                - If you see "DOES NOT APPLY" in the input text, that usualy means the field's _na version is true. 
                - Use 3-letter format for months (JAN, FEB, etc.)
                - For day field, use 2 digits for day (01, 02, ...31 etc.)
@@ -99,6 +137,10 @@ class OpenAIHandler:
                - If instructions case sensitive, make sure you follows same case as in options provided. So choose Self instead of SELF for instance. 
             """
 
+    async def generate_yaml_from_text(self, text: str) -> str:
+        try:
+            prompt = self._build_yaml_prompt(text)
+
             # Save prompt to file
             log_dir = Path(__file__).parent.parent / "logs"
             log_dir.mkdir(exist_ok=True)
@@ -116,20 +158,12 @@ class OpenAIHandler:
                 model="gpt-4o",
                 messages=[
                     {"role": "system", "content": prompt}
-                ]
+                ],
+                response_format=response_format(DS160_SECTIONS)
             )
             
-            result = response.choices[0].message.content
-            
-            # Clean up YAML code block markers
-            result = result.strip()
-            if result.startswith('```yaml'):
-                result = result[7:]  # Remove ```yaml prefix
-            if result.startswith('```'):
-                result = result[3:]  # Remove ``` prefix
-            if result.endswith('```'):
-                result = result[:-3]  # Remove ``` suffix
-            result = result.strip()  # Remove any extra whitespace
+            # The schema guarantees parseable JSON in the template shape
+            result = to_yaml(parse_response(response.choices[0].message))
             
             # Save response
             response_file = log_dir / f"response_{timestamp}.yaml"
@@ -145,6 +179,59 @@ class OpenAIHandler:
             logger.error(f"Error in generate_yaml_from_text: {str(e)}", exc_info=True)
             raise
 
+    async def stream_yaml_sections(self, text: str) -> AsyncIterator[Tuple[str, Any]]:
+        """Stream YAML generation and yield each top-level section as soon as it is complete"""
+        try:
+            prompt = self._build_yaml_prompt(text)
+
+            log_dir = Path(__file__).parent.parent / "logs"
+            log_dir.mkdir(exist_ok=True)
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+            prompt_file = log_dir / f"prompt_{timestamp}.txt"
+            with open(prompt_file, 'w') as f:
+                f.write(prompt)
+            logger.info(f"Saved prompt to {prompt_file}")
+
+            logger.info("Calling OpenAI API with streaming...")
+            stream = await self.client.chat.completions.create(
+                model="gpt-4o",
+                messages=[
+                    {"role": "system", "content": prompt}
+                ],
+                response_format=response_format(DS160_SECTIONS),
+                stream=True
+            )
+
+            splitter = JsonSectionSplitter()
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                for name, data in splitter.feed(delta):
+                    self._log_section_problems(name, data)
+                    yield name, data
+            splitter.flush()
+
+            response_file = log_dir / f"response_{timestamp}.json"
+            with open(response_file, 'w') as f:
+                f.write(splitter.text)
+            logger.info(f"Saved streamed response to {response_file}")
+
+        except Exception as e:
+            logger.error(f"Error in stream_yaml_sections: {str(e)}", exc_info=True)
+            raise
+
+    def _log_section_problems(self, name: str, data: Any) -> None:
+        """Validate a streamed section against the schema before handing it to the form filler"""
+        problems = validate_section(name, data, DS160_SECTIONS)
+        if problems:
+            logger.warning(f"Streamed section {name} has {len(problems)} schema problems: {problems[:5]}")
+        else:
+            logger.info(f"Streamed section complete: {name}")
+
     def _load_raw_yaml_templates(self) -> str:
         """Load all YAML templates as raw text to preserve comments"""
         try:
@@ -0,0 +1,105 @@
+import os
+import json
+import logging
+import re
+import unicodedata
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DIRECTORY_PATH = Path(__file__).parent.parent / "logs" / "organization_directory.json"
+
+# Legal suffixes that do not change which organization is meant
+COMPANY_SUFFIXES = re.compile(r'\b(inc|llc|ltd|limited|corp|corporation|co|company|gmbh|plc|sa|ag|bv)\b')
+
+
+def normalize_key(name: str, location: Optional[str] = None) -> str:
+    """Build a cache key that ignores case, accents, punctuation and legal suffixes"""
+    def normalize(text: str) -> str:
+        text = unicodedata.normalize('NFKD', text or '')
+        text = ''.join(c for c in text if not unicodedata.combining(c)).lower()
+        text = re.sub(r'[^a-z0-9 ]+', ' ', text)
+        text = COMPANY_SUFFIXES.sub(' ', text)
+        return ' '.join(text.split())
+
+    return f"{normalize(name)}|{normalize(location or '')}"
+
+
+class OrganizationDirectory:
+    """Persistent cache of organization contact details keyed by normalized (name, location)"""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path or os.getenv('ORG_DIRECTORY_PATH') or DEFAULT_DIRECTORY_PATH)
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path) as f:
+                self._entries = json.load(f)
+            logger.info(f"Loaded {len(self._entries)} organizations from {self.path}")
+        except Exception as e:
+            logger.error(f"Error loading organization directory {self.path}: {str(e)}")
+            self._entries = {}
+
+    def save(self) -> None:
+        """Write the directory to disk, replacing the file atomically"""
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix('.tmp')
+            with open(tmp_path, 'w') as f:
+                json.dump(self._entries, f, indent=2, sort_keys=True)
+            tmp_path.replace(self.path)
+        except Exception as e:
+            logger.error(f"Error saving organization directory {self.path}: {str(e)}")
+
+    def get(self, name: str, location: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Get cached contact details for an organization"""
+        entry = self._entries.get(normalize_key(name, location))
+        return entry.get('contact') if entry else None
+
+    def put(self, name: str, location: Optional[str], contact: Dict[str, Any]) -> None:
+        """Cache contact details for an organization"""
+        self._entries[normalize_key(name, location)] = {
+            'name': name,
+            'location': location or '',
+            'contact': contact
+        }
+
+    def split_cached(self, organizations: List[Tuple[str, str, str]]) -> Tuple[Dict[str, Dict[str, Any]], List[Tuple[str, str, str]]]:
+        """Split (type, name, location) tuples into cached contacts and ones still to look up"""
+        found = {}
+        missing = []
+        seen = set()
+        for org in organizations:
+            _, name, location = org
+            key = normalize_key(name, location)
+            if key in seen:
+                continue
+            seen.add(key)
+            contact = self.get(name, location)
+            if contact:
+                found[name] = contact
+            else:
+                missing.append(org)
+        return found, missing
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_directory: Optional[OrganizationDirectory] = None
+
+
+def get_organization_directory() -> OrganizationDirectory:
+    """Return the process-wide directory, loading it on first use
+
+    Every handler must share it: each save writes the whole in-memory dict, so a
+    second instance would overwrite the first one's entries."""
+    global _directory
+    if _directory is None:
+        _directory = OrganizationDirectory()
+    return _directory
@@ -1,14 +1,11 @@
-import os
 import asyncio
 import logging
 import time
-import shutil
 from typing import Dict, Any, List, Optional, Tuple
 from pathlib import Path
 import json
 import yaml
 from datetime import datetime
-import tempfile
 import re
 import base64
 import mimetypes
@@ -19,9 +16,16 @@ import io
 mimetypes.init()
 
 from .openai_handler import OpenAIHandler
+from .image_processing import rasterize_pdf, prepare_vision_images
+from .structured_output import response_format, parse_response, prune_empty, to_yaml
 
 logger = logging.getLogger(__name__)
 
+PASSPORT_SECTIONS = ("personal_page1", "personal_page2", "address_phone_page", "pptvisa_page", "relatives_page", "spouse_page")
+
+# JSON output repeats every template key, so it needs more room than the old YAML
+VISION_MAX_TOKENS = 8000
+
 class PassportHandler:
     def __init__(self):
         self.openai_handler = OpenAIHandler()
@@ -31,6 +35,8 @@ class PassportHandler:
         self.passport_log_dir = self.log_dir / "passport"
         self.passport_log_dir.mkdir(exist_ok=True)
         self.templates_dir = Path(__file__).parent.parent / "templates" / "yaml_files"
+        # Only the first pages of each upload carry the information we need
+        self.pdf_page_limits = {'passportFirst': 2, 'passportLast': 1}
         
     async def process_data(self, files_data: Dict[str, bytes], metadata: Dict[str, Any]) -> Dict[str, Any]:
         """Process uploaded passport documents and metadata in a single OpenAI call"""
@@ -56,52 +62,29 @@ class PassportHandler:
                         f.write(file_content)
                     logger.info(f"Saved original {file_type} document to {original_file_path}")
             
-            # Prepare images for OpenAI processing
+            # Prepare images for OpenAI processing, keeping them in memory
             for file_type, file_content in files_data.items():
                 if file_content:
                     if file_content.startswith(b'%PDF'):
                         # Handle PDF conversion
                         logger.info(f"Converting PDF for {file_type}")
-                        try:
-                            image_paths = await self.convert_pdf_to_images(file_content, file_type)
-                            if image_paths:  # Add check to make sure paths were returned
-                                for i, path in enumerate(image_paths):
-                                    key = f"{file_type}_page{i}" if i > 0 else file_type
-                                    prepared_files[key] = path
-                                    # Save converted image
-                                    suffix = f"_page{i}" if i > 0 else ""
-                                    log_path = session_dir / f"converted_{file_type}{suffix}.jpg"
-                                    shutil.copy2(path, log_path)
-                            else:
-                                # Fallback: If PDF conversion fails, save the PDF directly
-                                logger.warning(f"PDF conversion failed for {file_type}, sending PDF directly to OpenAI")
-                                
-                                # Save PDF for processing
-                                pdf_path = session_dir / f"original_{file_type}.pdf"
-                                with open(pdf_path, "wb") as f:
-                                    f.write(file_content)
-                                
-                                # Add to prepared files
-                                prepared_files[file_type] = str(pdf_path)
-                        except Exception as e:
-                            # Another fallback in case of conversion errors
-                            logger.error(f"Error converting PDF: {str(e)}")
-                            logger.warning(f"Sending PDF directly to OpenAI as fallback")
-                            
-                            # Save PDF for processing
-                            pdf_path = session_dir / f"original_{file_type}.pdf"
-                            with open(pdf_path, "wb") as f:
-                                f.write(file_content)
-                            
-                            # Add to prepared files
-                            prepared_files[file_type] = str(pdf_path)
+                        page_images = await self.convert_pdf_to_images(file_content, file_type)
+                        if page_images:
+                            for i, page_image in enumerate(page_images):
+                                key = f"{file_type}_page{i}" if i > 0 else file_type
+                                prepared_files[key] = page_image
+                                # Save converted image
+                                suffix = f"_page{i}" if i > 0 else ""
+                                log_path = session_dir / f"converted_{file_type}{suffix}.jpg"
+                                with open(log_path, "wb") as f:
+                                    f.write(page_image)
+                        else:
+                            # Fallback: If PDF conversion fails, send the PDF directly
+                            logger.warning(f"PDF conversion failed for {file_type}, sending PDF directly to OpenAI")
+                            prepared_files[file_type] = file_content
                     else:
                         # Handle image files directly
-                        extension = self._get_extension_for_file_type(file_type, file_content)
-                        temp_path = session_dir / f"temp_{file_type}{extension}"
-                        with open(temp_path, "wb") as f:
-                            f.write(file_content)
-                        prepared_files[file_type] = str(temp_path)
+                        prepared_files[file_type] = file_content
             
             # Load YAML templates
             templates_text = self._load_personal_templates()
@@ -118,7 +101,7 @@ class PassportHandler:
             
             # Create the system message
             system_message = f"""
-            Process these passport images and create DS-160 YAML for personal sections:
+            Process these passport images and fill these DS-160 personal sections, returned as one JSON object with a key per section:
             - personal_page1
             - personal_page2
             - address_phone_page
@@ -211,12 +194,12 @@ class PassportHandler:
             Rules:
             1. If PRE-FORMATTED YAML DATA is provided above, use it as a starting point
             2. Use "Y"/"N" for yes/no fields
-            3. Use "true"/"false" for boolean fields (yaml fields ending with _na)
-            4. Add button_clicks: [1, 2] at the end of each section
+            3. Fields ending with _na are JSON booleans: true or false, not strings
+            4. Set "button_clicks" to [1, 2] in each section; each section is an object with the fields and nesting of its template
             5. For dates: day format uses 2 digits (01-31), month uses 3-letter format (JAN, FEB), year uses 4 digits
             6. Extract passport information like full name, passport number, nationality, date of birth, place of birth, issuance and expiration dates
             7. If values aren't clearly visible, leave blank
-            8. Only generate YAML structure without any comments or explanations before or after 
+            8. Leave fields that are not in the templates above empty 
             9. For country dropdown use one of the following:  For country dropdown use one of the following: ["AFGHANISTAN", "ALBANIA", "ALGERIA",
             "AMERICAN SAMOA", "ANDORRA", "ANGOLA", "ANGUILLA", "ANTIGUA AND BARBUDA", "ARGENTINA", "ARMENIA", "ARUBA", "AUSTRALIA", "AUSTRIA", "AZERBAIJAN",
             "BAHAMAS", "BAHRAIN", "BANGLADESH", "BARBADOS", "BELARUS", "BELGIUM", "BELIZE", "BENIN", "BERMUDA", "BHUTAN", "BOLIVIA", "BONAIRE", "BOSNIA-HERZEGOVINA",
@@ -250,24 +233,29 @@ class PassportHandler:
             user_message = []
             user_message.append({
                 "type": "text", 
-                "text": "Extract information from these passport documents and create YAML for DS-160 personal sections. Focus on names, passport details, dates, place of birth, and nationality."
+                "text": "Extract information from these passport documents and fill the DS-160 personal sections. Focus on names, passport details, dates, place of birth, and nationality."
             })
             
+            # Crop, downscale and re-encode images to what the model actually uses
+            prepared_files, image_stats, image_totals = await prepare_vision_images(prepared_files)
+            with open(session_dir / "image_stats.json", "w") as f:
+                json.dump({"images": image_stats, "totals": image_totals}, f, indent=2)
+
             # Add each image
-            for file_type, file_path in prepared_files.items():
-                with open(file_path, "rb") as img_file:
-                    base64_image = base64.b64encode(img_file.read()).decode('utf-8')
-                    
-                    user_message.append({
-                        "type": "text", 
-                        "text": f"Document type: {file_type.upper()}"
-                    })
-                    user_message.append({
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:image/jpeg;base64,{base64_image}"
-                        }
-                    })
+            for file_type, image_bytes in prepared_files.items():
+                base64_image = base64.b64encode(image_bytes).decode('utf-8')
+                
+                user_message.append({
+                    "type": "text", 
+                    "text": f"Document type: {file_type.upper()}"
+                })
+                user_message.append({
+                    "type": "image_url",
+                    "image_url": {
+                        "url": f"data:image/jpeg;base64,{base64_image}",
+                        "detail": image_stats[file_type]["detail"]
+                    }
+                })
             
             # Log the user message structure (without base64 data)
             user_message_log = []
@@ -289,46 +277,29 @@ class PassportHandler:
                     {"role": "system", "content": system_message},
                     {"role": "user", "content": user_message}
                 ],
-                max_tokens=4000
+                max_tokens=VISION_MAX_TOKENS,
+                response_format=response_format(PASSPORT_SECTIONS)
             )
             
-            # Get the response and clean it
-            result = response.choices[0].message.content
-            
             # Save raw response
+            result = response.choices[0].message.content
             raw_file = session_dir / "openai_response.txt"
             with open(raw_file, "w") as f:
-                f.write(result)
+                f.write(result or "")
             
-            # Clean up YAML code block markers
-            result = result.strip()
-            if result.startswith('```yaml'):
-                result = result[7:]
-            if result.startswith('```'):
-                result = result[3:]
-            if result.endswith('```'):
-                result = result[:-3]
-            result = result.strip()
+            # The schema requires every template field; drop the ones the images didn't fill
+            parsed_yaml = prune_empty(parse_response(response.choices[0].message))
             
-            # Save cleaned YAML
+            # Save final YAML
             yaml_file = session_dir / "final_yaml.yaml"
             with open(yaml_file, "w") as f:
-                f.write(result)
+                f.write(to_yaml(parsed_yaml))
             
-            # Parse YAML data
-            try:
-                parsed_yaml = yaml.safe_load(result)
-                return {
-                    "status": "success",
-                    "data": parsed_yaml
-                }
-            except Exception as e:
-                logger.error(f"Error parsing YAML data: {str(e)}")
-                return {
-                    "status": "error",
-                    "message": f"Error parsing YAML data: {str(e)}",
-                    "raw_yaml": result
-                }
+            return {
+                "status": "success",
+                "data": parsed_yaml,
+                "image_stats": image_totals
+            }
                 
         except Exception as e:
             logger.error(f"Error processing passport documents: {str(e)}", exc_info=True)
@@ -336,66 +307,15 @@ class PassportHandler:
                 "status": "error",
                 "message": str(e)
             }
-        finally:
-            # Clean up temporary files
-            for file_path in prepared_files.values():
-                if os.path.exists(file_path) and not str(file_path).startswith(str(session_dir)):
-                    try:
-                        os.unlink(file_path)
-                    except Exception as e:
-                        logger.error(f"Error removing temp file: {str(e)}")
     
-    async def convert_pdf_to_images(self, pdf_content: bytes, file_type: str) -> List[str]:
-        """Convert PDF content to a list of image file paths"""
+    async def convert_pdf_to_images(self, pdf_content: bytes, file_type: str) -> List[bytes]:
+        """Convert the relevant PDF pages to in-memory JPEG images using the process pool"""
         try:
-            # Import pdf2image here to avoid dependency issues if not installed
-            from pdf2image import convert_from_bytes
-            
-            # Create a directory for PDF conversions
-            pdf_conversion_dir = self.passport_log_dir / "pdf_conversions"
-            pdf_conversion_dir.mkdir(exist_ok=True)
-            
-            # Create a timestamped subdirectory for this specific conversion
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            conversion_dir = pdf_conversion_dir / f"{file_type}_{timestamp}"
-            conversion_dir.mkdir(exist_ok=True)
-            
-            # Save original PDF for reference
-            pdf_path = conversion_dir / f"original_{file_type}.pdf"
-            with open(pdf_path, "wb") as f:
-                f.write(pdf_content)
-            logger.info(f"Saved original PDF to {pdf_path}")
-            
-            # Convert PDF bytes to images
-            logger.info(f"Converting PDF for {file_type} to images")
-            images = convert_from_bytes(
-                pdf_content,
-                dpi=200,  # Adjust DPI as needed for clarity vs file size
-                fmt="jpeg",
-                transparent=False
-            )
-            
-            image_paths = []
-            for i, image in enumerate(images):
-                # Save each page as an image with proper extension directly in the conversion directory
-                output_path = conversion_dir / f"{file_type}_page{i}.jpg"
-                image.save(str(output_path), "JPEG")
-                logger.info(f"Saved PDF page {i+1} for {file_type} to {output_path}")
-                
-                # Also save to a temp file for processing
-                with tempfile.NamedTemporaryFile(delete=False, suffix=f"_{file_type}_page{i}.jpg") as temp:
-                    image.save(temp.name, "JPEG")
-                    image_paths.append(temp.name)
-            
-            # Save a summary file with paths
-            summary_path = conversion_dir / "conversion_summary.txt"
-            with open(summary_path, "w") as f:
-                f.write(f"Original PDF: {pdf_path}\n\n")
-                f.write(f"Converted {len(images)} pages to images:\n")
-                for i in range(len(images)):
-                    f.write(f"Page {i+1}: {conversion_dir / f'{file_type}_page{i}.jpg'}\n")
-            
-            return image_paths
+            max_pages = self.pdf_page_limits.get(file_type)
+            logger.info(f"Converting PDF for {file_type} to images (max pages: {max_pages or 'default'})")
+            page_images = await rasterize_pdf(pdf_content, max_pages=max_pages)
+            logger.info(f"Converted {len(page_images)} PDF pages for {file_type}")
+            return page_images
             
         except ImportError:
             logger.error("pdf2image is not installed. Please install it with: pip install pdf2image")
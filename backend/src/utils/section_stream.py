@@ -0,0 +1,144 @@
+import asyncio
+import json
+import logging
+from typing import Dict, Any, List, Optional, Tuple, AsyncIterator
+
+logger = logging.getLogger(__name__)
+
+
+class JsonSectionSplitter:
+    """Split a streamed JSON object into its top-level members as soon as each value is complete"""
+
+    def __init__(self):
+        self._text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._key_start: Optional[int] = None
+        self._key: Optional[str] = None
+        self._value_start: Optional[int] = None
+
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        """Add a chunk of model output and return the sections it completed"""
+        self._text += text
+        completed = []
+        while self._pos < len(self._text):
+            section = self._scan(self._text[self._pos])
+            self._pos += 1
+            if section:
+                completed.append(section)
+        return completed
+
+    def flush(self) -> List[Tuple[str, Any]]:
+        """Nothing is buffered between members; report a truncated response"""
+        if self._depth:
+            logger.error(f"Streamed JSON ended inside section {self._key}")
+        return []
+
+    @property
+    def text(self) -> str:
+        """Full JSON text received so far"""
+        return self._text.strip()
+
+    def _scan(self, char: str) -> Optional[Tuple[str, Any]]:
+        if self._in_string:
+            if self._escaped:
+                self._escaped = False
+            elif char == '\\':
+                self._escaped = True
+            elif char == '"':
+                self._in_string = False
+                if self._depth == 1 and self._key_start is not None:
+                    self._key = json.loads(self._text[self._key_start:self._pos + 1])
+                    self._key_start = None
+            return None
+
+        if char == '"':
+            self._in_string = True
+            if self._depth == 1 and self._value_start is None:
+                if self._key is None:
+                    self._key_start = self._pos
+                else:
+                    self._value_start = self._pos
+            return None
+
+        if char in '{[':
+            self._depth += 1
+            if self._depth == 2 and self._value_start is None:
+                self._value_start = self._pos
+            return None
+
+        if char in '}]':
+            self._depth -= 1
+            if self._depth == 1:
+                return self._close_member(self._pos + 1)
+            if self._depth == 0:
+                return self._close_member(self._pos)
+            return None
+
+        if self._depth == 1:
+            if char == ',':
+                return self._close_member(self._pos)
+            if char != ':' and not char.isspace() and self._key is not None and self._value_start is None:
+                self._value_start = self._pos
+        return None
+
+    def _close_member(self, end: int) -> Optional[Tuple[str, Any]]:
+        if self._key is None or self._value_start is None:
+            return None
+        name, value_text = self._key, self._text[self._value_start:end]
+        self._key = self._value_start = None
+        try:
+            return name, json.loads(value_text)
+        except json.JSONDecodeError as e:
+            logger.error(f"Could not parse streamed section {name}: {str(e)}")
+            return None
+
+
+class SectionStream:
+    """Hand generated YAML sections to the form filler as soon as they are available"""
+
+    def __init__(self):
+        self._sections: Dict[str, asyncio.Future] = {}
+        self.closed = False
+        self.error: Optional[Exception] = None
+
+    def _future(self, name: str) -> asyncio.Future:
+        if name not in self._sections:
+            self._sections[name] = asyncio.get_running_loop().create_future()
+        return self._sections[name]
+
+    def publish(self, name: str, data: Any) -> None:
+        """Make a section available to any waiting page"""
+        future = self._future(name)
+        if not future.done():
+            future.set_result(data)
+            logger.info(f"Section available: {name}")
+
+    def close(self, error: Optional[Exception] = None) -> None:
+        """Mark the stream finished; sections that never arrived resolve to None"""
+        self.closed = True
+        self.error = error
+        for future in self._sections.values():
+            if not future.done():
+                future.set_result(None)
+
+    async def get(self, name: str) -> Optional[Any]:
+        """Wait for a section, returning None if the stream ended without it"""
+        future = self._future(name)
+        if self.closed and not future.done():
+            return None
+        return await future
+
+    async def consume(self, source: AsyncIterator[Tuple[str, Any]]) -> None:
+        """Publish every section produced by an async iterator, then close the stream"""
+        try:
+            async for name, data in source:
+                self.publish(name, data)
+        except Exception as e:
+            logger.error(f"Section stream failed: {str(e)}")
+            self.close(e)
+            raise
+        else:
+            self.close()
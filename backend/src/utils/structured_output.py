@@ -0,0 +1,194 @@
+import json
+import logging
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+import yaml
+
+from mappings.form_mapping import FormMapping, load_page_definitions
+
+logger = logging.getLogger(__name__)
+
+TEMPLATES_DIR = Path(__file__).parent.parent / "templates" / "yaml_files"
+DEFINITIONS_DIR = Path(__file__).parent.parent.parent / "form_definitions"
+
+# Option lists longer than this (countries, states) stay free text and are described in the prompt
+ENUM_MAX_OPTIONS = 60
+# Structured outputs accept a limited number of enum values per schema
+ENUM_BUDGET = 1000
+
+INDEX_PATTERN = re.compile(r'_ctl\d+_')
+
+
+def _normalize_id(element_id: str) -> str:
+    return INDEX_PATTERN.sub('_ctl00_', element_id.replace('$', '_'))
+
+
+def _option_fields(definition: Dict[str, Any]) -> Dict[str, List[str]]:
+    """Option values of every dropdown and radio in a definition, including ones revealed by dependencies"""
+    options: Dict[str, List[str]] = {}
+
+    def add(field: Dict[str, Any]):
+        if field.get('type') in ('dropdown', 'radio') and isinstance(field.get('value'), list):
+            options.setdefault(_normalize_id(field['name']), field['value'])
+
+    def walk(dependencies: Optional[Dict[str, Any]]):
+        for dependency in (dependencies or {}).values():
+            for field in dependency.get('shows', []) or []:
+                add(field)
+            walk(dependency.get('dependencies'))
+
+    for field in definition.get('fields', []):
+        add(field)
+    walk(definition.get('dependencies'))
+    return options
+
+
+@lru_cache(maxsize=1)
+def _page_options() -> Dict[str, Dict[str, List[str]]]:
+    """{page: {yaml path: option values}} built from the page mappings and form definitions"""
+    from automation.dependency_table import expand_definition
+
+    form_mapping = FormMapping()
+    definitions = load_page_definitions(DEFINITIONS_DIR)
+    page_options = {}
+    for page_name, mapping in form_mapping.form_mapping.items():
+        definition = definitions.get(page_name)
+        if not definition:
+            continue
+        options = _option_fields(expand_definition(definition))
+        page_options[page_name] = {
+            path: options[_normalize_id(element_id)]
+            for path, element_id in mapping.items()
+            if _normalize_id(element_id) in options
+        }
+    return page_options
+
+
+def _merge_list_items(items: List[Any]) -> Any:
+    """Template lists show one or more example elements; the schema item is their union"""
+    dict_items = [item for item in items if isinstance(item, dict)]
+    if not dict_items:
+        return items[0] if items else ""
+    merged: Dict[str, Any] = {}
+    for item in dict_items:
+        for key, value in item.items():
+            merged.setdefault(key, value)
+    return merged
+
+
+def _schema_for(value: Any, path: str, key: str, options: Dict[str, List[str]], budget: List[int]) -> Dict[str, Any]:
+    if isinstance(value, dict):
+        properties = {
+            k: _schema_for(v, f"{path}.{k}" if path else k, k, options, budget)
+            for k, v in value.items()
+        }
+        return {"type": "object", "properties": properties, "required": list(properties), "additionalProperties": False}
+    if isinstance(value, list):
+        return {"type": "array", "items": _schema_for(_merge_list_items(value), path, key, options, budget)}
+    if key.endswith('_na') or isinstance(value, bool):
+        return {"type": "boolean"}
+    if isinstance(value, int):
+        return {"type": "integer"}
+
+    schema: Dict[str, Any] = {"type": "string"}
+    values = options.get(path)
+    if values and len(values) <= ENUM_MAX_OPTIONS:
+        enum = list(dict.fromkeys([""] + [str(v) for v in values]))
+        if len(enum) <= budget[0]:
+            budget[0] -= len(enum)
+            schema["enum"] = enum
+    return schema
+
+
+@lru_cache(maxsize=32)
+def section_schema(sections: Tuple[str, ...]) -> Dict[str, Any]:
+    """JSON schema for the given DS-160 sections, built from the YAML templates and definition option lists"""
+    page_options = _page_options()
+    budget = [ENUM_BUDGET]
+    properties = {}
+    for section in sections:
+        template_path = TEMPLATES_DIR / f"{section}.yaml"
+        with open(template_path) as f:
+            template = (yaml.safe_load(f) or {}).get(section) or {}
+        schema = _schema_for(template, "", section, page_options.get(section, {}), budget)
+        schema["properties"]["button_clicks"] = {"type": "array", "items": {"type": "integer"}}
+        schema["required"] = list(schema["properties"])
+        properties[section] = schema
+
+    return {"type": "object", "properties": properties, "required": list(properties), "additionalProperties": False}
+
+
+def response_format(sections: Tuple[str, ...], name: str = "ds160_sections") -> Dict[str, Any]:
+    """response_format argument constraining a chat completion to the section schema"""
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": name, "schema": section_schema(tuple(sections)), "strict": True}
+    }
+
+
+def parse_response(message) -> Dict[str, Any]:
+    """Load the JSON content of a structured-output message"""
+    refusal = getattr(message, "refusal", None)
+    if refusal:
+        raise ValueError(f"Model refused the request: {refusal}")
+    return json.loads(message.content)
+
+
+def prune_empty(data: Any) -> Any:
+    """Drop empty strings, lists and objects so partial extractions don't overwrite other sources"""
+    if isinstance(data, dict):
+        pruned = {k: prune_empty(v) for k, v in data.items()}
+        return {k: v for k, v in pruned.items() if v not in ("", [], {}, None)}
+    if isinstance(data, list):
+        pruned = [prune_empty(item) for item in data]
+        return [item for item in pruned if item not in ("", [], {}, None)]
+    return data
+
+
+def to_yaml(data: Dict[str, Any]) -> str:
+    """Render parsed sections in the YAML shape the rest of the pipeline reads"""
+    return yaml.safe_dump(data, sort_keys=False, allow_unicode=True, default_flow_style=None)
+
+
+def validate_section(name: str, data: Any, sections: Tuple[str, ...]) -> List[str]:
+    """Check a section against its schema, returning readable problems (empty when valid)"""
+    problems: List[str] = []
+
+    def check(schema: Dict[str, Any], value: Any, path: str):
+        expected = schema.get("type")
+        if expected == "object":
+            if not isinstance(value, dict):
+                problems.append(f"{path}: expected object")
+                return
+            for key in schema["required"]:
+                if key not in value:
+                    problems.append(f"{path}.{key}: missing")
+            for key, item in value.items():
+                if key in schema["properties"]:
+                    check(schema["properties"][key], item, f"{path}.{key}")
+                else:
+                    problems.append(f"{path}.{key}: unexpected field")
+        elif expected == "array":
+            if not isinstance(value, list):
+                problems.append(f"{path}: expected array")
+                return
+            for i, item in enumerate(value):
+                check(schema["items"], item, f"{path}[{i}]")
+        elif expected == "boolean" and not isinstance(value, bool):
+            problems.append(f"{path}: expected boolean")
+        elif expected == "integer" and (not isinstance(value, int) or isinstance(value, bool)):
+            problems.append(f"{path}: expected integer")
+        elif expected == "string":
+            if not isinstance(value, str):
+                problems.append(f"{path}: expected string")
+            elif "enum" in schema and value not in schema["enum"]:
+                problems.append(f"{path}: {value!r} is not an allowed option")
+
+    schema = section_schema(tuple(sections))["properties"].get(name)
+    if schema is None:
+        return [f"{name}: unknown section"]
+    check(schema, data, name)
+    return problems
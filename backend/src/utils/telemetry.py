@@ -0,0 +1,385 @@
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SPAN_PATH = Path(__file__).parent.parent / "logs" / "spans.jsonl"
+
+# Where finished spans go: "file" (JSON lines), "zipkin" (v2 JSON to a collector) or "none"
+SPAN_EXPORTER = os.getenv('SPAN_EXPORTER', 'file').lower()
+SPAN_EXPORT_PATH = Path(os.getenv('SPAN_EXPORT_PATH') or DEFAULT_SPAN_PATH)
+# Zipkin, Jaeger and the OpenTelemetry collector all accept this format
+ZIPKIN_URL = os.getenv('ZIPKIN_URL', 'http://localhost:9411/api/v2/spans')
+# Spans are buffered and written in batches, and whenever a root span ends
+SPAN_BATCH_SIZE = int(os.getenv('SPAN_BATCH_SIZE', '200'))
+SERVICE_NAME = "ds160-automation"
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar('current_span', default=None)
+
+
+class Span:
+    """One timed operation; nested spans share the trace id of the outermost one"""
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else None
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.start = time.time()
+        self.duration: Optional[float] = None
+        self.status = "ok"
+        self._started = time.perf_counter()
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def end(self) -> None:
+        self.duration = time.perf_counter() - self._started
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'start': self.start,
+            'duration': self.duration,
+            'status': self.status,
+            'attributes': self.attributes,
+        }
+
+    def to_zipkin(self) -> Dict[str, Any]:
+        span = {
+            'traceId': self.trace_id,
+            'id': self.span_id,
+            'name': self.name,
+            'timestamp': int(self.start * 1_000_000),
+            'duration': int((self.duration or 0) * 1_000_000),
+            'localEndpoint': {'serviceName': SERVICE_NAME},
+            'tags': {key: str(value) for key, value in self.attributes.items()},
+        }
+        if self.parent_id:
+            span['parentId'] = self.parent_id
+        if self.status != "ok":
+            span['tags']['error'] = self.status
+        return span
+
+
+class SpanExporter:
+    """Buffers finished spans and hands them to the configured sink in batches"""
+
+    def __init__(self, kind: str = SPAN_EXPORTER, path: Path = SPAN_EXPORT_PATH, url: str = ZIPKIN_URL):
+        self.kind = kind
+        self.path = path
+        self.url = url
+        self._buffer: List[Span] = []
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        if self.kind == 'none':
+            return
+        with self._lock:
+            self._buffer.append(span)
+            full = len(self._buffer) >= SPAN_BATCH_SIZE
+        if full or span.parent_id is None:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        if not batch:
+            return
+        if self.kind == 'zipkin':
+            # Never hold up the event loop on the collector
+            threading.Thread(target=self._post, args=(batch,), daemon=True).start()
+        else:
+            self._write(batch)
+
+    def _write(self, batch: List[Span]) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'a') as f:
+                for span in batch:
+                    f.write(json.dumps(span.to_dict(), default=str) + '\n')
+        except Exception as e:
+            logger.error(f"Error writing spans to {self.path}: {str(e)}")
+
+    def _post(self, batch: List[Span]) -> None:
+        try:
+            httpx.post(self.url, json=[span.to_zipkin() for span in batch], timeout=5.0).raise_for_status()
+        except Exception as e:
+            logger.warning(f"Could not export {len(batch)} spans to {self.url}: {str(e)}")
+
+
+exporter = SpanExporter()
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Span]:
+    """Time the enclosed block as a child of the current span; works in sync and async code
+
+    Exceptions mark the span as errored and are re-raised."""
+    current = Span(name, _current_span.get(), attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.status = type(e).__name__
+        raise
+    finally:
+        current.end()
+        _current_span.reset(token)
+        exporter.export(current)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+# Prometheus text exposition
+
+def _label_text(labelnames: Sequence[str], labelvalues: Tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        registry.append(self)
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(_escape(labels.get(name, '')) for name in self.labelnames)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        return '\n'.join(lines + self._samples())
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_label_text(self.labelnames, key)} {value}" for key, value in values.items()]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_label_text(self.labelnames, key)} {value}" for key, value in values.items()]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: count per bucket (last one is +Inf), sum
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = {key: (list(counts), total) for key, (counts, total) in self._values.items()}
+        lines = []
+        for key, (counts, total) in values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else f'{bound:g}'
+                bucket = _label_text(self.labelnames, key, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{bucket} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(self.labelnames, key)} {total}")
+            lines.append(f"{self.name}_count{_label_text(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+registry: List[_Metric] = []
+
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text format, for the /metrics endpoint"""
+    return '\n'.join(metric.render() for metric in registry) + '\n'
+
+
+PAGE_FILL_SECONDS = Histogram(
+    'ds160_page_fill_seconds', 'Time to fill and submit one DS-160 page', ['page', 'engine']
+)
+QUEUE_WAIT_SECONDS = Histogram(
+    'queue_wait_seconds', 'Time spent waiting for data or a free slot before work could start', ['queue'],
+    buckets=(0.01, 0.1, 0.5, 1, 5, 15, 30, 60, 300)
+)
+LLM_REQUEST_SECONDS = Histogram(
+    'llm_request_seconds', 'OpenAI chat completion latency', ['model', 'stream'],
+    buckets=(0.5, 1, 2, 5, 10, 20, 40, 60, 120)
+)
+LLM_TOKENS = Counter('llm_tokens_total', 'OpenAI tokens used', ['model', 'type'])
+BROWSER_SESSIONS_ACTIVE = Gauge('browser_sessions_active', 'Browser sessions currently in use', ['pool'])
+BROWSER_SESSIONS_CAPACITY = Gauge('browser_sessions_capacity', 'Browser sessions the pool allows at once', ['pool'])
+DS160_RUNS = Counter('ds160_runs_total', 'Finished DS-160 runs by how they ended', ['kind', 'status'])
+
+
+def _record_usage(llm_span: Span, model: str, usage) -> None:
+    llm_span.set_attributes(prompt_tokens=usage.prompt_tokens, completion_tokens=usage.completion_tokens)
+    LLM_TOKENS.inc(usage.prompt_tokens, model=model, type='prompt')
+    LLM_TOKENS.inc(usage.completion_tokens, model=model, type='completion')
+
+
+def _end_stream_span(llm_span: Span, model: str, started: float, status: str) -> None:
+    llm_span.status = status
+    llm_span.end()
+    LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, model=model, stream='true')
+    exporter.export(llm_span)
+
+
+class _TracedStream:
+    """A streamed completion whose llm.call span and latency last until the stream is used up
+
+    Usage arrives in a final chunk without choices when stream_options include_usage is set."""
+
+    def __init__(self, stream, llm_span: Span, model: str, started: float):
+        self._stream = stream
+        self._iterator = stream.__aiter__()
+        self._span = llm_span
+        self._model = model
+        self._started = started
+        self._finished = False
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._stream, name)
+
+    def __aiter__(self) -> "_TracedStream":
+        return self
+
+    async def __anext__(self):
+        try:
+            chunk = await self._iterator.__anext__()
+        except StopAsyncIteration:
+            self.finish()
+            raise
+        except BaseException as e:
+            self.finish(type(e).__name__)
+            raise
+        if 'first_chunk_seconds' not in self._span.attributes:
+            self._span.set_attribute('first_chunk_seconds', round(time.perf_counter() - self._started, 3))
+        usage = getattr(chunk, 'usage', None)
+        if usage is not None:
+            _record_usage(self._span, self._model, usage)
+        return chunk
+
+    async def close(self) -> None:
+        self.finish()
+        await self._stream.close()
+
+    def finish(self, status: str = "ok") -> None:
+        if self._finished:
+            return
+        self._finished = True
+        _end_stream_span(self._span, self._model, self._started, status)
+
+
+def instrument_openai_client(client) -> None:
+    """Wrap client.chat.completions.create with an llm.call span and the LLM metrics"""
+    completions = client.chat.completions
+    create = completions.create
+
+    async def traced_create(*args, **kwargs):
+        model = kwargs.get('model', '')
+        stream = bool(kwargs.get('stream'))
+        request_bytes = len(json.dumps(kwargs.get('messages', []), default=str))
+        if stream:
+            # Not the span() context manager: the caller iterates the stream after this returns
+            kwargs['stream_options'] = {**(kwargs.get('stream_options') or {}), 'include_usage': True}
+            llm_span = Span("llm.call", current_span(), {'model': model, 'stream': True, 'request_bytes': request_bytes})
+            started = time.perf_counter()
+            try:
+                response = await create(*args, **kwargs)
+            except BaseException as e:
+                _end_stream_span(llm_span, model, started, type(e).__name__)
+                raise
+            return _TracedStream(response, llm_span, model, started)
+
+        with span("llm.call", model=model, stream=stream, request_bytes=request_bytes) as llm_span:
+            with LLM_REQUEST_SECONDS.time(model=model, stream='false'):
+                response = await create(*args, **kwargs)
+            usage = getattr(response, 'usage', None)
+            if usage is not None:
+                _record_usage(llm_span, model, usage)
+            return response
+
+    completions.create = traced_create
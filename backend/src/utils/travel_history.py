@@ -0,0 +1,157 @@
+import logging
+import math
+from datetime import date, datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Formats seen in the I94 history table and in exports of it; the first one that
+# parses a row is tried first for the next row
+DATE_FORMATS = (
+    "%Y-%m-%d",
+    "%m/%d/%Y",
+    "%d-%b-%Y",
+    "%d %b %Y",
+    "%b %d, %Y",
+    "%B %d, %Y",
+    "%Y/%m/%d",
+)
+
+ARRIVAL = "arrival"
+DEPARTURE = "departure"
+
+# The previous visits list on the form has room for this many entries
+MAX_FORM_VISITS = 5
+
+# Length of Stay - Period options on the previous travel page, exact text
+LESS_THAN_24_HOURS = "Less than 24 Hours"
+
+
+class TravelVisit(NamedTuple):
+    visit: str          # 1-based position, latest visit first
+    arrival_date: str   # DD-MON-YYYY, e.g. 05-MAR-2023
+    months: int         # length of stay in calendar months, partial months rounded up
+    days: int           # length of stay in days
+
+
+class _DateParser:
+    def __init__(self):
+        self._formats = list(DATE_FORMATS)
+
+    def __call__(self, text: str) -> Optional[date]:
+        text = text.strip()
+        for i, fmt in enumerate(self._formats):
+            try:
+                parsed = datetime.strptime(text, fmt).date()
+            except ValueError:
+                continue
+            if i:
+                self._formats.insert(0, self._formats.pop(i))
+            return parsed
+        return None
+
+
+def parse_travel_history(table_text: str) -> Tuple[List[date], List[str]]:
+    """Parse the tab separated I94 history table into parallel lists of dates and event types"""
+    lines = [line for line in table_text.strip().split('\n') if line.strip()]
+    if not lines:
+        return [], []
+
+    header = [column.strip().upper() for column in lines[0].split('\t')]
+    try:
+        date_col = header.index('DATE')
+        type_col = header.index('TYPE')
+    except ValueError:
+        raise ValueError(f"I94 table header missing DATE/TYPE columns: {lines[0]!r}")
+
+    parse_date = _DateParser()
+    dates: List[date] = []
+    types: List[str] = []
+    for line in lines[1:]:
+        cells = line.split('\t')
+        if len(cells) <= max(date_col, type_col):
+            continue
+        event_date = parse_date(cells[date_col])
+        event_type = cells[type_col].strip().lower()
+        if event_date is None or event_type not in (ARRIVAL, DEPARTURE):
+            logger.warning(f"Skipping unrecognised I94 row: {line!r}")
+            continue
+        dates.append(event_date)
+        types.append(event_type)
+    return dates, types
+
+
+def months_between(start: date, end: date) -> int:
+    """Calendar months from start to end, counting any partial month as a whole one"""
+    months = (end.year - start.year) * 12 + end.month - start.month
+    if end.day > start.day:
+        months += 1
+    return max(months, 0)
+
+
+def pair_visits(dates: List[date], types: List[str], today: Optional[date] = None) -> List[TravelVisit]:
+    """Pair each arrival with the departure listed just before it (history is latest first)
+
+    When the latest event is an arrival the traveller is still in the U.S.,
+    so today stands in for the departure.
+    """
+    if not dates:
+        return []
+
+    previous_date, previous_type = dates[0], types[0]
+    if previous_type != DEPARTURE:
+        previous_date, previous_type = today or date.today(), DEPARTURE
+        start = 0
+    else:
+        start = 1
+
+    visits: List[TravelVisit] = []
+    for event_date, event_type in zip(dates[start:], types[start:]):
+        if event_type == ARRIVAL and previous_type == DEPARTURE:
+            visits.append(TravelVisit(
+                str(len(visits) + 1),
+                event_date.strftime('%d-%b-%Y').upper(),
+                months_between(event_date, previous_date),
+                (previous_date - event_date).days
+            ))
+        previous_date, previous_type = event_date, event_type
+    return visits
+
+
+def process_travel_history(table_text: str, today: Optional[date] = None) -> List[TravelVisit]:
+    """Turn the I94 history table text into visits with arrival dates and lengths of stay"""
+    dates, types = parse_travel_history(table_text)
+    return pair_visits(dates, types, today)
+
+
+def length_of_stay(visit: TravelVisit) -> Tuple[str, str]:
+    """Express a stay in the largest unit that still reads naturally: days, weeks, months or years"""
+    if visit.days < 1:
+        return "", LESS_THAN_24_HOURS
+    if visit.days < 14:
+        return str(visit.days), "Day(s)"
+    if visit.days < 60:
+        return str(math.ceil(visit.days / 7)), "Week(s)"
+    if visit.months < 24:
+        return str(visit.months), "Month(s)"
+    return str(math.ceil(visit.months / 12)), "Year(s)"
+
+
+def render_previous_travel(visits: List[TravelVisit], max_visits: int = MAX_FORM_VISITS) -> Dict[str, Any]:
+    """Map processed visits straight into the previous_travel_page section of the YAML template"""
+    details = []
+    for visit in visits[:max_visits]:
+        day, month, year = visit.arrival_date.split('-')
+        number, unit = length_of_stay(visit)
+        details.append({
+            "arrival": {"month": month, "day": day.zfill(2), "year": year},
+            "length_of_stay": {"number": number, "unit": unit}
+        })
+
+    return {
+        "previous_travel_page": {
+            "previous_us_travel": "Y" if details else "N",
+            "previous_travel_details": details,
+            "previous_visa": "Y" if details else ""
+        }
+    }
@@ -15,13 +15,15 @@ export async function processWithOpenAI(text: string) {
   return response.json();
 }
 
-export async function runDS160(yamlContent: string): Promise<Response> {
+export async function runDS160(yamlContent: string, detached = false): Promise<Response> {
   // Create a blob from the YAML content
   const yamlBlob = new Blob([yamlContent], { type: 'text/yaml' });
   
   // Create form data for file upload
   const formData = new FormData();
   formData.append('file', yamlBlob, 'form_data.yaml');
+  // Detached runs keep going if the stream is closed; follow them with getDS160Run
+  formData.append('detached', String(detached));
   
   // Make the request using the environment-based URL
   const response = await fetch(`${API_BASE_URL}/api/ds160/run-ds160`, {
@@ -36,6 +38,90 @@ export async function runDS160(yamlContent: string): Promise<Response> {
   return response;
 }
 
+export async function validateDS160(yamlContent: string) {
+  // Pre-flight check against the form definitions, no browser is started
+  const yamlBlob = new Blob([yamlContent], { type: 'text/yaml' });
+
+  const formData = new FormData();
+  formData.append('file', yamlBlob, 'form_data.yaml');
+
+  const response = await fetch(`${API_BASE_URL}/api/ds160/validate`, {
+    method: 'POST',
+    body: formData,
+  });
+
+  if (!response.ok) {
+    throw new Error(`Server responded with status: ${response.status}`);
+  }
+
+  return response.json();
+}
+
+export async function planDS160(yamlContent: string) {
+  // Dry run: ordered browser actions and estimated wall time, no browser is started
+  const yamlBlob = new Blob([yamlContent], { type: 'text/yaml' });
+
+  const formData = new FormData();
+  formData.append('file', yamlBlob, 'form_data.yaml');
+
+  const response = await fetch(`${API_BASE_URL}/api/ds160/plan`, {
+    method: 'POST',
+    body: formData,
+  });
+
+  if (!response.ok) {
+    throw new Error(`Server responded with status: ${response.status}`);
+  }
+
+  return response.json();
+}
+
+export async function runDS160Pipeline(sessionYamlContent: string, pdfText: string, detached = false): Promise<Response> {
+  // Session YAML only needs start_page and retrieve_page/security_page,
+  // the remaining sections are generated from the PDF text while the form is filled
+  const yamlBlob = new Blob([sessionYamlContent], { type: 'text/yaml' });
+
+  const formData = new FormData();
+  formData.append('file', yamlBlob, 'session_data.yaml');
+  formData.append('pdf_text', pdfText);
+  formData.append('detached', String(detached));
+
+  const response = await fetch(`${API_BASE_URL}/api/ds160/run-pipeline`, {
+    method: 'POST',
+    body: formData,
+  });
+
+  if (!response.ok) {
+    throw new Error(`Server responded with status: ${response.status}`);
+  }
+
+  return response;
+}
+
+export async function getDS160Run(runId: string) {
+  // Status and recent progress messages of a run, using the run_id from its first stream message
+  const response = await fetch(`${API_BASE_URL}/api/ds160/runs/${runId}`);
+
+  if (!response.ok) {
+    throw new Error(`Server responded with status: ${response.status}`);
+  }
+
+  return response.json();
+}
+
+export async function cancelDS160Run(runId: string) {
+  // Stops the run and closes its browser
+  const response = await fetch(`${API_BASE_URL}/api/ds160/runs/${runId}`, {
+    method: 'DELETE',
+  });
+
+  if (!response.ok) {
+    throw new Error(`Server responded with status: ${response.status}`);
+  }
+
+  return response.json();
+}
+
 export const processLinkedIn = async (data: { url: string }) => {
   try {
     console.log('Sending LinkedIn URL to API:', data.url);
@@ -169,4 +255,49 @@ export async function processPassport(
     console.error('Error processing passport:', error);
     throw error;
   }
-} 
\ No newline at end of file
+} 
+export async function processIntake(
+  files: {
+    passportFirst?: File,
+    passportLast?: File,
+    license?: File,
+    visa?: File,
+    travelTicket?: File
+  },
+  sources: {
+    linkedinUrl?: string,
+    i94?: {
+      givenName: string;
+      surname: string;
+      birthDate: string;
+      documentNumber: string;
+      documentCountry: string;
+    }
+  },
+  metadata: {
+    yamlData?: any
+  }
+): Promise<Response> {
+  // All sources run concurrently on the server; the response streams one
+  // JSON event per line as each source finishes, then the merged result
+  const formData = new FormData();
+
+  Object.entries(files).forEach(([key, file]) => {
+    if (file) formData.append(key, file);
+  });
+  if (sources.linkedinUrl) formData.append('linkedinUrl', sources.linkedinUrl);
+  if (sources.i94) formData.append('i94', JSON.stringify(sources.i94));
+  formData.append('metadata', JSON.stringify(metadata));
+
+  const response = await fetch(`${API_BASE_URL}/api/intake/process`, {
+    method: 'POST',
+    body: formData,
+  });
+
+  if (!response.ok) {
+    const errorText = await response.text();
+    throw new Error(`Failed to process intake: ${errorText}`);
+  }
+
+  return response;
+}
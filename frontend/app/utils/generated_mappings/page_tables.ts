@@ -0,0 +1,71 @@
+// Generated by scripts/compile_mappings.py - do not edit
+
+export const pageDefinitionFiles: Record<string, string> = {
+  "start_page": "p0_start_page_definition",
+  "retrieve_page": "p0_retrieve_page_definition",
+  "security_page": "p0_security_page_definition",
+  "timeout_page": "p0_timeout_page_definition",
+  "personal_page1": "p1_personal1_definition",
+  "personal_page2": "p2_personal2_definition",
+  "travel_page": "p3_travel_definition",
+  "travel_companions_page": "p4_travelcompanions_definition",
+  "previous_travel_page": "p5_previousustravel_definition",
+  "address_phone_page": "p6_addressphone_definition",
+  "pptvisa_page": "p7_pptvisa_definition",
+  "us_contact_page": "p8_uscontact_definition",
+  "relatives_page": "p9_relatives_definition",
+  "workeducation1_page": "p10_workeducation1_definition",
+  "workeducation2_page": "p11_workeducation2_definition",
+  "workeducation3_page": "p12_workeducation3_definition",
+  "security_background1_page": "p13_securityandbackground1_definition",
+  "security_background2_page": "p14_securityandbackground2_definition",
+  "security_background3_page": "p15_securityandbackground3_definition",
+  "security_background4_page": "p16_securityandbackground4_definition",
+  "security_background5_page": "p17_securityandbackground5_definition",
+  "spouse_page": "p18_spouse_definition"
+}
+
+export const pageUrls: Record<string, string> = {
+  "personal_page1": "https://ceac.state.gov/GenNIV/General/complete/complete_personal.aspx?node=Personal1",
+  "personal_page2": "https://ceac.state.gov/GenNIV/General/complete/complete_personalcont.aspx?node=Personal2",
+  "travel_page": "https://ceac.state.gov/GenNIV/General/complete/complete_travel.aspx?node=Travel",
+  "travel_companions_page": "https://ceac.state.gov/GenNIV/General/complete/complete_travelcompanions.aspx?node=TravelCompanions",
+  "previous_travel_page": "https://ceac.state.gov/GenNIV/General/complete/complete_previousustravel.aspx?node=PreviousUSTravel",
+  "address_phone_page": "https://ceac.state.gov/GenNIV/General/complete/complete_contact.aspx?node=AddressPhone",
+  "pptvisa_page": "https://ceac.state.gov/GenNIV/General/complete/Passport_Visa_Info.aspx?node=PptVisa",
+  "us_contact_page": "https://ceac.state.gov/GenNIV/General/complete/complete_uscontact.aspx?node=USContact",
+  "relatives_page": "https://ceac.state.gov/GenNIV/General/complete/complete_family1.aspx?node=Relatives",
+  "workeducation1_page": "https://ceac.state.gov/GenNIV/General/complete/complete_workeducation1.aspx?node=WorkEducation1",
+  "workeducation2_page": "https://ceac.state.gov/GenNIV/General/complete/complete_workeducation2.aspx?node=WorkEducation2",
+  "workeducation3_page": "https://ceac.state.gov/GenNIV/General/complete/complete_workeducation3.aspx?node=WorkEducation3",
+  "security_background1_page": "https://ceac.state.gov/GenNIV/General/complete/complete_securityandbackground1.aspx?node=SecurityandBackground1",
+  "security_background2_page": "https://ceac.state.gov/GenNIV/General/complete/complete_securityandbackground2.aspx?node=SecurityandBackground2",
+  "security_background3_page": "https://ceac.state.gov/GenNIV/General/complete/complete_securityandbackground3.aspx?node=SecurityandBackground3",
+  "security_background4_page": "https://ceac.state.gov/GenNIV/General/complete/complete_securityandbackground4.aspx?node=SecurityandBackground4",
+  "security_background5_page": "https://ceac.state.gov/GenNIV/General/complete/complete_securityandbackground5.aspx?node=SecurityandBackground5",
+  "spouse_page": "https://ceac.state.gov/GenNIV/General/complete/complete_family2.aspx?node=Spouse"
+}
+
+export const pageIdentifiers: Record<string, string> = {
+  "start_page": "#ctl00_ddlLanguage",
+  "retrieve_page": "#ctl00_SiteContentPlaceHolder_ApplicationRecovery1_tbxApplicationID",
+  "security_page": "#ctl00_SiteContentPlaceHolder_chkbxPrivacyAct",
+  "personal_page1": "#ctl00_SiteContentPlaceHolder_FormView1_tbxAPP_SURNAME",
+  "personal_page2": "#ctl00_SiteContentPlaceHolder_FormView1_ddlAPP_NATL",
+  "travel_page": "#ctl00_SiteContentPlaceHolder_FormView1_dlPrincipalAppTravel_ctl00_ddlPurposeOfTrip",
+  "travel_companions_page": "#ctl00_SiteContentPlaceHolder_FormView1_rblOtherPersonsTravelingWithYou",
+  "previous_travel_page": "#ctl00_SiteContentPlaceHolder_FormView1_rblPREV_US_TRAVEL_IND",
+  "address_phone_page": "#ctl00_SiteContentPlaceHolder_FormView1_tbxAPP_ADDR_LN1",
+  "pptvisa_page": "#ctl00_SiteContentPlaceHolder_FormView1_tbxPPT_NUM",
+  "us_contact_page": "#ctl00_SiteContentPlaceHolder_FormView1_tbxUS_POC_SURNAME",
+  "relatives_page": "#ctl00_SiteContentPlaceHolder_FormView1_tbxFATHER_SURNAME",
+  "workeducation1_page": "#ctl00_SiteContentPlaceHolder_FormView1_ddlPresentOccupation",
+  "workeducation2_page": "#ctl00_SiteContentPlaceHolder_FormView1_rblPreviouslyEmployed",
+  "workeducation3_page": "#ctl00_SiteContentPlaceHolder_FormView1_dtlLANGUAGES_ctl00_tbxLANGUAGE_NAME",
+  "security_background1_page": "#ctl00_SiteContentPlaceHolder_FormView1_rblDisease",
+  "security_background2_page": "#ctl00_SiteContentPlaceHolder_FormView1_rblArrested",
+  "security_background3_page": "#ctl00_SiteContentPlaceHolder_FormView1_rblIllegalActivity",
+  "security_background4_page": "#ctl00_SiteContentPlaceHolder_FormView1_rblImmigrationFraud",
+  "security_background5_page": "#ctl00_SiteContentPlaceHolder_FormView1_rblChildCustody",
+  "spouse_page": "#ctl00_SiteContentPlaceHolder_FormView1_tbxSpouseSurname"
+}
@@ -17,27 +17,10 @@ import securityBackground3 from './generated_mappings/security_background3_page_
 import securityBackground4 from './generated_mappings/security_background4_page_mapping.json'
 import securityBackground5 from './generated_mappings/security_background5_page_mapping.json'
 import spouse from './generated_mappings/spouse_page_mapping.json'
+import { pageDefinitionFiles } from './generated_mappings/page_tables'
 import { debugLog } from './consoleLogger'
-// Convert Python mappings to TypeScript
-export const pageNameMappings: Record<string, string> = {
-  'personal_page1': 'p1_personal1_definition',
-  'personal_page2': 'p2_personal2_definition',
-  'travel_companions_page': 'p4_travelcompanions_definition',
-  'previous_travel_page': 'p5_previousustravel_definition',
-  'address_phone_page': 'p6_addressphone_definition',
-  'pptvisa_page': 'p7_pptvisa_definition',
-  'us_contact_page': 'p8_uscontact_definition',
-  'relatives_page': 'p9_relatives_definition',
-  'spouse_page': 'p18_spouse_definition',
-  'workeducation1_page': 'p10_workeducation1_definition',
-  'workeducation2_page': 'p11_workeducation2_definition',
-  'workeducation3_page': 'p12_workeducation3_definition',
-  'security_background1_page': 'p13_securityandbackground1_definition',
-  'security_background2_page': 'p14_securityandbackground2_definition',
-  'security_background3_page': 'p15_securityandbackground3_definition',
-  'security_background4_page': 'p16_securityandbackground4_definition',
-  'security_background5_page': 'p17_securityandbackground5_definition'
-}
+// Page -> definition file table generated from backend/src/mappings/form_mapping.py
+export const pageNameMappings: Record<string, string> = pageDefinitionFiles
 
 export const formMappings: Record<string, Record<string, string>> = {
     "personal_page1": personal1.form_mapping,
@@ -1,18 +1,25 @@
-from playwright.sync_api import sync_playwright
+import asyncio
+import argparse
+import hashlib
 import json
-import time
 import os
+import sys
+import time
+from datetime import datetime
 from dotenv import load_dotenv
-from backend.src.automation.form_handler import FormHandler
-from backend.src.mappings.form_mapping import FormMapping, FormPage
-from backend.src.automation.browser import BrowserHandler
 import yaml
 import logging
 import re
-from typing import Dict, List, Set
+from typing import Any, Dict, List, Optional, Set
 from enum import Enum
 from dataclasses import dataclass, field
 
+# Backend modules import each other as top-level packages (automation, mappings, utils)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend', 'src'))
+
+from automation.form_handler import FormHandler
+from automation.browser import BrowserHandler
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(funcName)s - %(message)s',
@@ -32,6 +39,15 @@ def print_to_logging(original_print):
 
 print = print_to_logging(print)
 
+# Number of tabs analysing pages in parallel on the shared session
+CRAWL_WORKERS = int(os.getenv('FORM_CRAWL_WORKERS', '4'))
+# A page is settled once the DOM has been quiet this long with no async postback running
+SETTLE_QUIET_MS = int(os.getenv('FORM_CRAWL_SETTLE_QUIET_MS', '150'))
+SETTLE_TIMEOUT_MS = int(os.getenv('FORM_CRAWL_SETTLE_TIMEOUT_MS', '10000'))
+
+START_PAGE_DEFINITION = 'shared/form_definitions/p0_start_page_definition.json'
+RETRIEVE_PAGE_DEFINITION = 'shared/form_definitions/p0_retrieve_page_definition.json'
+
 class AnalyzableElementType(Enum):
     TEXT = 'text'
     RADIO = 'radio'
@@ -56,7 +72,7 @@ class FormAnalysisConfig:
         node_match = re.search(r'node=([^&]+)', self.target_page_url)
         if not node_match:
             raise ValueError(f"No node parameter found in URL: {self.target_page_url}")
-        
+
         # Get index from configs list
         configs = load_configs_from_yaml('scripts/form_analysis_configs.yaml')
         try:
@@ -64,9 +80,324 @@ class FormAnalysisConfig:
             prefix = f"p{index+1}_"
         except StopIteration:
             prefix = ""
-        
+
         return f"form_definitions/{prefix}{node_match.group(1).lower()}_definition.json"
 
+# In-page helpers shared by every evaluate below. The library installs itself
+# once per document, so each call site wraps it and is safe after navigation.
+# Fields are keyed the way dependencies refer to them: radio groups by name,
+# everything else by id.
+FORM_ANALYSIS_LIB_JS = """() => {
+    if (window.__formAnalysis) return;
+
+    const INPUT_SELECTOR = 'input[type="radio"], input[type="text"], input[type="checkbox"], select, textarea';
+
+    const isVisible = (el) => {
+        if (!el.offsetParent) return false;
+        const style = window.getComputedStyle(el);
+        return style.display !== 'none' && style.visibility !== 'hidden';
+    };
+
+    const elementType = (el) => el.tagName.toLowerCase() === 'select' ? 'select-one' : el.type;
+    const keyOf = (el) => el.type === 'radio' ? el.name : el.id;
+    const isAnalyzable = (el, types) =>
+        el.id !== 'ctl00_ddlLanguage' && !!el.closest('form') && types.includes(elementType(el));
+
+    const hasNACheckbox = (fieldId) => {
+        const naCheckbox = document.getElementById(fieldId + '_NA');
+        return naCheckbox ? true : false;
+    };
+
+    const getParentText = (el) => {
+        let parent = el.parentElement;
+        while (parent && !parent.classList.contains('field-group')) {
+            parent = parent.parentElement;
+        }
+        if (!parent) return '';
+
+        // Look for title text in this order:
+        // 1. h4 with tooltip_text inside
+        // 2. tooltip_text with span inside
+        // 3. tooltip_text with label inside
+        // 4. Any label with lbl in its ID
+        const titleElement =
+            parent.querySelector('h4 .tooltip_text span') ||
+            parent.querySelector('.tooltip_text span') ||
+            parent.querySelector('.tooltip_text label') ||
+            parent.querySelector('label[id*="lbl"]');
+        return titleElement ? titleElement.textContent.trim() : '';
+    };
+
+    const getTextPhrase = (el) => {
+        let labelId = el.name.replace(/\\$/g, '_').replace(/ddl|rbl|tbx|chkbx|cbex/i, 'lbl');
+        if (labelId.includes('Day') || labelId.includes('Month') || labelId.includes('Year')) {
+            labelId = labelId.replace(/Day|Month|Year/i, '').trim();
+        }
+        const labelElement = document.getElementById(labelId);
+        const labelForElement = document.querySelector(`label[for="${el.name.replace(/\\$/g, '_')}"]`);
+        if (labelForElement) return labelForElement.textContent.trim();
+        if (labelElement) return labelElement.textContent.trim();
+
+        const tooltipText = el.getAttribute('type') === 'radio' ?
+            el.closest('.field-group')?.parentElement?.parentElement?.querySelector('.tooltip_text label') :
+            el.closest('.field-group')?.parentElement?.querySelector('.tooltip_text label');
+        return tooltipText ? tooltipText.textContent.trim() : '';
+    };
+
+    const describeField = (el) => {
+        const type = elementType(el);
+        const field = {
+            name: el.id,
+            type: type === 'select-one' ? 'dropdown' : type,
+            value: '',
+            text_phrase: getTextPhrase(el),
+            parent_text_phrase: getParentText(el)
+        };
+        if (type === 'select-one') {
+            field.value = Array.from(el.options)
+                .filter(o => o.value)
+                .map(o => o.text.trim());
+        } else if (type === 'text' || type === 'textarea') {
+            field.maxlength = el.getAttribute('maxlength');
+            field.has_na_checkbox = hasNACheckbox(el.id);
+        }
+        return field;
+    };
+
+    const describeRadioGroup = (radios) => {
+        const group = {
+            name: radios[0].name,
+            type: 'radio',
+            value: ['Y', 'N'],
+            labels: [],
+            button_ids: { 'Y': '', 'N': '' },
+            text_phrase: getTextPhrase(radios[0]),
+            parent_text_phrase: getParentText(radios[0])
+        };
+        for (const el of radios) {
+            group.labels.push(document.querySelector(`label[for="${el.id}"]`)?.textContent.trim() || null);
+            group.button_ids[el.id.endsWith('_0') ? 'Y' : 'N'] = el.id;
+        }
+        return group;
+    };
+
+    const elementsForKey = (key, types) => {
+        const el = document.getElementById(key);
+        const candidates = el && el.type !== 'radio' ? [el] : Array.from(document.getElementsByName(key));
+        return candidates.filter(e => isAnalyzable(e, types) && isVisible(e));
+    };
+
+    const describeKey = (key, types) => {
+        const elements = elementsForKey(key, types);
+        if (!elements.length) return null;
+        return elements[0].type === 'radio' ? describeRadioGroup(elements) : describeField(elements[0]);
+    };
+
+    // Full scan: used once per page and once per explored field, never per option
+    const snapshot = (types) => {
+        const form = document.querySelector('form');
+        if (!form) return { fields: [], buttons: [] };
+
+        const fields = [];
+        const radioGroups = new Map();
+        for (const el of form.querySelectorAll(INPUT_SELECTOR)) {
+            if (!isAnalyzable(el, types) || !isVisible(el)) continue;
+            if (el.type === 'radio') {
+                if (!radioGroups.has(el.name)) radioGroups.set(el.name, []);
+                radioGroups.get(el.name).push(el);
+                continue;
+            }
+            fields.push(describeField(el));
+        }
+        // Radio groups go last, matching the existing form definition files
+        radioGroups.forEach(radios => fields.push(describeRadioGroup(radios)));
+
+        const buttons = Array.from(form.querySelectorAll('input[type="submit"], button[type="submit"]'))
+            .filter(btn => btn.offsetParent !== null)
+            .map(btn => ({
+                id: btn.id,
+                name: btn.name,
+                type: btn.type,
+                value: btn.value || ''
+            }));
+
+        return { fields, buttons };
+    };
+
+    const visibleKeys = (types) => {
+        const form = document.querySelector('form');
+        const keys = new Set();
+        if (!form) return keys;
+        for (const el of form.querySelectorAll(INPUT_SELECTOR)) {
+            if (isAnalyzable(el, types) && isVisible(el)) keys.add(keyOf(el));
+        }
+        return keys;
+    };
+
+    const inAsyncPostBack = () => {
+        try {
+            return !!(window.Sys && Sys.WebForms && Sys.WebForms.PageRequestManager.getInstance().get_isInAsyncPostBack());
+        } catch (e) {
+            return false;
+        }
+    };
+
+    const waitForSettle = (state, quietMs, timeoutMs) => new Promise(resolve => {
+        const start = performance.now();
+        const check = () => {
+            const now = performance.now();
+            if (now - start > timeoutMs) return resolve(false);
+            if (!inAsyncPostBack() && now - state.last >= quietMs) return resolve(true);
+            setTimeout(check, 25);
+        };
+        check();
+    });
+
+    const performStep = (step) => {
+        const el = document.getElementById(step.id);
+        if (!el) throw new Error(`Element not found: ${step.id}`);
+        if (step.kind === 'click') {
+            el.click();
+            return;
+        }
+        if (step.kind === 'reset') {
+            el.value = '';
+        } else {
+            const targetOption = Array.from(el.options).find(o => o.text.trim() === step.text);
+            if (!targetOption) throw new Error(`Option not found: ${step.id}.${step.text}`);
+            el.value = targetOption.value;
+        }
+        el.dispatchEvent(new Event('change'));
+        el.dispatchEvent(new Event('input', { bubbles: true }));
+    };
+
+    // Run each action and report which fields appeared or disappeared relative
+    // to the baseline. Only inputs inside mutated subtrees are re-checked, so
+    // the cost per option is proportional to what actually changed.
+    const explore = async ({ actions, baseline, types, quietMs, timeoutMs }) => {
+        const visible = visibleKeys(types);
+        const baselineKeys = new Set(baseline);
+        const touched = new Set();
+        const state = { last: performance.now() };
+
+        const collect = (node) => {
+            if (node.nodeType !== 1) return;
+            if (node.matches(INPUT_SELECTOR)) touched.add(keyOf(node));
+            node.querySelectorAll(INPUT_SELECTOR).forEach(el => touched.add(keyOf(el)));
+        };
+        const observer = new MutationObserver(mutations => {
+            state.last = performance.now();
+            for (const mutation of mutations) {
+                if (mutation.type === 'attributes') {
+                    collect(mutation.target);
+                } else {
+                    mutation.addedNodes.forEach(collect);
+                    mutation.removedNodes.forEach(collect);
+                }
+            }
+        });
+        observer.observe(document.documentElement, {
+            childList: true,
+            subtree: true,
+            attributes: true,
+            attributeFilter: ['style', 'class', 'disabled']
+        });
+
+        const results = [];
+        try {
+            for (const action of actions) {
+                for (const step of action.steps) {
+                    state.last = performance.now();
+                    performStep(step);
+                    await waitForSettle(state, quietMs, timeoutMs);
+                }
+                for (const key of touched) {
+                    if (elementsForKey(key, types).length) visible.add(key);
+                    else visible.delete(key);
+                }
+                touched.clear();
+
+                const appeared = [...visible].filter(key => !baselineKeys.has(key));
+                results.push({
+                    key: action.key,
+                    shows: appeared.map(key => describeKey(key, types)).filter(Boolean),
+                    hides: [...baselineKeys].filter(key => !visible.has(key)),
+                    visible: [...visible]
+                });
+            }
+        } finally {
+            observer.disconnect();
+        }
+        return results;
+    };
+
+    window.__formAnalysis = { snapshot, explore };
+}"""
+
+FORM_SNAPSHOT_JS = f"""(analyzableTypes) => {{
+    ({FORM_ANALYSIS_LIB_JS})();
+    return window.__formAnalysis.snapshot(analyzableTypes);
+}}"""
+
+EXPLORE_JS = f"""(args) => {{
+    ({FORM_ANALYSIS_LIB_JS})();
+    return window.__formAnalysis.explore(args);
+}}"""
+
+# Record the time of the last DOM mutation so we can tell when a change has settled
+ARM_SETTLE_JS = """() => {
+    const state = window.__formSettle || (window.__formSettle = { last: 0, observer: null });
+    state.last = performance.now();
+    if (!state.observer) {
+        state.observer = new MutationObserver(() => { state.last = performance.now(); });
+        state.observer.observe(document.documentElement, {
+            childList: true,
+            subtree: true,
+            attributes: true,
+            attributeFilter: ['style', 'class', 'disabled']
+        });
+    }
+}"""
+
+# Resolve once no mutation has happened for quietMs and no ASP.NET async postback is running
+WAIT_FOR_SETTLE_JS = """({ quietMs, timeoutMs }) => new Promise(resolve => {
+    const start = performance.now();
+    const inAsyncPostBack = () => {
+        try {
+            return !!(window.Sys && Sys.WebForms && Sys.WebForms.PageRequestManager.getInstance().get_isInAsyncPostBack());
+        } catch (e) {
+            return false;
+        }
+    };
+    const check = () => {
+        const now = performance.now();
+        const state = window.__formSettle || { last: start };
+        if (now - start > timeoutMs) return resolve(false);
+        if (!inAsyncPostBack() && now - state.last >= quietMs) return resolve(true);
+        setTimeout(check, 25);
+    };
+    check();
+})"""
+
+SELECT_OPTION_JS = """([fieldId, targetValue]) => {
+    const el = document.getElementById(fieldId);
+    if (!el) return false;
+    const targetOption = Array.from(el.options).find(o => o.text.trim() === targetValue);
+    if (!targetOption) return false;
+    el.value = targetOption.value;
+    el.dispatchEvent(new Event('change'));
+    el.dispatchEvent(new Event('input', { bubbles: true }));
+    return true;
+}"""
+
+RESET_SELECT_JS = """(fieldId) => {
+    const el = document.getElementById(fieldId);
+    if (el) {
+        el.value = '';
+        el.dispatchEvent(new Event('change'));
+    }
+}"""
+
 def load_json(file_path: str) -> dict:
     with open(file_path, 'r') as f:
         return json.load(f)
@@ -75,493 +406,174 @@ def load_yaml(file_path: str) -> dict:
     with open(file_path, 'r') as f:
         return yaml.safe_load(f)
 
-def analyze_current_page(page, exclude_pattern: re.Pattern, analyzable_types: Set[AnalyzableElementType]) -> dict:
-    """Analyze current page structure and create form definition"""
+async def arm_settle(page) -> None:
+    """Start tracking DOM mutations before an action that may change the form"""
+    try:
+        await page.evaluate(ARM_SETTLE_JS)
+    except Exception:
+        # The page is mid-navigation; settle() waits for the new document
+        pass
+
+async def settle(page) -> None:
+    """Wait until the DOM has stopped changing after an action"""
+    for _ in range(3):
+        try:
+            settled = await page.evaluate(WAIT_FOR_SETTLE_JS, {"quietMs": SETTLE_QUIET_MS, "timeoutMs": SETTLE_TIMEOUT_MS})
+            if not settled:
+                logging.warning(f"Page did not settle within {SETTLE_TIMEOUT_MS}ms")
+            return
+        except Exception as e:
+            # A full postback replaced the document: wait for it and check again
+            logging.info(f"Page navigated while settling ({str(e).splitlines()[0]}), waiting for load")
+            await page.wait_for_load_state("domcontentloaded")
+            await arm_settle(page)
+
+async def snapshot_fields(page, analyzable_types: Set[AnalyzableElementType]) -> dict:
+    """Get all visible analyzable fields keyed by id (or name for radio groups)"""
+    snapshot = await page.evaluate(FORM_SNAPSHOT_JS, [t.value for t in analyzable_types])
+    return {element['name']: element for element in snapshot['fields']}
+
+async def analyze_current_page(page, exclude_pattern: re.Pattern, analyzable_types: Set[AnalyzableElementType],
+                               snapshot: Optional[dict] = None, only_fields: Optional[Set[str]] = None) -> dict:
+    """Analyze current page structure and create form definition
+
+    When only_fields is given, dependencies are explored for those fields only.
+    """
     form_definition = {
         "fields": [],
         "dependencies": {},
         "buttons": []
     }
-    
-    print("Getting form elements...")
-    type_values = [t.value for t in analyzable_types]
-    type_condition = ', '.join([f"'{t}'" for t in type_values])
-    elements = page.evaluate(f"""() => {{
-        const formElements = [];
-        const form = document.querySelector('form');
-        if (!form) return formElements;
-        
-        const isVisible = (el) => {{
-            if (!el.offsetParent) return false;
-            const style = window.getComputedStyle(el);
-            return style.display !== 'none' && style.visibility !== 'hidden';
-        }};
-        
-        const hasNACheckbox = (fieldId) => {{
-            const naCheckboxId = fieldId + '_NA';
-            const naCheckbox = document.getElementById(naCheckboxId);
-            //return naCheckbox && isVisible(naCheckbox);
-            return naCheckbox ? true : false;
-        }};
-
-        const getParentText = (el) => {{
-            // Get direct parent
-            let parent = el.parentElement;
-            while (parent && !parent.classList.contains('field-group')) {{
-                parent = parent.parentElement;
-            }}
-            if (!parent) return ''; // add parent name if it exists
-
-            // Look for title text in this order:
-            // 1. tooltip_text with label inside
-            // 2. tooltip_text with span inside
-            // 3. h4 with tooltip_text inside
-            // 4. Any label with lbl in its ID
-            const titleElement = 
-                parent.querySelector('h4 .tooltip_text span') ||
-                parent.querySelector('.tooltip_text span') ||
-                parent.querySelector('.tooltip_text label') ||
-                parent.querySelector('label[id*="lbl"]');
-            
-            if (!titleElement) return '';
-            
-            const text = titleElement.textContent.trim();
-            const parentIdentifier = parent.id || Array.from(parent.classList).join(' ');
-            return text ? `${{text}}` : '';
-        }};
-
-        const elements = form.querySelectorAll('input[type="radio"], input[type="text"], select, textarea');
-        const radioGroups = new Map();
-        
-        for (const el of elements) {{
-            if (!isVisible(el) || el.type === 'hidden' || el.id === 'ctl00_ddlLanguage') continue;
-            
-            let elementType = el.type;
-            if (el.tagName.toLowerCase() === 'select') {{
-                elementType = 'select-one';
-            }}
-            
-            let textPhrase = '';
-            let labelId = el.name.replace(/\\$/g, '_').replace(/ddl|rbl|tbx|chkbx|cbex/i, 'lbl');
-            if (labelId.includes('Day') || labelId.includes('Month') || labelId.includes('Year')) {{
-                labelId = labelId.replace(/Day|Month|Year/i, '').trim();
-            }}
-            const labelElement = document.getElementById(labelId);
-            console.log(labelId);
-            
-            const labelForElement = document.querySelector(`label[for="${{el.name.replace(/\\$/g, '_')}}"]`);
-            if (labelForElement) {{
-                textPhrase = labelForElement.textContent.trim() ;//+ " [from label-for]" + el.name.replace(/\\$/g, '_');
-            }} else if (labelElement) {{
-                textPhrase = labelElement.textContent.trim() ;//+ " [from label-id] " + labelId;
-            }} else {{
-                const tooltipText = el.getAttribute('type') === 'radio' ? 
-                    el.closest('.field-group')?.parentElement?.parentElement?.querySelector('.tooltip_text label') : 
-                    el.closest('.field-group')?.parentElement?.querySelector('.tooltip_text label');
-                if (tooltipText) {{
-                    textPhrase = tooltipText.textContent.trim() ;//+ " [from tooltip]";
-                }}
-            }}
-            
-            if (el.getAttribute('type') === 'radio') {{
-                const baseName = el.name;
-                if (!radioGroups.has(baseName)) {{
-                    radioGroups.set(baseName, {{
-                        name: baseName,
-                        type: 'radio',
-                        value: ['Y', 'N'],
-                        labels: [],
-                        button_ids: {{
-                            'Y': '',
-                            'N': ''
-                        }},
-                        text_phrase: textPhrase,
-                        parent_text_phrase: getParentText(el)
-                    }});
-                }}
-                const group = radioGroups.get(baseName);
-                const value = el.id.endsWith('_0') ? 'Y' : 'N';
-                const label = document.querySelector(`label[for="${{el.id}}"]`)?.textContent.trim() || null;
-                group.labels.push(label);
-                group.button_ids[value] = el.id;
-                continue;
-            }}
-            
-            const field = {{
-                name: el.id,
-                type: elementType === 'select-one' ? 'dropdown' : elementType,
-                value: '',
-                text_phrase: textPhrase,
-                parent_text_phrase: getParentText(el)
-            }};
-            
-            if (elementType === 'select-one') {{
-                field.value = Array.from(el.options)
-                    .filter(o => o.value)
-                    .map(o => o.text.trim());
-            }} else if (elementType === 'text' || elementType === 'textarea') {{
-                field.maxlength = el.getAttribute('maxlength');
-                field.has_na_checkbox = hasNACheckbox(el.id);
-            }}
-            
-            formElements.push(field);
-        }}
-        
-        radioGroups.forEach(group => formElements.push(group));
-        
-        const buttons = form.querySelectorAll('input[type="submit"], button[type="submit"]');
-        const finalButtons = Array.from(buttons)
-            .filter(btn => btn.offsetParent !== null)
-            .map(btn => ({{
-                id: btn.id,
-                name: btn.name,
-                type: btn.type,
-                value: btn.value || ''
-            }}));
-            
-        return {{ elements: formElements, buttons: finalButtons }};
-    }}""")
-    
-    form_definition['fields'] = elements['elements']
-    form_definition['buttons'] = elements['buttons']
-    
-    print(f"Found {len(form_definition['fields'])} form elements: {form_definition['fields']}")
-    # Filter out fields with excluded patterns
+
+    if snapshot is None:
+        print("Getting form elements...")
+        snapshot = await page.evaluate(FORM_SNAPSHOT_JS, [t.value for t in analyzable_types])
+    form_definition['fields'] = snapshot['fields']
+    form_definition['buttons'] = snapshot['buttons']
+
+    print(f"Found {len(form_definition['fields'])} form elements on {page.url}")
 
     # Map dependencies by toggling radio/dropdown values
     for element in form_definition['fields']:
         if element['type'] not in ['radio', 'dropdown'] or exclude_pattern.search(element['name']):
             continue
-            
-        print(f"\nAnalyzing dependencies for {element['name']}")
-        initial_state = get_visible_elements(page, analyzable_types)
-        
-        if element['type'] == 'radio':
-            for value in ['Y', 'N']:
-                button_id = element['button_ids'][value]
-                changes = analyze_field_dependencies(
-                    page,
-                    button_id,
-                    value,
-                    initial_state,
-                    exclude_pattern,
-                    analyzable_types
-                )
-                if changes:
-                    form_definition['dependencies'][f"{button_id}.{value}"] = changes
-                    
-        elif element['type'] == 'dropdown':
-            for option in element['value']:
-                changes = analyze_field_dependencies(
-                    page,
-                    element['name'],
-                    option,
-                    initial_state,
-                    exclude_pattern,
-                    analyzable_types
-                )
-                if changes:
-                    form_definition['dependencies'][f"{element['name']}.{option}"] = changes
-    
+        if only_fields is not None and element['name'] not in only_fields:
+            continue
+
+        print(f"Analyzing dependencies for {element['name']}")
+        initial_state = set((await snapshot_fields(page, analyzable_types)).keys())
+        dependencies = await analyze_field_dependencies(
+            page, element, initial_state, exclude_pattern, analyzable_types
+        )
+        form_definition['dependencies'].update(dependencies)
+
     return form_definition
 
-def get_visible_elements(page, analyzable_types: Set[AnalyzableElementType]) -> set:
-    """Get IDs of all currently visible form elements of analyzable types"""
-    type_values = [t.value for t in analyzable_types]
-    type_condition = ', '.join([f"'{t}'" for t in type_values])
-    
-    # Build selector based on analyzable types
-    selectors = []
-    for element_type in analyzable_types:
-        if element_type in {AnalyzableElementType.TEXT, AnalyzableElementType.RADIO, AnalyzableElementType.CHECKBOX}:
-            selectors.append(f"input[type='{element_type.value}']")
-        elif element_type == AnalyzableElementType.SELECT:
-            selectors.append('select')
-        elif element_type == AnalyzableElementType.TEXTAREA:
-            selectors.append('textarea')
-    
-    selector = ', '.join(selectors)
-    
-    js_code = f"""() => {{
-        const analyzableTypes = [{type_condition}];
-        const elements = document.querySelectorAll(`{selector}`);
-        return Array.from(elements)
-            .filter(el => el.offsetParent !== null)
-            .map(el => {{
-                if (el.type === 'radio') {{
-                    // For radio buttons, use the name attribute with $ separator
-                    return el.name.replace(/\\$/g, '\\$');
-                }}
-                // For other elements, use the ID with $ separator
-                return el.id.replace(/\\$/g, '\\$');
-            }});
-    }}"""
-    
-    return set(page.evaluate(js_code))
-
-def analyze_field_dependencies(page, field_id: str, value: str, initial_state: set, 
-                             exclude_pattern: re.Pattern, 
-                             analyzable_types: Set[AnalyzableElementType]) -> dict:
-    """Analyze what elements appear/disappear when a field value changes"""
-    
-    try:
-        # Reset state by clicking the opposite radio button first
-        if value in ['Y', 'N']:
-            base_name = field_id[:-2]
-            logging.info(f"Processing radio button: field_id={field_id}, base_name={base_name}, value={value}")
-            
-            # Get the radio group details first
-            radio_group = page.evaluate("""(fieldId) => {
-                const currentButton = document.getElementById(fieldId);
-                if (!currentButton) return null;
-                
-                const baseName = currentButton.name;
-                const inputs = document.querySelectorAll(`input[name="${baseName}"]`);
-                const group = {
-                    button_ids: {
-                        'Y': '',
-                        'N': ''
-                    }
-                };
-                
-                for (const input of inputs) {
-                    const value = input.value;
-                    if (value === 'Y' || value === 'N') {
-                        group.button_ids[value] = input.id;
-                    }
-                }
-                
-                return group;
-            }""", field_id)
-            
-            logging.info(f"Found radio group: {radio_group}")
-            
-            # Only try to click opposite if it exists
-            opposite_value = 'N' if value == 'Y' else 'Y'
-            opposite_id = radio_group['button_ids'][opposite_value]
-            if opposite_id:
-                logging.info(f"Clicking opposite button: #{opposite_id}")
-                try:
-                    page.click(f"#{opposite_id}")
-                    page.wait_for_timeout(500)
-                except Exception as e:
-                    logging.error(f"Error clicking opposite button: {str(e)}")
-                    return None
-            
-            logging.info(f"Clicking target button: #{field_id}")
-            page.click(f"#{field_id}")
+def build_actions(element: dict, reset: bool) -> List[dict]:
+    """Build the in-page steps that select each value of a radio group or dropdown"""
+    actions = []
+    if element['type'] == 'radio':
+        for value in ['Y', 'N']:
+            button_id = element['button_ids'].get(value)
+            if not button_id:
+                continue
+            # Click the opposite button first so the target click is a real change
+            opposite_id = element['button_ids'].get('N' if value == 'Y' else 'Y')
+            steps = [{'kind': 'click', 'id': opposite_id}] if opposite_id else []
+            steps.append({'kind': 'click', 'id': button_id})
+            actions.append({'key': f"{button_id}.{value}", 'steps': steps})
+    elif element['type'] == 'dropdown':
+        for option in element['value']:
+            steps = [{'kind': 'reset', 'id': element['name']}] if reset else []
+            steps.append({'kind': 'select', 'id': element['name'], 'text': option})
+            actions.append({'key': f"{element['name']}.{option}", 'steps': steps})
+    return actions
+
+async def run_actions(page, actions: List[dict], baseline: set,
+                      analyzable_types: Set[AnalyzableElementType]) -> List[dict]:
+    """Run actions in a single evaluate and return the recorded changes per action"""
+    return await page.evaluate(EXPLORE_JS, {
+        'actions': actions,
+        'baseline': list(baseline),
+        'types': [t.value for t in analyzable_types],
+        'quietMs': SETTLE_QUIET_MS,
+        'timeoutMs': SETTLE_TIMEOUT_MS
+    })
+
+async def run_action_by_snapshot(page, action: dict, baseline: set,
+                                 analyzable_types: Set[AnalyzableElementType]) -> dict:
+    """Fallback for actions that trigger a full postback: act from Python and diff full snapshots"""
+    for step in action['steps']:
+        await arm_settle(page)
+        if step['kind'] == 'click':
+            await page.click(f"#{step['id']}")
+        elif step['kind'] == 'reset':
+            await page.evaluate(RESET_SELECT_JS, step['id'])
         else:
-            # For dropdowns, ensure value is properly set
-            page.evaluate(f"""(targetValue) => {{
-                const el = document.getElementById('{field_id}');
-                if (el) {{
-                    const options = Array.from(el.options);
-                    const targetOption = options.find(o => o.text.trim() === targetValue);
-                    if (targetOption) {{
-                        el.value = targetOption.value;
-                        el.dispatchEvent(new Event('change'));
-                        // Also dispatch input event for good measure
-                        el.dispatchEvent(new Event('input', {{ bubbles: true }}));
-                    }}
-                }}
-            }}""", value)
-            page.wait_for_timeout(1000)  # Increased wait time for dynamic content
-        
-        page.wait_for_timeout(500)
-        
-        # Get new state with full element details
-        new_state_details = page.evaluate("""() => {
-            const details = {};
-            const form = document.querySelector('form');
-            
-            const isVisible = (el) => {
-                if (!el.offsetParent) return false;
-                const style = window.getComputedStyle(el);
-                return style.display !== 'none' && style.visibility !== 'hidden';
-            };
-
-            const hasNACheckbox = (fieldId) => {
-                const naCheckboxId = fieldId + '_NA';
-                const naCheckbox = document.getElementById(naCheckboxId);
-                //return naCheckbox && isVisible(naCheckbox);
-                return naCheckbox ? true : false;
-            };
-
-            const getParentText = (el) => {
-                // Get direct parent
-                let parent = el.parentElement;
-                while (parent && !parent.classList.contains('field-group')) {{
-                    parent = parent.parentElement;
-                }}
-                if (!parent) return ``; // add parent name if it exists
-                
-                // Look for title text in this order:
-                // 1. tooltip_text with label inside
-                // 2. tooltip_text with span inside
-                // 3. h4 with tooltip_text inside
-                // 4. Any label with lbl in its ID
-                const titleElement =
-                    parent.querySelector('h4 .tooltip_text span') ||
-                    parent.querySelector('.tooltip_text span') ||
-                    parent.querySelector('.tooltip_text label') ||
-                    parent.querySelector('label[id*="lbl"]');
-                
-                if (!titleElement) return '';
-                
-                const text = titleElement.textContent.trim();
-                const parentIdentifier = parent || Array.from(parent.classList).join(' ');
-                //return text ? `${text} [parent: ${parentIdentifier}]` : '';
-                return text ? `${text}` : '';
-                        
-            };
-
-            form.querySelectorAll('input[type="radio"], input[type="text"], select, textarea').forEach(el => {
-                if (!isVisible(el)) return;
-                
-                let elementType = el.type;
-                if (el.tagName.toLowerCase() === 'select') {
-                    elementType = 'select-one';
-                }
-                
-                // Add text_phrase and parent_text_phrase extraction
-                let textPhrase = '';
-                let parentTextPhrase = getParentText(el);
-                
-                let labelId = el.name.replace(/\\$/g, '_').replace(/ddl|rbl|tbx|chkbx|cbex/i, 'lbl');
-                if (labelId.includes('Day') || labelId.includes('Month') || labelId.includes('Year')) {
-                    labelId = labelId.replace(/Day|Month|Year/i, '').trim();
-                }
-                const labelElement = document.getElementById(labelId);
-                
-                const labelForElement = document.querySelector(`label[for="${el.name.replace(/\\$/g, '_')}"]`);
-                if (labelForElement) {
-                    textPhrase = labelForElement.textContent.trim() ;//+ " [from label-for]" + el.name.replace(/\\$/g, '_');
-                } else if (labelElement) {
-                    textPhrase = labelElement.textContent.trim() ;//+ " [from label-id]" + labelId;
-                } else {
-                    const tooltipText = el.getAttribute('type') === 'radio' ? 
-                        el.closest('.field-group')?.parentElement?.parentElement?.querySelector('.tooltip_text label') : 
-                        el.closest('.field-group')?.parentElement?.querySelector('.tooltip_text label');
-                    if (tooltipText) {
-                        textPhrase = tooltipText.textContent.trim() ;//+ " [from tooltip]";
-                    }
-                }
-                if (elementType === 'radio') {
-                    const baseName = el.name;
-                    if (!details[baseName]) {
-                        details[baseName] = {
-                            name: baseName,
-                            type: 'radio',
-                            value: ['Y', 'N'],
-                            labels: [],
-                            button_ids: {
-                                'Y': '',
-                                'N': ''
-                            },
-                            text_phrase: textPhrase
-                        };
-                    }
-                    const label = document.querySelector(`label[for="${el.id}"]`)?.textContent.trim() || null;
-                    details[baseName].labels.push(label);
-                    details[baseName].button_ids[el.id.endsWith('_0') ? 'Y' : 'N'] = el.id;
-                    return;
-                }
-                
-                const field = {
-                    name: el.id,
-                    type: elementType === 'select-one' ? 'dropdown' : elementType,
-                    value: '',
-                    text_phrase: textPhrase,
-                    parent_text_phrase: parentTextPhrase
-                };
-                
-                if (elementType === 'select-one') {
-                    field.value = Array.from(el.options)
-                        .filter(o => o.value)
-                        .map(o => o.text.trim());
-                } else if (elementType === 'text' || elementType === 'textarea') {
-                    field.maxlength = el.getAttribute('maxlength');
-                    field.has_na_checkbox = hasNACheckbox(el.id);
-                }
-                
-                details[el.id] = field;
-            });
-            return details;
-        }""")
-        
-        new_state = set(new_state_details.keys())
-        appeared = new_state - initial_state
-        disappeared = initial_state - new_state
-        logging.info(f"New state: {new_state}")
-        logging.info(f"Initial state: {initial_state}")
-        logging.info(f"Appeared: {appeared}")
-        logging.info(f"Disappeared: {disappeared}")
-        recursive_dependencies = {}
-        for element_id in appeared:
-            element = new_state_details[element_id]
-            print(f"Element: {element}")
-            if element['type'] in ['radio', 'dropdown']:
-                if exclude_pattern.search(element_id):
-                    continue
-                    
-                if element['type'] == 'radio':
-                    # Use the base name since we're now grouping radio buttons
-                    base_name = element['name']
-                    radio_group = new_state_details[base_name]
-                    for value, button_id in radio_group['button_ids'].items():
-                        if not button_id:  # Skip if button_id is empty
-                            continue
-                        child_changes = analyze_field_dependencies(
-                            page,
-                            button_id,
-                            value,
-                            new_state,
-                            exclude_pattern,
-                            analyzable_types
-                        )
-                        if child_changes:
-                            recursive_dependencies[f"{button_id}.{value}"] = child_changes
-                
-                elif element['type'] == 'dropdown':
-                    # Get all current dependencies for this dropdown
-                    all_option_dependencies = {}
-                    for option in element['value']:
-                        # Reset state before analyzing each option
-                        page.evaluate(f"""() => {{
-                            const el = document.getElementById('{element_id}');
-                            if (el) {{
-                                // Reset to default/empty value first
-                                el.value = '';
-                                el.dispatchEvent(new Event('change'));
-                            }}
-                        }}""")
-                        page.wait_for_timeout(500)
-                        
-                        # Now analyze the specific option
-                        child_changes = analyze_field_dependencies(
-                            page,
-                            element_id,
-                            option,
-                            new_state,
-                            exclude_pattern,
-                            analyzable_types
-                        )
-                        if child_changes:
-                            all_option_dependencies[f"{element_id}.{option}"] = child_changes
-                    
-                    # Add all dependencies if any were found
-                    if all_option_dependencies:
-                        recursive_dependencies.update(all_option_dependencies)
-        
-        return {
-            "shows": [new_state_details[el_id] for el_id in appeared],
-            "hides": list(disappeared),
-            "dependencies": recursive_dependencies if recursive_dependencies else None
-        }
-        
+            await page.evaluate(SELECT_OPTION_JS, [step['id'], step['text']])
+        await settle(page)
+
+    details = await snapshot_fields(page, analyzable_types)
+    visible = set(details.keys())
+    return {
+        'key': action['key'],
+        'shows': [details[key] for key in visible - baseline],
+        'hides': list(baseline - visible),
+        'visible': list(visible)
+    }
+
+async def record_actions(page, actions: List[dict], baseline: set,
+                         analyzable_types: Set[AnalyzableElementType]) -> List[dict]:
+    """Record changes for all actions in one batch, falling back per action on navigation"""
+    try:
+        return await run_actions(page, actions, baseline, analyzable_types)
     except Exception as e:
-        print(f"Error analyzing dependencies for {field_id}.{value}: {str(e)}")
-        return None
+        logging.info(f"Batched exploration failed ({str(e).splitlines()[0]}), exploring one action at a time")
+        await page.wait_for_load_state("domcontentloaded")
+        return [await run_action_by_snapshot(page, action, baseline, analyzable_types) for action in actions]
+
+async def analyze_field_dependencies(page, element: dict, initial_state: set,
+                                     exclude_pattern: re.Pattern,
+                                     analyzable_types: Set[AnalyzableElementType],
+                                     reset: bool = False) -> Dict[str, dict]:
+    """Analyze what elements appear/disappear for every value of a radio group or dropdown"""
+    dependencies = {}
+    try:
+        actions = build_actions(element, reset)
+        results = await record_actions(page, actions, initial_state, analyzable_types)
+
+        for action, result in zip(actions, results):
+            logging.info(f"{action['key']}: shows {[f['name'] for f in result['shows']]}, hides {result['hides']}")
+
+            children = [
+                field for field in result['shows']
+                if field['type'] in ['radio', 'dropdown'] and not exclude_pattern.search(field['name'])
+            ]
+            recursive_dependencies = {}
+            if children:
+                # The batch left the page on the last value, so re-apply this one before going deeper
+                await record_actions(page, [action], initial_state, analyzable_types)
+                new_state = set(result['visible'])
+                for child in children:
+                    recursive_dependencies.update(await analyze_field_dependencies(
+                        page,
+                        child,
+                        new_state,
+                        exclude_pattern,
+                        analyzable_types,
+                        reset=child['type'] == 'dropdown'
+                    ))
+
+            dependencies[action['key']] = {
+                "shows": result['shows'],
+                "hides": result['hides'],
+                "dependencies": recursive_dependencies if recursive_dependencies else None
+            }
+
+    except Exception as e:
+        print(f"Error analyzing dependencies for {element['name']}: {str(e)}")
+
+    return dependencies
 
 def create_exclude_pattern(patterns: List[str]) -> re.Pattern:
     """Create case-insensitive regex pattern from list of strings"""
@@ -570,76 +582,244 @@ def create_exclude_pattern(patterns: List[str]) -> re.Pattern:
     pattern = '|'.join(patterns)
     return re.compile(f'({pattern})', re.IGNORECASE)
 
-def analyze_multiple_pages(configs: List[FormAnalysisConfig]):
-    load_dotenv()
-    test_data = load_yaml(configs[0].input_yaml_path)
-    
-    # Load predefined form definitions
+async def authenticate(form_handler: FormHandler, test_data: dict) -> None:
+    """Pass the start page CAPTCHA and open the application once for every tab to share"""
     page_definitions = {
-        'start_page': load_json('/Users/sanjaykarinje/git/ds160_automation/form_definitions/p0_start_page_definition.json'),
-        'retrieve_page': load_json('/Users/sanjaykarinje/git/ds160_automation/form_definitions/p0_retrieve_page_definition.json')
+        'start_page': load_json(START_PAGE_DEFINITION),
+        'retrieve_page': load_json(RETRIEVE_PAGE_DEFINITION)
+    }
+    form_handler.test_data = test_data
+
+    print("Processing start page...")
+    form_handler.field_values = test_data['start_page']
+    await form_handler.handle_start_page(page_definitions['start_page'])
+    await form_handler.browser.page.wait_for_load_state("domcontentloaded")
+
+    print("Processing retrieve page...")
+    form_handler.field_values = test_data['retrieve_page']
+    await form_handler.handle_retrieve_page(page_definitions['retrieve_page'])
+    await form_handler.browser.page.wait_for_load_state("domcontentloaded")
+
+async def analyze_config(page, config: FormAnalysisConfig) -> str:
+    """Navigate a tab to a config's page, analyse it and save the definition"""
+    exclude_pattern = create_exclude_pattern(config.exclude_patterns)
+
+    print(f"Navigating to {config.target_page_url}...")
+    await page.goto(config.target_page_url)
+    await page.wait_for_load_state("domcontentloaded")
+    await arm_settle(page)
+    await settle(page)
+
+    form_definition = await analyze_current_page(page, exclude_pattern, config.analyzable_types)
+
+    output_path = config.output_json_path
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(form_definition, f, indent=2, ensure_ascii=False)
+
+    print(f"Form definition saved to {output_path}")
+    return output_path
+
+def field_fingerprint(field: dict) -> str:
+    """Hash the structural parts of a field: id, type, options, maxlength and radio buttons"""
+    structure = {
+        'name': field.get('name'),
+        'type': field.get('type'),
+        'value': field.get('value') if field.get('type') == 'dropdown' else None,
+        'maxlength': field.get('maxlength'),
+        'button_ids': field.get('button_ids'),
+    }
+    return hashlib.sha256(json.dumps(structure, sort_keys=True).encode()).hexdigest()[:16]
+
+def page_fingerprint(fields: List[dict], buttons: List[dict]) -> str:
+    """Hash a page's field set and buttons, independent of field order"""
+    parts = sorted(field_fingerprint(f) for f in fields)
+    parts += sorted(b.get('id', '') for b in buttons)
+    return hashlib.sha256('|'.join(parts).encode()).hexdigest()[:16]
+
+def diff_fields(stored_fields: List[dict], live_fields: List[dict]) -> Dict[str, Any]:
+    """Compare stored and live top-level fields by structure"""
+    stored = {f['name']: f for f in stored_fields}
+    live = {f['name']: f for f in live_fields}
+
+    changed = {}
+    for name in stored.keys() & live.keys():
+        old, new = stored[name], live[name]
+        if field_fingerprint(old) == field_fingerprint(new):
+            continue
+        change = {}
+        if old.get('type') != new.get('type'):
+            change['type'] = {'old': old.get('type'), 'new': new.get('type')}
+        if old.get('maxlength') != new.get('maxlength'):
+            change['maxlength'] = {'old': old.get('maxlength'), 'new': new.get('maxlength')}
+        if old.get('type') == 'dropdown' or new.get('type') == 'dropdown':
+            old_options = old.get('value') if isinstance(old.get('value'), list) else []
+            new_options = new.get('value') if isinstance(new.get('value'), list) else []
+            added_options = [o for o in new_options if o not in old_options]
+            removed_options = [o for o in old_options if o not in new_options]
+            if added_options or removed_options:
+                change['options'] = {'added': added_options, 'removed': removed_options}
+            elif old_options != new_options:
+                change['options'] = {'reordered': True}
+        if old.get('button_ids') != new.get('button_ids'):
+            change['button_ids'] = {'old': old.get('button_ids'), 'new': new.get('button_ids')}
+        changed[name] = change
+
+    return {
+        'added': sorted(live.keys() - stored.keys()),
+        'removed': sorted(stored.keys() - live.keys()),
+        'changed': changed
     }
 
-    form_handler = FormHandler()
-    form_mapping = FormMapping()
+def dependency_owner(dependency_key: str, fields: List[dict]) -> Optional[str]:
+    """Find the top-level field a dependency key ("{id}.{value}") belongs to"""
+    for entry in fields:
+        if entry['type'] == 'radio' and any(dependency_key.startswith(f"{button_id}.") for button_id in entry['button_ids'].values() if button_id):
+            return entry['name']
+        if entry['type'] == 'dropdown' and dependency_key.startswith(f"{entry['name']}."):
+            return entry['name']
+    return None
+
+async def refresh_config(page, config: FormAnalysisConfig) -> Dict[str, Any]:
+    """Re-analyse a page only where its live fields differ from the stored definition"""
+    start_time = time.monotonic()
+    output_path = config.output_json_path
+    exclude_pattern = create_exclude_pattern(config.exclude_patterns)
+
+    print(f"Fingerprinting {config.target_page_url}...")
+    await page.goto(config.target_page_url)
+    await page.wait_for_load_state("domcontentloaded")
+    await arm_settle(page)
+    await settle(page)
+    snapshot = await page.evaluate(FORM_SNAPSHOT_JS, [t.value for t in config.analyzable_types])
+    live_fingerprint = page_fingerprint(snapshot['fields'], snapshot['buttons'])
+
+    report = {'url': config.target_page_url, 'definition': output_path, 'new_fingerprint': live_fingerprint}
+
+    if not os.path.exists(output_path):
+        form_definition = await analyze_current_page(page, exclude_pattern, config.analyzable_types, snapshot)
+        report.update({'status': 'new', 'fields_analyzed': len(form_definition['fields'])})
+    else:
+        stored = load_json(output_path)
+        stored_fingerprint = page_fingerprint(stored.get('fields', []), stored.get('buttons', []))
+        report['old_fingerprint'] = stored_fingerprint
+
+        if stored_fingerprint == live_fingerprint:
+            report.update({'status': 'unchanged', 'duration': round(time.monotonic() - start_time, 2)})
+            print(f"{config.target_page_url} unchanged")
+            return report
+
+        field_diff = diff_fields(stored.get('fields', []), snapshot['fields'])
+        to_analyze = set(field_diff['added']) | set(field_diff['changed'])
+        print(f"{config.target_page_url} changed, re-analysing {len(to_analyze)} fields: {sorted(to_analyze)}")
+
+        form_definition = await analyze_current_page(
+            page, exclude_pattern, config.analyzable_types, snapshot, only_fields=to_analyze
+        )
+
+        # Keep stored dependencies of fields that did not change
+        kept = 0
+        for key, dependency in stored.get('dependencies', {}).items():
+            owner = dependency_owner(key, stored.get('fields', []))
+            if owner in to_analyze or owner in field_diff['removed'] or owner is None:
+                continue
+            form_definition['dependencies'].setdefault(key, dependency)
+            kept += 1
+
+        report.update({
+            'status': 'updated',
+            'fields': field_diff,
+            'fields_analyzed': len(to_analyze),
+            'dependencies_kept': kept,
+        })
 
-    with BrowserHandler(headless=False) as browser:
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(form_definition, f, indent=2, ensure_ascii=False)
+    print(f"Form definition saved to {output_path}")
+
+    report['duration'] = round(time.monotonic() - start_time, 2)
+    return report
+
+def write_refresh_report(reports: List[Dict[str, Any]]) -> str:
+    """Save the refresh diff report next to the form definitions"""
+    summary = {}
+    for report in reports:
+        summary[report.get('status', 'error')] = summary.get(report.get('status', 'error'), 0) + 1
+
+    report_path = f"form_definitions/refresh_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    os.makedirs(os.path.dirname(report_path), exist_ok=True)
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump({'summary': summary, 'pages': reports}, f, indent=2, ensure_ascii=False)
+    print(f"Refresh report saved to {report_path}: {summary}")
+    return report_path
+
+async def analyze_multiple_pages(configs: List[FormAnalysisConfig], workers: int = CRAWL_WORKERS,
+                                 refresh: bool = False) -> Dict[str, Any]:
+    """Analyse all configured pages in parallel tabs that share one authenticated session
+
+    In refresh mode only pages whose fields differ from the stored definitions
+    are re-analysed, and a diff report is written.
+    """
+    load_dotenv()
+    test_data = load_yaml(configs[0].input_yaml_path)
+    results: Dict[str, Any] = {}
+
+    async with BrowserHandler() as browser:
+        form_handler = FormHandler()
         form_handler.set_browser(browser)
-        browser.navigate("https://ceac.state.gov/GenNIV/Default.aspx")
-        
-        try:
-            # Process start page with CAPTCHA
-            print("Processing start page...")
-            page_data = test_data['start_page']
-            form_handler.field_values = page_data
-            form_handler.handle_start_page(page_definitions['start_page'])
-            time.sleep(2)
-            
-            # Process retrieve page
-            print("Processing retrieve page...")
-            page_data = test_data['retrieve_page']
-            form_handler.field_values = page_data
-            form_handler.handle_retrieve_page(page_definitions['retrieve_page'])
-            time.sleep(2)
-
-            # Continue with analysis of other pages...
-            for config in configs:
-                exclude_pattern = create_exclude_pattern(config.exclude_patterns)
-                
-                # Navigate to target page
-                print(f"Navigating to {config.target_page_url}...")
-                browser.navigate(config.target_page_url)
-                browser.page.wait_for_load_state("networkidle")
-                time.sleep(2)
-
-                # Start form analysis
-                print("Analyzing form structure...")
-                form_definition = analyze_current_page(
-                    browser.page,
-                    exclude_pattern,
-                    config.analyzable_types
-                )
-                
-                # Save the form definition
-                os.makedirs(os.path.dirname(config.output_json_path), exist_ok=True)
-                with open(config.output_json_path, 'w', encoding='utf-8') as f:
-                    json.dump(form_definition, f, indent=2, ensure_ascii=False)
-                
-                print(f"Form definition saved to {config.output_json_path}")
-                
-        except Exception as e:
-            print(f"Error during analysis: {str(e)}")
-            raise
+        await authenticate(form_handler, test_data)
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for config in configs:
+            queue.put_nowait(config)
+
+        async def worker(worker_id: int):
+            # Tabs in the same context share the ASP.NET session cookie
+            page = browser.page if worker_id == 0 else await browser.context.new_page()
+            page.set_default_timeout(SETTLE_TIMEOUT_MS)
+            while True:
+                try:
+                    config = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    if refresh:
+                        results[config.target_page_url] = await refresh_config(page, config)
+                    else:
+                        results[config.target_page_url] = await analyze_config(page, config)
+                except Exception as e:
+                    print(f"Error analysing {config.target_page_url}: {str(e)}")
+                    if refresh:
+                        results[config.target_page_url] = {'url': config.target_page_url, 'status': 'error', 'error': str(e)}
+                    else:
+                        results[config.target_page_url] = f"error: {str(e)}"
+
+        worker_count = max(1, min(workers, len(configs)))
+        print(f"Analysing {len(configs)} pages with {worker_count} tabs")
+        await asyncio.gather(*[worker(i) for i in range(worker_count)])
+
+    if refresh:
+        write_refresh_report([results[c.target_page_url] for c in configs if c.target_page_url in results])
+    return results
 
 def load_configs_from_yaml(config_file: str) -> List[FormAnalysisConfig]:
     with open(config_file, 'r') as f:
         data = yaml.safe_load(f)
-    
+
     return [FormAnalysisConfig(
         target_page_url=config_data['target_page_url'],
         exclude_patterns=[p.strip() for p in config_data['exclude_patterns'].split(',')]
     ) for config_data in data['configs']]
 
 if __name__ == "__main__":
-    configs = load_configs_from_yaml('scripts/form_analysis_configs_temp.yaml')
-    analyze_multiple_pages(configs) 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Crawl DS-160 pages and write form definitions")
+    parser.add_argument('--config', default='scripts/form_analysis_configs_temp.yaml', help="Form analysis config YAML")
+    parser.add_argument('--workers', type=int, default=CRAWL_WORKERS, help="Number of tabs to analyse pages in parallel")
+    parser.add_argument('--refresh', action='store_true', help="Only re-analyse pages whose fields changed and write a diff report")
+    args = parser.parse_args()
+
+    configs = load_configs_from_yaml(args.config)
+    results = asyncio.run(analyze_multiple_pages(configs, args.workers, args.refresh))
+    for url, output in results.items():
+        print(f"{url} -> {output.get('status') if isinstance(output, dict) else output}")
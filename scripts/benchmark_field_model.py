@@ -0,0 +1,90 @@
+"""Compare memory and per-run allocations of the JSON page definitions against the immutable field models
+
+Usage: python scripts/benchmark_field_model.py [--runs 20] [--rows 3]
+
+"resident" is what the loaded definitions keep alive. "per run" replays what one
+FormHandler run allocates while walking every page: expanding compact definitions and
+producing row variants of repeated-group fields (--rows rows each), the old way with
+expand_definition + dict copies, the new way with shared models + row views.
+"""
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+root_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(root_dir / 'backend' / 'src'))
+
+from mappings.form_mapping import load_page_definitions
+from automation.dependency_table import expand_definition
+from automation.field_model import build_page_models, row_field
+
+definitions_dir = root_dir / "shared/form_definitions"
+
+
+def transform_field_ids(field_def, index):
+    """FormHandler._transform_field_ids before the field models"""
+    new_def = field_def.copy()
+    if 'name' in new_def:
+        new_def['name'] = new_def['name'].replace('_ctl00_', f'_ctl{index:02d}_')
+    if 'na_checkbox_id' in new_def:
+        new_def['na_checkbox_id'] = new_def['na_checkbox_id'].replace('_ctl00_', f'_ctl{index:02d}_')
+    return new_def
+
+
+def walk(fields, dependencies, rows, to_row, keep):
+    for field in fields:
+        if not field:
+            continue
+        if field.get('add_group_button_id'):
+            keep.extend(to_row(field, row) for row in range(1, rows))
+    for dependency in (dependencies or {}).values():
+        if dependency:
+            walk(dependency.get('shows') or [], dependency.get('dependencies'), rows, to_row, keep)
+
+
+def run_old(definitions, rows, keep):
+    for definition in definitions.values():
+        page = expand_definition(definition)
+        keep.append(page)
+        walk(page['fields'], page.get('dependencies'), rows, transform_field_ids, keep)
+
+
+def run_new(models, rows, keep):
+    for page in models.values():
+        walk(page.fields, page.dependencies, rows, row_field, keep)
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    seconds = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the immutable field models")
+    parser.add_argument('--runs', type=int, default=20, help="Concurrent runs whose allocations are kept alive together")
+    parser.add_argument('--rows', type=int, default=3, help="Rows per repeated group")
+    args = parser.parse_args()
+
+    definitions, raw_size, _ = measure(lambda: load_page_definitions(definitions_dir))
+    models, model_size, build_seconds = measure(lambda: build_page_models(definitions))
+
+    old_keep, old_size, old_seconds = measure(lambda: [run_old(definitions, args.rows, keep := []) or keep for _ in range(args.runs)])
+    new_keep, new_size, new_seconds = measure(lambda: [run_new(models, args.rows, keep := []) or keep for _ in range(args.runs)])
+
+    print(f"pages={len(definitions)} runs={args.runs} rows={args.rows}")
+    print(f"  resident  json {raw_size / 1024:9.1f} KB   models {model_size / 1024:9.1f} KB (+ json while building, {build_seconds * 1000:.1f} ms once)")
+    print(f"  per run   old  {old_size / args.runs / 1024:9.1f} KB {old_seconds / args.runs * 1000:7.2f} ms   "
+          f"new {new_size / args.runs / 1024:9.1f} KB {new_seconds / args.runs * 1000:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Compare filling DS-160 pages with the HTTP form engine against the browser path, on the mock CEAC server
+
+Usage: python scripts/benchmark_form_engine.py [--yaml input_yaml_data/full_application.yaml]
+                                               [--pages personal_page1,spouse_page] [--latency-ms 100]
+
+Both paths fill the same pages of the same YAML against scripts/mock_ceac_server.py,
+and what each one saved is compared with the planned values. The browser side is
+skipped when playwright (or the rest of FormHandler's dependencies) is not installed.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import httpx
+import yaml
+
+root_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(root_dir / 'backend' / 'src'))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from mappings.form_mapping import FormMapping, FORM_PAGE_ORDER, load_page_definitions
+from automation.action_planner import ActionPlanner, BUTTON, FILL, SELECT, RADIO
+from automation.http_form_engine import HttpFormEngine, UnsupportedPageError
+from mock_ceac_server import MockCeacServer, START_PATH, SESSION_COOKIE, control_name
+
+definitions_dir = root_dir / "shared/form_definitions"
+
+
+async def start_session(origin: str) -> List[Dict[str, Any]]:
+    """What the browser hands over after the CAPTCHA: the session cookie"""
+    async with httpx.AsyncClient() as client:
+        response = await client.get(f"{origin}{START_PATH}")
+        return [{'name': SESSION_COOKIE, 'value': response.cookies[SESSION_COOKIE],
+                 'domain': httpx.URL(origin).host, 'path': '/'}]
+
+
+async def saved_values(origin: str, cookies: List[Dict[str, Any]]) -> Dict[str, Dict[str, str]]:
+    async with httpx.AsyncClient(cookies={c['name']: c['value'] for c in cookies}) as client:
+        return (await client.get(f"{origin}/mock/saved")).json()
+
+
+def check(planner: ActionPlanner, form_data: Dict[str, Any], pages: List[str], saved: Dict[str, Dict[str, str]]) -> int:
+    """Planned fills, selects and radio choices that did not end up saved"""
+    missing = 0
+    for page_name in pages:
+        page_saved = saved.get(page_name, {})
+        actions = planner.plan_page(page_name, form_data[page_name])
+        if not any(action.kind == BUTTON for action in actions):
+            # Without button_clicks the page is filled but never saved, on either path
+            continue
+        for action in actions:
+            if action.kind == RADIO:
+                name = control_name(action.target.rsplit('_', 1)[0])
+            elif action.kind == FILL or (action.kind == SELECT and action.value not in (None, '')):
+                name = control_name(action.target)
+            else:
+                continue
+            expected = '' if action.value is None else str(action.value)
+            if action.kind != RADIO and page_saved.get(name, '') != expected:
+                missing += 1
+            elif action.kind == RADIO and name not in page_saved:
+                missing += 1
+    return missing
+
+
+async def run_http(origin: str, planner: ActionPlanner, form_data: Dict[str, Any], pages: List[str]):
+    cookies = await start_session(origin)
+    page_urls = FormMapping().page_urls
+    timings = {}
+    async with HttpFormEngine(cookies, origin=origin) as engine:
+        for page_name in pages:
+            start = time.perf_counter()
+            try:
+                result = await engine.fill_page(page_name, page_urls[page_name], planner.plan_page(page_name, form_data[page_name]))
+            except UnsupportedPageError as e:
+                # FormHandler would hand this page to the browser
+                print(f"  http     {page_name:28s} falls back to the browser: {e}")
+                engine.last_page = None
+                continue
+            timings[page_name] = (time.perf_counter() - start, result['requests'], len(result['errors']))
+    return timings, await saved_values(origin, cookies)
+
+
+async def run_browser(origin: str, page_definitions: Dict[str, Any], form_data: Dict[str, Any], pages: List[str]):
+    from automation.browser import BrowserHandler
+    from automation.field_model import build_page_models
+    from automation.form_handler import FormHandler
+
+    os.environ.setdefault('OPENAI_API_KEY', 'unused-by-benchmark')
+    handler = FormHandler()
+    page_urls = FormMapping().page_urls
+    timings = {}
+    # fill_form takes the expanded models _process_form_pages builds
+    page_definitions = build_page_models(page_definitions)
+    async with BrowserHandler() as browser:
+        handler.set_browser(browser)
+        await browser.page.goto(f"{origin}{START_PATH}")
+        for page_name in pages:
+            start = time.perf_counter()
+            await browser.page.goto(f"{origin}{httpx.URL(page_urls[page_name]).raw_path.decode()}")
+            handler.current_page = page_name
+            handler.field_values = form_data[page_name]
+            await handler.fill_form(page_definitions[page_name])
+            await handler.handle_page_navigation(page_definitions[page_name])
+            timings[page_name] = (time.perf_counter() - start, None, len(handler.page_errors.get(page_name, [])))
+        cookies = [{'name': c['name'], 'value': c['value']} for c in await browser.context.cookies()]
+    return timings, await saved_values(origin, cookies)
+
+
+def report(label: str, timings: Dict[str, Any], missing: int) -> None:
+    total = sum(seconds for seconds, _, _ in timings.values())
+    for page_name, (seconds, requests, errors) in timings.items():
+        requests_text = f"{requests:3d} requests" if requests is not None else "            "
+        print(f"  {label:8s} {page_name:28s} {seconds * 1000:9.1f} ms  {requests_text}  {errors} errors")
+    print(f"  {label:8s} {'total':28s} {total * 1000:9.1f} ms  {missing} planned values not saved")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark the HTTP form engine against the browser path")
+    parser.add_argument('--yaml', default=str(root_dir / 'input_yaml_data' / 'full_application.yaml'))
+    parser.add_argument('--pages', default='', help="Comma separated pages; default every application page in the YAML")
+    parser.add_argument('--latency-ms', type=float, default=100, help="Mock server delay per response, stands in for network")
+    parser.add_argument('--skip-browser', action='store_true')
+    args = parser.parse_args()
+
+    with open(args.yaml) as f:
+        form_data = yaml.safe_load(f)
+    page_definitions = load_page_definitions(definitions_dir)
+    page_urls = FormMapping().page_urls
+    pages = [page.strip() for page in args.pages.split(',') if page.strip()] or [
+        page for page in FORM_PAGE_ORDER if isinstance(form_data.get(page), dict) and page in page_urls
+    ]
+    planner = ActionPlanner(page_definitions)
+
+    with MockCeacServer(latency_ms=args.latency_ms) as server:
+        print(f"yaml={args.yaml} pages={len(pages)} latency={args.latency_ms}ms mock={server.origin}")
+        timings, saved = await run_http(server.origin, planner, form_data, pages)
+        pages = list(timings)
+        report("http", timings, check(planner, form_data, pages, saved))
+
+        if args.skip_browser:
+            return
+        try:
+            timings, saved = await run_browser(server.origin, page_definitions, form_data, pages)
+        except ImportError as e:
+            print(f"  browser path skipped, missing dependency: {e.name}")
+            return
+        report("browser", timings, check(planner, form_data, pages, saved))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,101 @@
+"""Compare import and parse time of the I94 travel history parser against the old pandas version
+
+Usage: python scripts/benchmark_i94_parser.py [--rows 40] [--repeat 200]
+The pandas side is skipped when pandas is not installed.
+"""
+import argparse
+import math
+import os
+import subprocess
+import sys
+import time
+from datetime import date, timedelta
+
+src_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend', 'src')
+sys.path.insert(0, src_dir)
+
+from utils.travel_history import process_travel_history
+
+
+def build_table(rows: int) -> str:
+    """Synthetic history, latest first, starting with an arrival so the open-stay path is exercised"""
+    lines = ["Row\tDATE\tTYPE\tLOCATION"]
+    current = date(2024, 6, 1)
+    for i in range(rows):
+        event_type = "Arrival" if i % 2 == 0 else "Departure"
+        current -= timedelta(days=45 if event_type == "Arrival" else 200)
+        lines.append(f"{i + 1}\t{current.isoformat()}\t{event_type}\tJFK")
+    return "\n".join(lines)
+
+
+def pandas_process_travel_data(table_text: str):
+    """The previous DataFrame based implementation, kept here only as the baseline"""
+    import pandas as pd
+
+    lines = [line.split('\t') for line in table_text.strip().split('\n')]
+    df = pd.DataFrame(lines[1:], columns=lines[0])
+    df['DATE'] = pd.to_datetime(df['DATE'])
+    if df.iloc[0]['TYPE'] != 'Departure':
+        new_row = pd.DataFrame([{'Row': '0', 'DATE': pd.Timestamp.now(), 'TYPE': 'Departure', 'LOCATION': df.iloc[0]['LOCATION']}])
+        df = pd.concat([new_row, df]).reset_index(drop=True)
+
+    visits = []
+    i = 0
+    while i < len(df) - 1 and len(visits) < 5:
+        departure_row = df.iloc[i]
+        arrival_row = df.iloc[i + 1]
+        if departure_row['TYPE'] == 'Departure' and arrival_row['TYPE'] == 'Arrival':
+            days = (departure_row['DATE'] - arrival_row['DATE']).days
+            visits.append((str(len(visits) + 1), arrival_row['DATE'].strftime('%d-%b-%Y').upper(), math.ceil(days / 30.44)))
+            i += 2
+        else:
+            i += 1
+    return visits
+
+
+def import_time(statement: str) -> float:
+    """Cold import time in a fresh interpreter, in milliseconds"""
+    code = f"import time; t = time.perf_counter(); {statement}; print((time.perf_counter() - t) * 1000)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=src_dir)
+    if result.returncode != 0:
+        return float('nan')
+    return float(result.stdout.strip())
+
+
+def parse_time(func, table: str, repeat: int) -> float:
+    """Mean time per call in milliseconds"""
+    func(table)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(table)
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark I94 travel history parsing")
+    parser.add_argument('--rows', type=int, default=40, help="Rows in the synthetic history table")
+    parser.add_argument('--repeat', type=int, default=200, help="Parse calls per measurement")
+    args = parser.parse_args()
+
+    table = build_table(args.rows)
+    try:
+        import pandas  # noqa: F401
+        has_pandas = True
+    except ImportError:
+        has_pandas = False
+
+    print(f"rows={args.rows} repeat={args.repeat}")
+    print(f"import utils.travel_history: {import_time('import utils.travel_history'):8.2f} ms")
+    print(f"parse (stdlib):              {parse_time(process_travel_history, table, args.repeat):8.3f} ms"
+          f"  -> {len(process_travel_history(table))} visits")
+
+    if has_pandas:
+        print(f"import pandas:               {import_time('import pandas'):8.2f} ms")
+        print(f"parse (pandas):              {parse_time(pandas_process_travel_data, table, args.repeat):8.3f} ms"
+              f"  -> {len(pandas_process_travel_data(table))} visits (capped at 5)")
+    else:
+        print("pandas not installed, skipping baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Measure what FormHandler's per-page logging costs the filling code, before and after the queue-based setup
+
+Usage: python scripts/benchmark_logging.py [--page workeducation3_page] [--pages 20] [--threads 4]
+
+Both variants replay the log calls fill_form and _process_field_and_dependencies make
+for every field of one page, against a RotatingFileHandler plus a console handler
+(sent to /dev/null). "before" is the old basicConfig setup with eager f-string INFO
+dumps; "after" is utils.logging_config with lazy DEBUG dumps at INFO level. Reported
+time is what the filling thread spends inside logging calls.
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+root_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(root_dir / 'backend' / 'src'))
+
+from mappings.form_mapping import FormMapping, load_page_definitions
+from automation.dependency_table import expand_definition
+from utils.logging_config import DEFAULT_FORMAT, configure_logging, stop_logging
+
+definitions_dir = root_dir / "shared/form_definitions"
+logger = logging.getLogger("automation.form_handler")
+
+
+def fill_before(page_name, page_definition, page_mappings, field_values):
+    logger.info(f"page: {page_name} mappings: {page_mappings}")
+    logger.info(f"page_definition: {page_definition}")
+    logger.info(f"field values: {field_values}")
+    dependencies = page_definition.get('dependencies', {})
+    for field_def in page_definition['fields']:
+        field_id = field_def['name']
+        value = field_values.get(field_id)
+        logger.info(f"field_name: {field_id} value: {value}")
+        logger.info(f"processing {field_id} with value: {value} and na_value: {None}")
+        logger.info(f"field_id: {field_id} field_type: {field_def['type']} value: {value}")
+        dependency_key = f"{field_id}.{value}"
+        logger.info(f"Checking dependencies for key: {dependency_key}")
+        logger.info(f"Available dependencies: {list(dependencies.keys()) if dependencies else 'None'}")
+        logger.info(f"No dependencies found for {dependency_key}")
+
+
+def fill_after(page_name, page_definition, page_mappings, field_values):
+    logger.info("Filling %s: %d fields, %d mapped", page_name, len(page_definition['fields']),
+                len(page_mappings), extra={'page': page_name})
+    logger.debug("page: %s mappings: %s", page_name, page_mappings)
+    logger.debug("page_definition: %s", page_definition)
+    logger.debug("field values: %s", field_values)
+    dependencies = page_definition.get('dependencies', {})
+    for field_def in page_definition['fields']:
+        field_id = field_def['name']
+        value = field_values.get(field_id)
+        logger.debug("field_name: %s value: %s", field_id, value, extra={'page': page_name, 'field': field_id})
+        logger.debug("processing %s with value: %s and na_value: %s", field_id, value, None)
+        logger.debug("field_id: %s field_type: %s value: %s", field_id, field_def['type'], value,
+                     extra={'page': page_name, 'field_type': field_def['type']})
+        dependency_key = f"{field_id}.{value}"
+        logger.debug("Checking dependencies for key: %s", dependency_key)
+        logger.debug("Available dependencies: %s", dependencies.keys() if dependencies else None)
+        logger.debug("No dependencies found for %s", dependency_key)
+
+
+def handlers(log_file):
+    return [RotatingFileHandler(log_file, maxBytes=10000000, backupCount=5), logging.StreamHandler(open(os.devnull, 'w'))]
+
+
+def run(label, fill, args, page):
+    """Seconds spent in logging per page on one thread, and pages per second across threads"""
+    single = []
+    for _ in range(args.pages):
+        start = time.perf_counter()
+        fill(*page)
+        single.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as pool:
+        list(pool.map(lambda _: fill(*page), range(args.pages * args.threads)))
+    concurrent = args.pages * args.threads / (time.perf_counter() - start)
+    return label, sorted(single)[len(single) // 2], max(single), concurrent
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark FormHandler logging overhead")
+    parser.add_argument('--page', default='workeducation3_page')
+    parser.add_argument('--pages', type=int, default=20, help="Pages logged per measurement")
+    parser.add_argument('--threads', type=int, default=4, help="Concurrent fills for the throughput figure")
+    args = parser.parse_args()
+
+    page_definition = expand_definition(load_page_definitions(definitions_dir)[args.page])
+    page_mappings = FormMapping().form_mapping.get(args.page, {})
+    field_values = {field['name']: 'SAMPLE VALUE' for field in page_definition['fields']}
+    page = (args.page, page_definition, page_mappings, field_values)
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        before_log = Path(tmp) / "before.log"
+        logging.basicConfig(level=logging.INFO, format=DEFAULT_FORMAT, handlers=handlers(before_log), force=True)
+        results.append(run("before", fill_before, args, page) + (before_log.stat().st_size,))
+        for handler in list(logging.getLogger().handlers):
+            handler.close()
+            logging.getLogger().removeHandler(handler)
+
+        after_log = Path(tmp) / "after.log"
+        configure_logging(handlers(after_log))
+        result = run("after", fill_after, args, page)
+        stop_logging()  # drain the queue before measuring the file
+        results.append(result + (after_log.stat().st_size,))
+
+    fields = len(page_definition['fields'])
+    print(f"page={args.page} fields={fields} pages={args.pages} threads={args.threads}")
+    for label, median, worst, throughput, size in results:
+        print(f"  {label:6s} median {median * 1000:8.2f} ms/page  worst {worst * 1000:8.2f} ms/page  "
+              f"{throughput:8.1f} pages/s with {args.threads} threads  {size / 1024:9.1f} KB written")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Check the dropdown option matcher against the real option lists in shared/form_definitions
+
+Usage: python scripts/check_option_matcher.py
+
+Each case names a dropdown, a value as it might appear in a YAML and the option it
+must resolve to, or None when the matcher has to give up (so the run warns instead
+of filling a wrong but plausible option). Exits 1 if any case fails.
+"""
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+root_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(root_dir / 'backend' / 'src'))
+
+from mappings.form_mapping import load_page_definitions
+from automation.dependency_table import expand_definition
+from automation.option_matcher import OptionMatcher
+
+definitions_dir = root_dir / "shared/form_definitions"
+
+# (page, field id suffix, value, expected option or None)
+CASES = [
+    ("us_contact_page", "ddlUS_POC_ADDR_STATE", "Washington D.C.", "DISTRICT OF COLUMBIA"),
+    ("us_contact_page", "ddlUS_POC_ADDR_STATE", "WASHINGTON DC", "DISTRICT OF COLUMBIA"),
+    ("us_contact_page", "ddlUS_POC_ADDR_STATE", "DC", "DISTRICT OF COLUMBIA"),
+    ("us_contact_page", "ddlUS_POC_ADDR_STATE", "Washington", "WASHINGTON"),
+    ("us_contact_page", "ddlUS_POC_ADDR_STATE", "NY", "NEW YORK"),
+    ("us_contact_page", "ddlUS_POC_ADDR_STATE", "Californa", "CALIFORNIA"),
+    ("us_contact_page", "ddlUS_POC_ADDR_STATE", "WASHINGTON STATE", None),
+    ("personal_page1", "ddlAPP_POB_CNTRY", "INDIANA", None),
+    ("personal_page1", "ddlAPP_POB_CNTRY", "India", "INDIA"),
+    ("personal_page1", "ddlAPP_POB_CNTRY", "USA", "UNITED STATES OF AMERICA"),
+    ("personal_page1", "ddlAPP_POB_CNTRY", "NIGERIAN", None),
+    ("personal_page1", "ddlDOBMonth", "AUGUST", "AUG"),
+    ("personal_page1", "ddlDOBMonth", "Sept", "SEP"),
+    ("personal_page1", "ddlDOBMonth", "JUNEX", None),
+    ("personal_page1", "ddlDOBDay", "1", "01"),
+]
+
+
+def walk_fields(definition: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield from definition.get('fields', [])
+
+    def walk(dependencies):
+        for dependency in (dependencies or {}).values():
+            yield from dependency.get('shows') or []
+            yield from walk(dependency.get('dependencies'))
+
+    yield from walk(definition.get('dependencies'))
+
+
+def find_field(definitions: Dict[str, Any], page: str, suffix: str) -> Optional[Dict[str, Any]]:
+    for field in walk_fields(expand_definition(definitions[page])):
+        if field and field.get('name', '').endswith(suffix):
+            return field
+    return None
+
+
+def main() -> int:
+    definitions = load_page_definitions(definitions_dir)
+    matcher = OptionMatcher()
+    failures = 0
+    for page, suffix, value, expected in CASES:
+        field = find_field(definitions, page, suffix)
+        if field is None:
+            print(f"MISSING  {page}.{suffix}: no such dropdown")
+            failures += 1
+            continue
+        match = matcher.resolve(field, value)
+        got = match.option if match else None
+        ok = got == expected
+        failures += not ok
+        method = f" ({match.method})" if match else ""
+        print(f"{'ok  ' if ok else 'FAIL'}     {suffix} {value!r} -> {got!r}{method}" + ("" if ok else f", expected {expected!r}"))
+    print(f"{len(CASES) - failures}/{len(CASES)} cases passed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
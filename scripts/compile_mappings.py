@@ -0,0 +1,250 @@
+"""Compile the Python page mappings and page definitions into every generated artifact
+
+The Python files in backend/src/mappings are the single source of truth; the
+backend imports them directly. From them and shared/form_definitions this script
+builds one canonical index and writes the frontend copies:
+
+  - frontend/app/utils/generated_mappings/<page>_mapping.json  per-page frontend mappings
+  - frontend/app/utils/generated_mappings/page_tables.ts  definition file / url / identifier tables
+
+Outputs are only rewritten when the hash of their inputs changed (or the
+output was edited by hand); hashes live in generated/manifest.json.
+Every mapped element id is checked against the page's definition; --strict
+fails on any miss outside KNOWN_UNDEFINED_IDS.
+"""
+import argparse
+import ast
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+root_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(root_dir / 'backend' / 'src'))
+
+from mappings.form_mapping import FormMapping, PAGE_DEFINITION_FILES
+from automation.dependency_table import expand_definition
+
+logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+
+mappings_dir = root_dir / "backend/src/mappings"
+page_mappings_dir = mappings_dir / "page_mappings"
+definitions_dir = root_dir / "shared/form_definitions"
+backend_output_dir = mappings_dir / "generated"
+frontend_output_dir = root_dir / "frontend/app/utils/generated_mappings"
+manifest_path = backend_output_dir / "manifest.json"
+
+# Bump when the output format changes so every artifact is rebuilt once
+COMPILER_VERSION = "1"
+
+# Mapped ids that are real controls but absent from the page definitions: the analyzer
+# does not record remove buttons, and p6 was captured without the social media add button
+KNOWN_UNDEFINED_IDS = {
+    ("personal_page1", "ctl00_SiteContentPlaceHolder_FormView1_DListAlias_ctl00_DeleteButtonAlias"),
+    ("address_phone_page", "ctl00_SiteContentPlaceHolder_FormView1_dtlSocial_ctl00_InsertButtonSOCIAL_MEDIA_INFO"),
+}
+
+# List items are rendered as _ctl00_, _ctl01_, ... and ASP.NET posts names with $
+INDEX_PATTERN = re.compile(r'_ctl\d+_')
+
+
+def file_hash(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest() if path.exists() else "missing"
+
+
+def inputs_hash(paths: List[Path]) -> str:
+    digest = hashlib.sha256(COMPILER_VERSION.encode())
+    for path in sorted(paths):
+        digest.update(str(path.relative_to(root_dir)).encode())
+        digest.update(file_hash(path).encode())
+    return digest.hexdigest()
+
+
+def read_page_mapping(path: Path) -> Dict[str, str]:
+    """Read the form_mapping literal from a page mapping module without executing it"""
+    tree = ast.parse(path.read_text(), filename=str(path))
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(isinstance(t, ast.Name) and t.id == 'form_mapping' for t in node.targets):
+            return ast.literal_eval(node.value)
+    raise ValueError(f"No form_mapping assignment in {path}")
+
+
+def normalize_id(element_id: str) -> str:
+    return INDEX_PATTERN.sub('_ctl00_', element_id.replace('$', '_'))
+
+
+def collect_definition_ids(definition: Dict[str, Any]) -> Set[str]:
+    """Every element id a definition knows about: fields, radio buttons, N/A checkboxes, add buttons and anything revealed by dependencies"""
+    ids: Set[str] = set()
+
+    def add_field(field: Dict[str, Any]):
+        for key in ('name', 'id', 'na_checkbox_id', 'add_group_button_id'):
+            if field.get(key):
+                ids.add(normalize_id(field[key]))
+        for button_id in (field.get('button_ids') or {}).values():
+            ids.add(normalize_id(button_id))
+
+    def walk(dependencies: Optional[Dict[str, Any]]):
+        for key, dependency in (dependencies or {}).items():
+            ids.add(normalize_id(key.split('.', 1)[0]))
+            for field in dependency.get('shows', []) or []:
+                add_field(field)
+            walk(dependency.get('dependencies'))
+
+    for field in definition.get('fields', []):
+        add_field(field)
+    for button in definition.get('buttons', []):
+        add_field(button)
+    walk(definition.get('dependencies'))
+    return ids
+
+
+def build_index() -> Tuple[Dict[str, Any], Dict[str, List[Path]]]:
+    """Build the canonical page index and the input files each page was built from"""
+    form_mapping = FormMapping()
+    pages: Dict[str, Any] = {}
+    page_inputs: Dict[str, List[Path]] = {}
+
+    page_names = list(PAGE_DEFINITION_FILES)
+    page_names += [p for p in form_mapping.form_mapping if p not in PAGE_DEFINITION_FILES]
+
+    for page_name in page_names:
+        mapping_path = page_mappings_dir / f"{page_name}_mapping.py"
+        pages[page_name] = {
+            "definition_file": PAGE_DEFINITION_FILES.get(page_name),
+            "url": form_mapping.page_urls.get(page_name),
+            "verify_element": form_mapping.page_identifiers.get(page_name, {}).get("verify_element"),
+            "form_mapping": read_page_mapping(mapping_path) if mapping_path.exists() else None
+        }
+        page_inputs[page_name] = [mapping_path] if mapping_path.exists() else []
+
+    index = {
+        "pages": pages,
+        "nav_buttons": form_mapping.NAV_BUTTONS
+    }
+    return index, page_inputs
+
+
+def validate_index(index: Dict[str, Any]) -> List[Dict[str, str]]:
+    """Report mapped element ids that do not exist in the page's definition"""
+    problems = []
+    for page_name, page in index["pages"].items():
+        if not page["form_mapping"] or not page["definition_file"]:
+            continue
+        definition_path = definitions_dir / f"{page['definition_file']}.json"
+        if not definition_path.exists():
+            problems.append({"page": page_name, "field": "", "element_id": "", "problem": f"missing definition {definition_path.name}"})
+            continue
+        with open(definition_path) as f:
+            known_ids = collect_definition_ids(expand_definition(json.load(f)))
+        for field, element_id in page["form_mapping"].items():
+            if normalize_id(element_id) not in known_ids and (page_name, element_id) not in KNOWN_UNDEFINED_IDS:
+                problems.append({"page": page_name, "field": field, "element_id": element_id, "problem": "not in definition"})
+    return problems
+
+
+def render_page_tables_ts(index: Dict[str, Any]) -> str:
+    pages = index["pages"]
+
+    def table(name: str, key: str) -> str:
+        values = {page: data[key] for page, data in pages.items() if data[key]}
+        return f"export const {name}: Record<string, string> = {json.dumps(values, indent=2)}\n"
+
+    return (
+        "// Generated by scripts/compile_mappings.py - do not edit\n\n"
+        + table("pageDefinitionFiles", "definition_file") + "\n"
+        + table("pageUrls", "url") + "\n"
+        + table("pageIdentifiers", "verify_element")
+    )
+
+
+def plan_outputs(index: Dict[str, Any], page_inputs: Dict[str, List[Path]]) -> List[Tuple[Path, List[Path], Any]]:
+    """List every artifact as (output path, input files, render function)"""
+    table_inputs = [mappings_dir / "form_mapping.py"]
+
+    outputs = [
+        (frontend_output_dir / "page_tables.ts", table_inputs,
+         lambda: render_page_tables_ts(index)),
+    ]
+    for page_name, page in index["pages"].items():
+        if page["form_mapping"] is None:
+            continue
+        mapping_path = page_mappings_dir / f"{page_name}_mapping.py"
+        outputs.append((
+            frontend_output_dir / f"{page_name}_mapping.json",
+            [mapping_path],
+            lambda mapping=page["form_mapping"]: json.dumps({"form_mapping": mapping}, indent=2)
+        ))
+    return outputs
+
+
+def load_manifest() -> Dict[str, Dict[str, str]]:
+    if not manifest_path.exists():
+        return {}
+    with open(manifest_path) as f:
+        return json.load(f)
+
+
+def write_atomic(path: Path, content: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + '.tmp')
+    tmp_path.write_text(content)
+    os.replace(tmp_path, path)
+
+
+def compile_mappings(force: bool = False, check: bool = False, strict: bool = False) -> int:
+    index, page_inputs = build_index()
+
+    problems = validate_index(index)
+    for problem in problems:
+        logging.warning(f"{problem['page']}: {problem['field']} -> {problem['element_id']} {problem['problem']}")
+    if problems:
+        logging.warning(f"{len(problems)} mapped ids not found in definitions")
+    if strict and problems:
+        return 1
+
+    manifest = load_manifest()
+    new_manifest = {}
+    stale = []
+    for output_path, inputs, render in plan_outputs(index, page_inputs):
+        key = str(output_path.relative_to(root_dir))
+        source_hash = inputs_hash(inputs)
+        previous = manifest.get(key, {})
+        up_to_date = (
+            not force
+            and previous.get("inputs") == source_hash
+            and previous.get("output") == file_hash(output_path)
+        )
+        if up_to_date:
+            new_manifest[key] = previous
+            continue
+
+        stale.append(key)
+        if check:
+            continue
+        write_atomic(output_path, render())
+        new_manifest[key] = {"inputs": source_hash, "output": file_hash(output_path)}
+        logging.info(f"Generated {key}")
+
+    if check:
+        for key in stale:
+            logging.error(f"Out of date: {key}")
+        return 1 if stale else 0
+
+    write_atomic(manifest_path, json.dumps(new_manifest, indent=2, sort_keys=True) + "\n")
+    logging.info(f"{len(stale)} artifacts rebuilt, {len(new_manifest) - len(stale)} up to date")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile page mappings into backend and frontend artifacts")
+    parser.add_argument('--force', action='store_true', help="Rebuild every artifact regardless of hashes")
+    parser.add_argument('--check', action='store_true', help="Only report out-of-date artifacts (exit 1 if any)")
+    parser.add_argument('--strict', action='store_true', help="Fail when a mapped id is missing from its definition")
+    args = parser.parse_args()
+
+    sys.exit(compile_mappings(args.force, args.check, args.strict))
@@ -1,252 +1,184 @@
-from playwright.sync_api import sync_playwright
+import asyncio
+import argparse
 import json
-import time
 import os
+import time
 from dotenv import load_dotenv
-import yaml
-from backend.src.automation.form_handler import FormHandler
-from backend.src.mappings.form_mapping import FormMapping
-from backend.src.automation.browser import BrowserHandler
 import logging
+from typing import Any, Dict, List, Optional
+
+# Shared crawler helpers: authentication, settle waits and batched in-page exploration
+from analyze_form_structure import (
+    AnalyzableElementType,
+    FORM_SNAPSHOT_JS,
+    analyze_field_dependencies,
+    arm_settle,
+    authenticate,
+    build_actions,
+    create_exclude_pattern,
+    load_json,
+    load_yaml,
+    record_actions,
+    settle,
+)
+# analyze_form_structure puts backend/src on sys.path
+from automation.form_handler import FormHandler
+from automation.browser import BrowserHandler
+from automation.dependency_table import compact_definition, expand_definition
 
 logging.basicConfig(level=logging.INFO)
 
-# Exactly same JSON/YAML loader functions as in map_travel_dropdowns.py:
-def load_json(file_path: str) -> dict:
-    with open(file_path, 'r') as f:
-        return json.load(f)
+# Defaults reproduce the original purpose-of-trip mapping on the travel page
+DEFAULT_URL = "https://ceac.state.gov/GenNIV/General/complete/complete_travel.aspx?node=Travel"
+DEFAULT_DROPDOWN = "ctl00_SiteContentPlaceHolder_FormView1_dlPrincipalAppTravel_ctl00_ddlPurposeOfTrip"
+DEFAULT_OUTPUT = "travel_dropdown_mappings_v3.json"
+DEFAULT_EXCLUDE = "Day, Month, Year, State, Country, Cntry, Natl, Language"
 
-def load_yaml(file_path: str) -> dict:
-    with open(file_path, 'r') as f:
-        return yaml.safe_load(f)
+ANALYZABLE_TYPES = {
+    AnalyzableElementType.TEXT,
+    AnalyzableElementType.RADIO,
+    AnalyzableElementType.SELECT,
+    AnalyzableElementType.TEXTAREA
+}
 
-def get_all_visible_fields(page):
-    """
-    Extract all visible form fields (input, select, textarea) from the entire page.
-    Returns a list of dictionaries formatted like the form definitions.
-    """
+def load_partial_output(output_file: str) -> Optional[Dict[str, Any]]:
+    """Load a previous (possibly partial) mapping so finished options can be skipped"""
+    if not os.path.exists(output_file):
+        return None
     try:
-        fields = page.evaluate("""() => {
-            const formElements = [];
-            const elems = Array.from(document.querySelectorAll('input, select, textarea'));
-            elems.forEach(e => {
-                const style = window.getComputedStyle(e);
-                if (e.offsetParent === null || style.display === 'none' || style.visibility === 'hidden') return;
-                let field = {};
-                if (e.tagName.toLowerCase() === 'select') {
-                    field.type = 'dropdown';
-                    field.value = Array.from(e.options).map(o => o.text.trim()).filter(t => t);
-                } else if (e.tagName.toLowerCase() === 'textarea') {
-                    field.type = 'textarea';
-                    field.value = "";
-                } else if (e.tagName.toLowerCase() === 'input') {
-                    if (e.type.toLowerCase() === 'text') {
-                        field.type = 'text';
-                        field.value = "";
-                    } else if (e.type.toLowerCase() === 'radio') {
-                        field.type = 'radio';
-                        field.value = e.value;
-                    } else {
-                        field.type = e.type;
-                        field.value = e.value || "";
-                    }
-                }
-                field.name = e.id || e.name || "";
-                let labelEl = document.querySelector('label[for="' + e.id + '"]');
-                field.text_phrase = labelEl ? labelEl.textContent.trim() : "";
-                field.parent_text_phrase = "";
-                field.maxlength = e.getAttribute('maxlength') || "";
-                field.has_na_checkbox = document.getElementById(e.id + "_NA") ? true : false;
-                formElements.push(field);
-            });
-            return formElements;
-        }""");
-        
+        return expand_definition(load_json(output_file))
     except Exception as e:
-        logging.error(f"Error extracting visible fields: {str(e)}")
-        return []
-    return fields;
-
-def extract_text_fields(page):
-    """
-    Extract text fields that appear after selecting a second dropdown option.
-    Returns a list of dictionaries with keys: "id", "label", "required".
-    """
-    try:
-        text_fields = page.evaluate("""() => {
-            const fields = [];
-            const container = document.querySelector('#ctl00_SiteContentPlaceHolder_FormView1_upnlPrincipalApplicant');
-            if (!container) return fields;
-            const inputs = container.querySelectorAll('input[type="text"]');
-            for (const input of inputs) {
-                const labelId = input.id.replace('tbx', 'lbl');
-                const labelSpan = document.getElementById(labelId);
-                if (labelSpan) {
-                    fields.push({
-                        id: input.id,
-                        label: labelSpan.textContent.trim(),
-                        required: input.hasAttribute('required') || false
-                    });
-                }
-            }
-            return fields;
-        }""")
-        return text_fields
-    except Exception as e:
-        logging.error(f"Error extracting text fields: {str(e)}")
-        return []
+        logging.error(f"Could not read existing mapping {output_file}, starting over: {str(e)}")
+        return None
+
+def save_mapping(mapping_output: Dict[str, Any], output_file: str) -> None:
+    """Write the mapping as a compact dependency table, replacing the file atomically"""
+    tmp_file = f"{output_file}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(compact_definition(mapping_output), f, indent=2, ensure_ascii=False)
+    os.replace(tmp_file, output_file)
+
+async def open_page(page, url: str, dropdown_id: str) -> None:
+    """Load the target page fresh so every option starts from the page's default state"""
+    await page.goto(url)
+    await page.wait_for_selector(f"#{dropdown_id}", state="visible", timeout=30000)
+    await arm_settle(page)
+    await settle(page)
+
+async def map_option(page, url: str, root_field: dict, action: dict, exclude_pattern) -> Dict[str, Any]:
+    """Select one root option on a fresh page and map every cascade it reveals"""
+    await open_page(page, url, root_field['name'])
+    snapshot = await page.evaluate(FORM_SNAPSHOT_JS, [t.value for t in ANALYZABLE_TYPES])
+    baseline = {field['name'] for field in snapshot['fields']}
+
+    result = (await record_actions(page, [action], baseline, ANALYZABLE_TYPES))[0]
+
+    dependencies = {}
+    new_state = set(result['visible'])
+    for child in result['shows']:
+        if child['type'] not in ['radio', 'dropdown'] or exclude_pattern.search(child['name']):
+            continue
+        dependencies.update(await analyze_field_dependencies(
+            page,
+            child,
+            new_state,
+            exclude_pattern,
+            ANALYZABLE_TYPES,
+            reset=child['type'] == 'dropdown'
+        ))
+
+    return {
+        "shows": result['shows'],
+        "hides": result['hides'],
+        "dependencies": dependencies if dependencies else None
+    }
 
-def map_travel_dropdowns_v2():
+async def map_cascading_dropdowns(url: str, dropdown_id: str, output_file: str, exclude: List[str],
+                                  input_yaml: str, workers: int, resume: bool) -> Dict[str, Any]:
+    """Map every option of a root dropdown and the cascades below it across parallel tabs"""
     load_dotenv()
-    
-    # Selectors and IDs for the two dropdowns
-    first_dropdown_selector = "#ctl00_SiteContentPlaceHolder_FormView1_dlPrincipalAppTravel_ctl00_ddlPurposeOfTrip"
-    second_dropdown_selector = "#ctl00_SiteContentPlaceHolder_FormView1_dlPrincipalAppTravel_ctl00_ddlOtherPurpose"
-    first_dropdown_id = "ctl00_SiteContentPlaceHolder_FormView1_dlPrincipalAppTravel_ctl00_ddlPurposeOfTrip"
-    second_dropdown_id = "ctl00_SiteContentPlaceHolder_FormView1_dlPrincipalAppTravel_ctl00_ddlOtherPurpose"
-    
-    # Define the mapping structure (fields, dependencies, buttons)
-    mapping_output = {
+    test_data = load_yaml(input_yaml)
+    exclude_pattern = create_exclude_pattern(exclude)
+
+    mapping_output = (load_partial_output(output_file) if resume else None) or {
         "fields": [],
         "dependencies": {},
         "buttons": []
     }
-    form_handler = FormHandler()
-    form_mapping = FormMapping()  # (Copied exactly as in original)
-    
-    with BrowserHandler(headless=False) as browser:
+
+    async with BrowserHandler() as browser:
+        form_handler = FormHandler()
         form_handler.set_browser(browser)
-        browser.navigate("https://ceac.state.gov/GenNIV/Default.aspx")
-        time.sleep(2)
-        
-        # ---------- Login / Retrieve Flow (exact copy from map_travel_dropdowns.py) ----------
-        test_data = load_yaml('data/input/test_application.yaml')
-        pages = [
-            ('start_page', '/Users/sanjaykarinje/git/form_automation_agent/form_definitions/p0_start_page_definition.json'),
-            ('retrieve_page', '/Users/sanjaykarinje/git/form_automation_agent/form_definitions/p0_retrieve_page_definition.json'),
-            ('travel_page', '/Users/sanjaykarinje/git/form_automation_agent/form_definitions/p3_travel_definition.json'),
-        ]
-        page_definitions = {
-            name: load_json(json_file) for name, json_file in pages
-        }
-        
-        print("Processing start page...")
-        form_handler.field_values = test_data['start_page']
-        form_handler.handle_start_page(page_definitions['start_page'])
-        time.sleep(2)
-        
-        print("Processing retrieve page...")
-        form_handler.field_values = test_data['retrieve_page']
-        form_handler.handle_retrieve_page(page_definitions['retrieve_page'])
-        time.sleep(2)
-        
-        print("Navigating to travel page...")
-        browser.navigate("https://ceac.state.gov/GenNIV/General/complete/complete_travel.aspx?node=Travel")
-        browser.page.wait_for_selector(first_dropdown_selector, state="visible", timeout=30000)
-        browser.page.wait_for_load_state("networkidle")
-        time.sleep(2)
-        # ---------- End of Login Flow ----------
-        
-        # Reset both dropdowns to no selection before capturing baseline fields.
-        logging.info("Resetting both dropdowns to no selection before capturing baseline fields.")
-        browser.page.locator(first_dropdown_selector).select_option("")
-        browser.page.locator(second_dropdown_selector).select_option("")
-        time.sleep(2)
-        
-        baseline_fields = get_all_visible_fields(browser.page)
-        initial_field_names = { field['name'] for field in baseline_fields }
-        logging.info(f"Initial field names: {initial_field_names}")
-        # Begin new dropdown mapping logic
-        # Extract first dropdown options
-        first_options = browser.page.locator(first_dropdown_selector).evaluate("""select => {
-            return Array.from(select.options).map(option => ({
-                value: option.value,
-                text: option.text.trim()
-            }));
-        }""")
-        first_options = [opt for opt in first_options if opt['value'] and opt['text']]
-        logging.info(f"Found first dropdown options: {first_options}")
-        
-        # Create a field for the first dropdown (structure similar to p1_personal1_definition.json)
-        first_field = {
-            "name": first_dropdown_id,
-            "type": "dropdown",
-            "value": [opt['text'] for opt in first_options],
-            "text_phrase": "Purpose of Trip to the U.S.",
-            "parent_text_phrase": ""
-        }
-        mapping_output["fields"].append(first_field)
-        
-        # Process every option from the first dropdown
-        for first_opt in first_options[:10]:
-            first_value = first_opt['value']
-            logging.info(f"\nProcessing first dropdown option: {first_opt['text']} ({first_value})")
-            
-            # Reload the page to reset state
-            browser.page.reload()
-            browser.page.wait_for_selector(first_dropdown_selector, state="visible", timeout=30000)
-            browser.page.wait_for_load_state("networkidle")
-            time.sleep(1)
-            
-            # Select current first dropdown option
-            first_dropdown = browser.page.locator(first_dropdown_selector)
-            first_dropdown.select_option(first_value)
-            time.sleep(2)
-            
-            # Obtain second dropdown options (when first dropdown is set)
-            second_options = browser.page.locator(second_dropdown_selector).evaluate("""select => {
-                return Array.from(select.options).map(option => ({
-                    value: option.value,
-                    text: option.text.trim()
-                }));
-            }""")
-            second_options = [opt for opt in second_options if opt['value'] and opt['text']]
-            logging.info(f"  Found second dropdown options: {second_options}")
-            
-            # Create a field definition for the second dropdown (for use in "shows")
-            second_field_def = {
-                "name": second_dropdown_id,
-                "type": "dropdown",
-                "value": [opt['text'] for opt in second_options],
-                "text_phrase": "Specify",
-                "parent_text_phrase": ""
-            }
-            
-            # For every option in the second dropdown, capture related text fields
-            second_deps = {}
-            for second_opt in second_options:
-                second_value = second_opt['value']
-                logging.info(f"    Processing second dropdown option: {second_opt['text']} ({second_value})")
-                browser.page.locator(second_dropdown_selector).select_option(second_value)
-                time.sleep(2)
-                
-                # Capture all visible fields after selecting this second dropdown option
-                new_fields = get_all_visible_fields(browser.page)
-                # Compute difference: fields that are newly visible compared to baseline
-                diff_fields = [field for field in new_fields if field['name'] not in initial_field_names]
-                logging.info(f"      Extracted diff fields: {diff_fields}")
-                
-                # Build dependency for the second dropdown option using diff_fields as "shows"
-                dep_key_second = f"{second_dropdown_id}.{second_opt['text']}"
-                second_deps[dep_key_second] = {
-                    "shows": diff_fields,
-                    "hides": [],
-                    "dependencies": None
-                }
-            
-            # Build dependency for the first dropdown option using nested dependencies
-            dep_key_first = f"{first_dropdown_id}.{first_opt['text']}"
-            mapping_output["dependencies"][dep_key_first] = {
-                "shows": [second_field_def],
-                "hides": [],
-                "dependencies": second_deps if second_deps else None
-            }
-        
-        # Save the final mapping to travel_dropdown_mappings_v2.json
-        output_file = "travel_dropdown_mappings_v2.json"
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(mapping_output, f, indent=2, ensure_ascii=False)
-        logging.info(f"\nMapping saved to {output_file}")
+        await authenticate(form_handler, test_data)
+
+        await open_page(browser.page, url, dropdown_id)
+        snapshot = await browser.page.evaluate(FORM_SNAPSHOT_JS, [t.value for t in ANALYZABLE_TYPES])
+        root_field = next((f for f in snapshot['fields'] if f['name'] == dropdown_id), None)
+        if not root_field or root_field['type'] != 'dropdown':
+            raise ValueError(f"Dropdown {dropdown_id} not found on {url}")
+        mapping_output['fields'] = [root_field]
+        mapping_output['buttons'] = snapshot['buttons']
+
+        actions = build_actions(root_field, reset=False)
+        pending = [a for a in actions if a['key'] not in mapping_output['dependencies']]
+        logging.info(f"{len(actions)} options for {dropdown_id}, {len(actions) - len(pending)} already mapped, {len(pending)} to go")
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for action in pending:
+            queue.put_nowait(action)
+        save_lock = asyncio.Lock()
+        failures = []
+
+        async def worker(worker_id: int):
+            # Tabs in the same context share the ASP.NET session cookie
+            page = browser.page if worker_id == 0 else await browser.context.new_page()
+            while True:
+                try:
+                    action = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                start_time = time.monotonic()
+                try:
+                    dependency = await map_option(page, url, root_field, action, exclude_pattern)
+                except Exception as e:
+                    logging.error(f"Error mapping {action['key']}: {str(e)}")
+                    failures.append(action['key'])
+                    continue
+                async with save_lock:
+                    mapping_output['dependencies'][action['key']] = dependency
+                    save_mapping(mapping_output, output_file)
+                logging.info(f"Mapped {action['key']} in {time.monotonic() - start_time:.1f}s (tab {worker_id})")
+
+        worker_count = max(1, min(workers, len(pending)))
+        await asyncio.gather(*[worker(i) for i in range(worker_count)])
+
+    # Keep dependencies in the dropdown's option order regardless of completion order
+    ordered = {a['key']: mapping_output['dependencies'][a['key']] for a in actions if a['key'] in mapping_output['dependencies']}
+    mapping_output['dependencies'] = ordered
+    save_mapping(mapping_output, output_file)
+
+    if failures:
+        logging.warning(f"{len(failures)} options failed, re-run with --resume to retry: {failures}")
+    logging.info(f"Mapping saved to {output_file}")
+    return mapping_output
 
 if __name__ == "__main__":
-    map_travel_dropdowns_v2() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Map a dropdown and the dropdowns/fields it reveals into a compact dependency table")
+    parser.add_argument('--url', default=DEFAULT_URL, help="Page containing the root dropdown")
+    parser.add_argument('--dropdown', default=DEFAULT_DROPDOWN, help="Element id of the root dropdown")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="Output dependency table JSON")
+    parser.add_argument('--exclude', default=DEFAULT_EXCLUDE, help="Comma separated patterns of fields not to explore")
+    parser.add_argument('--input', default='data/input/test_application.yaml', help="Application YAML used to sign in")
+    parser.add_argument('--workers', type=int, default=int(os.getenv('FORM_CRAWL_WORKERS', '4')), help="Number of tabs")
+    parser.add_argument('--resume', action='store_true', help="Skip options already present in the output file")
+    args = parser.parse_args()
+
+    asyncio.run(map_cascading_dropdowns(
+        args.url,
+        args.dropdown,
+        args.output,
+        [p.strip() for p in args.exclude.split(',') if p.strip()],
+        args.input,
+        args.workers,
+        args.resume
+    ))
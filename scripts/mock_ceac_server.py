@@ -0,0 +1,381 @@
+"""Local stand-in for the CEAC DS-160 WebForms, for exercising the HTTP form engine and the browser path
+
+Usage: python scripts/mock_ceac_server.py [--port 8765] [--latency-ms 0]
+
+Application pages are rendered from shared/form_definitions at the paths in
+FormMapping.page_urls and behave like ASP.NET WebForms where it matters:
+a session cookie is issued by /GenNIV/Default.aspx (where the CAPTCHA would be),
+__VIEWSTATE and __EVENTVALIDATION are signed and checked on every post,
+radios and dropdowns that reveal fields auto-post back, "Add Another" links add
+a row, and Save/Next/Back buttons save the page and redirect. Posted dropdown
+or radio values that were never rendered are rejected like event validation does.
+GET /mock/saved returns what the session has saved, so fills can be checked.
+"""
+import argparse
+import base64
+import hashlib
+import hmac
+import html
+import json
+import os
+import re
+import secrets
+import sys
+import threading
+import time
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+root_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(root_dir / 'backend' / 'src'))
+
+from mappings.form_mapping import FormMapping, FORM_PAGE_ORDER, load_page_definitions
+from automation.dependency_table import expand_definition
+
+definitions_dir = root_dir / "shared/form_definitions"
+
+START_PATH = "/GenNIV/Default.aspx"
+TIMEOUT_PATH = "/GenNIV/Common/SessionTimedOut.aspx"
+SESSION_COOKIE = "ASP.NET_SessionId"
+ROW_PATTERN = re.compile(r'_ctl(\d+)_')
+
+POSTBACK_SCRIPT = """<script type="text/javascript">
+function __doPostBack(eventTarget, eventArgument) {
+    var form = document.forms[0];
+    form.__EVENTTARGET.value = eventTarget;
+    form.__EVENTARGUMENT.value = eventArgument;
+    form.submit();
+}
+</script>"""
+
+
+def control_name(element_id: str) -> str:
+    """ASP.NET name for a control id, e.g. ctl00_SiteContentPlaceHolder_FormView1_DListAlias_ctl01_tbxSURNAME
+    -> ctl00$SiteContentPlaceHolder$FormView1$DListAlias$ctl01$tbxSURNAME"""
+    name = re.sub(r'_(ctl\d+)_', r'$\1$', element_id)
+    for container in ('ctl00_', 'SiteContentPlaceHolder_', 'FormView1_'):
+        name = name.replace(container, container[:-1] + '$', 1)
+    return name
+
+
+def row_id(element_id: str, row: int) -> str:
+    return element_id.replace('_ctl00_', f'_ctl{row:02d}_', 1)
+
+
+class MockCeac:
+    """Page rendering and post handling, independent of the HTTP server"""
+
+    def __init__(self):
+        self.secret = secrets.token_bytes(16)
+        self.definitions = {
+            page: expand_definition(definition)
+            for page, definition in load_page_definitions(definitions_dir).items()
+        }
+        self.paths: Dict[str, str] = {}
+        for page_name, url in FormMapping().page_urls.items():
+            if page_name in self.definitions:
+                self.paths[urlsplit(url).path] = page_name
+        self.page_paths = {page: path for path, page in self.paths.items()}
+        self.sessions: Dict[str, Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+
+    # --- state ---
+
+    def new_session(self) -> str:
+        session_id = secrets.token_hex(12)
+        with self.lock:
+            self.sessions[session_id] = {"pages": {}, "saved": {}}
+        return session_id
+
+    def page_state(self, session_id: str, page_name: str) -> Dict[str, Any]:
+        return self.sessions[session_id]["pages"].setdefault(page_name, {"values": {}, "rows": {}})
+
+    def _sign(self, payload: str) -> str:
+        return hmac.new(self.secret, payload.encode(), hashlib.sha256).hexdigest()[:32]
+
+    # --- rendering ---
+
+    def visible_controls(self, page_name: str, state: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+        """Controls on the page for the current values, and {add button id: group sample field id}"""
+        definition = self.definitions[page_name]
+        values = state["values"]
+        controls: List[Dict[str, Any]] = []
+        add_buttons: Dict[str, str] = {}
+        seen = set()
+
+        def walk(fields, dependencies):
+            for field in fields:
+                if not field or field['name'] in seen:
+                    continue
+                seen.add(field['name'])
+                rows = 1
+                add_button_id = field.get('add_group_button_id')
+                if add_button_id and '_ctl00_' in field['name']:
+                    rows = state["rows"].get(add_button_id, 1)
+                    add_buttons.setdefault(add_button_id, field['name'])
+                for row in range(rows):
+                    row_field = dict(field, name=row_id(field['name'], row))
+                    if field.get('na_checkbox_id'):
+                        row_field['na_checkbox_id'] = row_id(field['na_checkbox_id'], row)
+                    controls.append(row_field)
+
+                value = values.get(control_name(field['name']))
+                if field['type'] == 'radio':
+                    button_id = field.get('button_ids', {}).get(value)
+                    key = f"{button_id}.{value}" if button_id else None
+                else:
+                    key = f"{field['name']}.{value}"
+                dependency = (dependencies or {}).get(key)
+                if dependency:
+                    walk(dependency.get('shows', []), dependency.get('dependencies', {}))
+
+        walk(definition['fields'], definition.get('dependencies', {}))
+        return controls, add_buttons
+
+    def _reveals(self, page_name: str) -> set:
+        """Ids of radios and dropdowns whose value changes which fields are shown"""
+        triggers = set()
+
+        def walk(dependencies):
+            for key, dependency in (dependencies or {}).items():
+                if dependency and any(dependency.get('shows') or []):
+                    triggers.add(ROW_PATTERN.sub('_ctl00_', key.split('.', 1)[0]))
+                    walk(dependency.get('dependencies'))
+
+        walk(self.definitions[page_name].get('dependencies'))
+        return triggers
+
+    def render(self, session_id: str, page_name: str, errors: Optional[List[str]] = None) -> str:
+        state = self.page_state(session_id, page_name)
+        controls, add_buttons = self.visible_controls(page_name, state)
+        values = state["values"]
+        reveals = self._reveals(page_name)
+
+        def postback(element_id: str) -> str:
+            target = html.escape(control_name(element_id))
+            return f"javascript:setTimeout('__doPostBack(\\'{target}\\',\\'\\')', 0)"
+
+        body = []
+        for field in controls:
+            element_id = field['name']
+            name = control_name(element_id)
+            value = values.get(name, '')
+            field_type = field['type']
+            if field_type in ('text', 'textarea'):
+                if field_type == 'textarea':
+                    body.append(f'<textarea id="{element_id}" name="{name}">{html.escape(value)}</textarea>')
+                else:
+                    maxlength = f' maxlength="{field["maxlength"]}"' if field.get('maxlength') else ''
+                    body.append(f'<input type="text" id="{element_id}" name="{name}" value="{html.escape(value)}"{maxlength} />')
+            elif field_type == 'dropdown':
+                options = [str(option) for option in field.get('value') or []]
+                onchange = f' onchange="{postback(element_id)}"' if ROW_PATTERN.sub('_ctl00_', element_id) in reveals else ''
+                rendered = ''.join(
+                    f'<option value="{html.escape(option)}"{" selected" if option == value else ""}>{html.escape(option)}</option>'
+                    for option in options
+                )
+                body.append(f'<select id="{element_id}" name="{name}"{onchange}>{rendered}</select>')
+            elif field_type == 'radio':
+                for choice, button_id in field.get('button_ids', {}).items():
+                    onclick = f' onclick="{postback(button_id)}"' if button_id in reveals else ''
+                    checked = ' checked="checked"' if choice == value else ''
+                    body.append(f'<input type="radio" id="{button_id}" name="{name}" value="{html.escape(choice)}"{checked}{onclick} />')
+            elif field_type == 'checkbox':
+                checked = ' checked="checked"' if value else ''
+                body.append(f'<input type="checkbox" id="{element_id}" name="{name}"{checked} />')
+            if field.get('na_checkbox_id'):
+                na_name = control_name(field['na_checkbox_id'])
+                checked = ' checked="checked"' if values.get(na_name) else ''
+                body.append(f'<input type="checkbox" id="{field["na_checkbox_id"]}" name="{na_name}"{checked} />')
+
+        for add_button_id in add_buttons:
+            body.append(f'<a id="{add_button_id}" href="javascript:__doPostBack(\'{control_name(add_button_id)}\',\'\')">Add Another</a>')
+        for button in self.definitions[page_name].get('buttons', []):
+            body.append(f'<input type="submit" id="{button["id"]}" name="{control_name(button["id"])}" value="{html.escape(button["value"])}" />')
+
+        names = sorted({control_name(field['name']) for field in controls}
+                       | {control_name(field['na_checkbox_id']) for field in controls if field.get('na_checkbox_id')})
+        payload = base64.b64encode(json.dumps({"page": page_name, "names": names}).encode()).decode()
+        viewstate = f"{payload}.{self._sign(payload)}"
+        event_validation = self._sign(f"ev|{payload}")
+        summary = ''
+        if errors:
+            items = ''.join(f'<li>{html.escape(error)}</li>' for error in errors)
+            summary = f'<div class="validation-summary-errors"><ul>{items}</ul></div>'
+
+        return f"""<html><head><title>{page_name}</title>{POSTBACK_SCRIPT}</head><body>
+<form method="post" action="{self.page_paths[page_name]}" id="aspnetForm">
+<input type="hidden" name="__EVENTTARGET" id="__EVENTTARGET" value="" />
+<input type="hidden" name="__EVENTARGUMENT" id="__EVENTARGUMENT" value="" />
+<input type="hidden" name="__VIEWSTATE" id="__VIEWSTATE" value="{viewstate}" />
+<input type="hidden" name="__EVENTVALIDATION" id="__EVENTVALIDATION" value="{event_validation}" />
+<select id="ctl00_ddlLanguage" name="ctl00$ddlLanguage"><option value="English">English</option></select>
+{summary}
+{chr(10).join(body)}
+</form></body></html>"""
+
+    # --- posts ---
+
+    def handle_post(self, session_id: str, page_name: str, form: Dict[str, str]) -> Tuple[int, str, Optional[str]]:
+        """Apply a post; returns (status, html, redirect path)"""
+        viewstate = form.get('__VIEWSTATE', '')
+        payload, _, signature = viewstate.partition('.')
+        if not payload or not hmac.compare_digest(signature, self._sign(payload)):
+            return 500, "Validation of viewstate MAC failed.", None
+        if not hmac.compare_digest(form.get('__EVENTVALIDATION', ''), self._sign(f"ev|{payload}")):
+            return 500, "Invalid postback or callback argument: __EVENTVALIDATION", None
+        names = set(json.loads(base64.b64decode(payload))['names'])
+
+        state = self.page_state(session_id, page_name)
+        controls, add_buttons = self.visible_controls(page_name, state)
+        field_types = {control_name(field['name']): field for field in controls}
+        for name in names:
+            field = field_types.get(name)
+            posted = form.get(name)
+            if field and field['type'] == 'dropdown' and posted is not None and posted not in [str(v) for v in field.get('value') or []]:
+                return 500, f"Invalid postback or callback argument: {name}={posted}", None
+            if field and field['type'] == 'radio' and posted is not None and posted not in field.get('button_ids', {}):
+                return 500, f"Invalid postback or callback argument: {name}={posted}", None
+            if posted is None:
+                state["values"].pop(name, None)
+            else:
+                state["values"][name] = posted
+
+        event_target = form.get('__EVENTTARGET', '')
+        for add_button_id in add_buttons:
+            if event_target == control_name(add_button_id):
+                state["rows"][add_button_id] = state["rows"].get(add_button_id, 1) + 1
+
+        buttons = self.definitions[page_name].get('buttons', [])
+        clicked = next((button for button in buttons if control_name(button['id']) in form), None)
+        if clicked is None:
+            return 200, self.render(session_id, page_name), None
+
+        errors = []
+        for field in controls:
+            maxlength = field.get('maxlength')
+            value = state["values"].get(control_name(field['name']), '')
+            if maxlength and len(value) > int(maxlength):
+                errors.append(f"{field.get('text_phrase', field['name'])} exceeds {maxlength} characters")
+        self.sessions[session_id]["saved"][page_name] = dict(state["values"])
+        if errors:
+            return 200, self.render(session_id, page_name, errors), None
+
+        label = clicked['value']
+        index = FORM_PAGE_ORDER.index(page_name) if page_name in FORM_PAGE_ORDER else -1
+        step = 1 if label.startswith('Next') else -1 if label.startswith('Back') else 0
+        if step and 0 <= index + step < len(FORM_PAGE_ORDER) and FORM_PAGE_ORDER[index + step] in self.page_paths:
+            return 302, "", self.page_paths[FORM_PAGE_ORDER[index + step]]
+        return 200, self.render(session_id, page_name), None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    mock: MockCeac = None
+    latency = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _session(self) -> Optional[str]:
+        cookie = SimpleCookie(self.headers.get('Cookie', ''))
+        session_id = cookie[SESSION_COOKIE].value if SESSION_COOKIE in cookie else None
+        return session_id if session_id in self.mock.sessions else None
+
+    def _send(self, status: int, body: str = "", location: Optional[str] = None,
+              cookie: Optional[str] = None, content_type: str = "text/html; charset=utf-8"):
+        if self.latency:
+            time.sleep(self.latency)
+        data = body.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        if location:
+            self.send_header("Location", location)
+        if cookie:
+            self.send_header("Set-Cookie", f"{SESSION_COOKIE}={cookie}; path=/; HttpOnly")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == START_PATH:
+            session_id = self._session() or self.mock.new_session()
+            self._send(200, '<html><body><select id="ctl00_ddlLanguage"><option>English</option></select>'
+                            '<p>Start page: CAPTCHA is solved in the browser</p></body></html>', cookie=session_id)
+        elif path == TIMEOUT_PATH:
+            self._send(200, "<html><body>Session timed out</body></html>")
+        elif path == "/mock/saved":
+            session_id = self._session()
+            saved = self.mock.sessions[session_id]["saved"] if session_id else {}
+            self._send(200, json.dumps(saved), content_type="application/json")
+        elif path in self.mock.paths:
+            session_id = self._session()
+            if not session_id:
+                self._send(302, location=TIMEOUT_PATH)
+                return
+            self._send(200, self.mock.render(session_id, self.mock.paths[path]))
+        else:
+            self._send(404, "Not found")
+
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        session_id = self._session()
+        if path not in self.mock.paths:
+            self._send(404, "Not found")
+            return
+        if not session_id:
+            self._send(302, location=TIMEOUT_PATH)
+            return
+        length = int(self.headers.get('Content-Length', 0))
+        form = {key: values[-1] for key, values in parse_qs(self.rfile.read(length).decode(), keep_blank_values=True).items()}
+        status, body, location = self.mock.handle_post(session_id, self.mock.paths[path], form)
+        self._send(status, body, location=location)
+
+
+class MockCeacServer:
+    """Mock CEAC on a background thread; port 0 picks a free port"""
+
+    def __init__(self, port: int = 0, latency_ms: float = 0):
+        handler = type('MockCeacHandler', (_Handler,), {'mock': MockCeac(), 'latency': latency_ms / 1000})
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def origin(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockCeacServer":
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve mock DS-160 WebForms built from the form definitions")
+    parser.add_argument('--port', type=int, default=int(os.getenv('MOCK_CEAC_PORT', '8765')))
+    parser.add_argument('--latency-ms', type=float, default=0, help="Delay added to every response")
+    args = parser.parse_args()
+
+    server = MockCeacServer(args.port, args.latency_ms)
+    print(f"Mock CEAC serving {len(server.server.RequestHandlerClass.mock.paths)} pages at {server.origin}{START_PATH}")
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        server.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
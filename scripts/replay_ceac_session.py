@@ -0,0 +1,78 @@
+"""Record a real DS-160 run as an offline fixture, or replay one against FormHandler
+
+Usage: python scripts/replay_ceac_session.py record <yaml> [--out backend/src/logs/sessions/name]
+       python scripts/replay_ceac_session.py replay <session dir> <yaml> [--time-scale 1.0] [--runs 3]
+
+record drives the live CEAC site and writes session.har, one DOM snapshot per form
+page and manifest.json (with the CAPTCHA answer, so replays don't need OpenAI).
+replay serves that capture through Playwright routing with no network, so a
+FormHandler change can be timed against identical page behaviour run after run.
+Replays only match while the YAML produces the same posts as the recorded run.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+import yaml
+
+root_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(root_dir / 'backend' / 'src'))
+
+from mappings.form_mapping import load_page_definitions
+
+definitions_dir = root_dir / "shared/form_definitions"
+
+
+async def run_once(browser_handler, form_data, page_definitions):
+    from automation.form_handler import FormHandler
+
+    handler = FormHandler()
+    start = time.perf_counter()
+    try:
+        await handler.process_with_browser(browser_handler, form_data, page_definitions)
+    except Exception as e:
+        print(f"  run failed: {e}")
+    return time.perf_counter() - start, handler
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Record or replay a CEAC session")
+    commands = parser.add_subparsers(dest='command', required=True)
+    record = commands.add_parser('record')
+    record.add_argument('yaml')
+    record.add_argument('--out', default=None, help="Session folder; default a timestamped one under logs/sessions")
+    replay = commands.add_parser('replay')
+    replay.add_argument('session')
+    replay.add_argument('yaml')
+    replay.add_argument('--time-scale', type=float, default=1.0,
+                        help="1.0 keeps the recorded response times, 0 serves responses immediately")
+    replay.add_argument('--runs', type=int, default=1)
+    args = parser.parse_args()
+
+    from automation.browser import BrowserHandler
+
+    with open(args.yaml) as f:
+        form_data = yaml.safe_load(f)
+    page_definitions = load_page_definitions(definitions_dir)
+
+    if args.command == 'record':
+        browser_handler = BrowserHandler(record_dir=args.out)
+        seconds, handler = await run_once(browser_handler, form_data, page_definitions)
+        print(f"recorded {len(browser_handler.recorder.snapshots)} pages in {seconds:.1f}s to {browser_handler.recorder.directory}")
+        return
+
+    # The CAPTCHA answer comes from the manifest, but FormHandler still builds its OpenAI client
+    os.environ.setdefault('OPENAI_API_KEY', 'unused-by-replay')
+    print(f"session={args.session} time_scale={args.time_scale} runs={args.runs}")
+    for run in range(args.runs):
+        browser_handler = BrowserHandler(replay_dir=args.session, replay_time_scale=args.time_scale)
+        seconds, handler = await run_once(browser_handler, form_data, page_definitions)
+        print(f"  run {run + 1}: {seconds:8.2f}s  {len(handler.completed_pages)} completed  "
+              f"{len(handler.errored_pages)} errored  {browser_handler.replayer.delayed_seconds:.2f}s replayed network time")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())